@@ -0,0 +1,31 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+import sys
+
+from Harness import workload, replay
+
+'''
+Benchmark that compares the goodput (commits per second) and the abort rate of the TM under overload, when every
+ transaction is admitted at once, when running read-write transactions are capped at a fixed number, and when
+ that cap is adapted to the abort rate.
+
+Usage : python Admission.py [transactions]
+'''
+
+POLICIES = [
+	('unlimited', {}),
+	('max 4', {'maxActive': 4}),
+	('adaptive', {'adaptiveAdmission': True, 'maxActive': 20}),
+]
+
+if __name__ == '__main__' :
+	transactions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+	print ("%-10s %-10s %10s %10s %14s %12s" % ('contention', 'admission', 'committed', 'aborted', 'commits/sec', 'abort rate'))
+	for contention in ['medium', 'high'] :
+		fileName = workload(contention, transactions = transactions, concurrency = 20, operations = 4, readRatio = 0.5)
+		for name, options in POLICIES :
+			elapsed, statistics, output = replay(fileName, **options)
+			finished = statistics['committed'] + statistics['aborted']
+			print ("%-10s %-10s %10d %10d %14.1f %12.3f" % (contention, name, statistics['committed'], statistics['aborted'], statistics['committed'] / elapsed, statistics['aborted'] / float(finished or 1)))
@@ -0,0 +1,71 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+import os
+import sys
+import time
+import shutil
+import random
+import resource
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import BulkLoader
+from Site import Site
+from Launcher import Launcher
+from Transaction import Transaction
+
+'''
+Benchmark of the bulk loading of the initial values of the variables (BulkLoader.py). A binary data file of
+ x1, ..., xN is generated, then timed are : its loading and splitting among the sites, the creation of a site
+ holding its share, reads of variables picked at random from that site, and the start of a whole cluster with it.
+ The peak resident memory of this process is reported after each step.
+
+Usage : python BulkLoad.py [variables] [sites]
+'''
+
+def peakMemory() :
+	return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+def report(step, seconds) :
+	print ("%-28s %10.2f s %10.1f MB" % (step, seconds, peakMemory()))
+
+if __name__ == '__main__' :
+	count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000000
+	numSites = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+	reads = 100000
+
+	workDir = tempfile.mkdtemp()
+	fileName = os.path.join(workDir, 'data.bin')
+
+	try :
+		print ("%-28s %12s %13s" % ('step', 'time', 'peak RSS'))
+
+		start = time.time()
+		BulkLoader.write(fileName, BulkLoader.generate(count))
+		report('generate %d' % count, time.time() - start)
+
+		start = time.time()
+		shares = BulkLoader.load(fileName, numSites)
+		report('load and split', time.time() - start)
+
+		start = time.time()
+		site = Site(2, 0, numSites, serve = False, data = shares[2])
+		site.clientServer.server_close()
+		report('create site 2', time.time() - start)
+
+		random.seed(0)
+		varIDs = ['x%d' % (2 * random.randint(1, count // 2)) for i in range(reads)]
+		transaction = Transaction('T1', 1, False).toStruct()
+		start = time.time()
+		for varID in varIDs :
+			site.read(transaction, varID)
+		report('%d random reads' % reads, time.time() - start)
+
+		del site, shares
+		start = time.time()
+		with Launcher(numSites, 0, 0, logDir = workDir, dataFile = fileName) :
+			report('start %d sites and the TM' % numSites, time.time() - start)
+	finally :
+		shutil.rmtree(workDir)
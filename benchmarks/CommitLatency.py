@@ -0,0 +1,62 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+import sys
+import time
+import xmlrpclib
+
+'''
+Benchmark that measures the latency of TransactionManager.end against the number of sites a transaction has
+ written to. It expects the 10 client sites and the transaction manager to be running already (see
+ src/run-simulation.sh) and drives the transaction manager directly.
+
+Usage : python CommitLatency.py [repetitions]
+'''
+
+# Odd-indexed variables that reside on distinct sites (x1 on site 2, x3 on site 4, ...)
+SPREAD = ['x1', 'x3', 'x5', 'x7', 'x9']
+
+def participants(transactionManager, k, repetitions, counter) :
+
+	'''
+	args :
+	- transactionManager 		-		Connection to the transaction manager.
+	- k 						-		The number of participant sites to write to.
+	- repetitions 				-		The number of transactions to time.
+	- counter 					-		List holding the next free transaction number.
+
+	This function commits 'repetitions' transactions that each write to 'k' sites and returns the time taken
+	 by each of their calls to end(), in milliseconds. Writing to x2 is used for all 10 sites.
+	'''
+
+	variables = ['x2'] if k == 10 else SPREAD[:k]
+	latencies = []
+
+	for r in range(repetitions) :
+		txnID = 'T%d' % counter[0]
+		counter[0] += 1
+
+		transactionManager.clockForward()
+		transactionManager.begin(txnID)
+		for var in variables :
+			transactionManager.clockForward()
+			transactionManager.write(txnID, var, r)
+
+		transactionManager.clockForward()
+		start = time.time()
+		transactionManager.end(txnID)
+		latencies.append((time.time() - start) * 1000)
+
+	return sorted(latencies)
+
+
+if __name__ == '__main__' :
+	repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+	transactionManager = xmlrpclib.ServerProxy('http://localhost:7777', allow_none = True)
+	counter = [1]
+
+	print ("%-14s %10s %10s %10s" % ('participants', 'mean (ms)', 'p50 (ms)', 'p95 (ms)'))
+	for k in [1, 2, 3, 4, 5, 10] :
+		latencies = participants(transactionManager, k, repetitions, counter)
+		mean = sum(latencies) / len(latencies)
+		print ("%-14d %10.3f %10.3f %10.3f" % (k, mean, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95)]))
@@ -0,0 +1,26 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+import sys
+
+from Harness import workload, replay
+
+'''
+Benchmark that compares the throughput and the abort rate of clusters running strict two-phase locking and
+ optimistic concurrency control at their sites, on workloads from WorkloadGenerator of increasing contention, with
+ mostly reads and with many writes.
+
+Usage : python ConcurrencyControl.py [transactions]
+'''
+
+if __name__ == '__main__' :
+	transactions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+	print ("%-10s %-6s %-11s %10s %10s %10s %14s %12s" % ('contention', 'reads', 'engine', 'committed', 'aborted', 'waits', 'commits/sec', 'abort rate'))
+	for contention in ['low', 'medium', 'high'] :
+		for readRatio in [0.7, 0.95] :
+			fileName = workload(contention, transactions = transactions, concurrency = 5, operations = 6, readRatio = readRatio)
+			for engine in ['locking', 'optimistic'] :
+				elapsed, statistics, output = replay(fileName, concurrencyControl = engine)
+				finished = statistics['committed'] + statistics['aborted']
+				print ("%-10s %-6.2f %-11s %10d %10d %10d %14.1f %12.3f" % (contention, readRatio, engine, statistics['committed'], statistics['aborted'], output.count('Waitlisted'), statistics['committed'] / elapsed, statistics['aborted'] / float(finished or 1)))
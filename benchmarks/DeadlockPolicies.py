@@ -0,0 +1,26 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+import sys
+
+from Harness import CONTENTION, workload, replay
+
+'''
+Benchmark that compares the throughput and the abort rate of the deadlock policies of the TM ('detect',
+ 'wait-die' and 'wound-wait') on workloads of increasing contention from WorkloadGenerator.
+
+Usage : python DeadlockPolicies.py [transactions]
+'''
+
+POLICIES = ['detect', 'wait-die', 'wound-wait']
+
+if __name__ == '__main__' :
+	transactions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+	print ("%-10s %-12s %10s %10s %14s %12s" % ('contention', 'policy', 'committed', 'aborted', 'commits/sec', 'abort rate'))
+	for contention in ['low', 'medium', 'high'] :
+		fileName = workload(contention, transactions = transactions, concurrency = 5, operations = 4)
+		for policy in POLICIES :
+			elapsed, statistics, output = replay(fileName, deadlockPolicy = policy)
+			finished = statistics['committed'] + statistics['aborted']
+			print ("%-10s %-12s %10d %10d %14.1f %12.3f" % (contention, policy, statistics['committed'], statistics['aborted'], statistics['committed'] / elapsed, statistics['aborted'] / float(finished or 1)))
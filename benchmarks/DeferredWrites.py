@@ -0,0 +1,25 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+import sys
+
+from Harness import workload, replay
+
+'''
+Benchmark that compares the throughput and the abort rate of the TM when every write is sent to the sites right
+ away and when writes are buffered at the TM until their transaction ends, on workloads of increasing contention
+ from WorkloadGenerator with mostly writes.
+
+Usage : python DeferredWrites.py [transactions]
+'''
+
+if __name__ == '__main__' :
+	transactions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+	print ("%-10s %-10s %10s %10s %14s %12s" % ('contention', 'writes', 'committed', 'aborted', 'commits/sec', 'abort rate'))
+	for contention in ['low', 'medium', 'high'] :
+		fileName = workload(contention, transactions = transactions, concurrency = 5, operations = 6, readRatio = 0.2)
+		for deferred in [False, True] :
+			elapsed, statistics, output = replay(fileName, deferredWrites = deferred)
+			finished = statistics['committed'] + statistics['aborted']
+			print ("%-10s %-10s %10d %10d %14.1f %12.3f" % (contention, 'deferred' if deferred else 'immediate', statistics['committed'], statistics['aborted'], statistics['committed'] / elapsed, statistics['aborted'] / float(finished or 1)))
@@ -0,0 +1,81 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+import os
+import sys
+import time
+import tempfile
+import xmlrpclib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from Launcher import Launcher
+
+'''
+Benchmark that measures the commit throughput of the TM when transactions that end together are committed one
+ at a time with TransactionManager.end and as a group with TransactionManager.endAll, for growing group sizes.
+ Every transaction writes to its own even-indexed variable, which resides on all 10 sites, so that each commit
+ reaches every site.
+
+Usage : python GroupCommit.py [rounds]
+'''
+
+# Even-indexed variables, one per transaction of a group
+VARIABLES = ['x%d' % i for i in range(2, 21, 2)]
+
+def commitRounds(transactionManager, groupSize, rounds, grouped, counter) :
+
+	'''
+	args :
+	- transactionManager 		-		Connection to the transaction manager.
+	- groupSize 				-		The number of transactions ending together.
+	- rounds 					-		The number of groups to commit.
+	- grouped 					-		True, to end each group with TransactionManager.endAll; False, with one
+										 TransactionManager.end per transaction.
+	- counter 					-		List holding the next free transaction number.
+
+	This function begins and writes 'groupSize' transactions, ends them together, and does so 'rounds' times.
+	 It returns the number of commits per second spent ending them.
+	'''
+
+	elapsed = 0.0
+
+	for r in range(rounds) :
+		txnIDs = ['T%d' % (counter[0] + i) for i in range(groupSize)]
+		counter[0] += groupSize
+
+		for txnID, var in zip(txnIDs, VARIABLES) :
+			transactionManager.clockForward()
+			transactionManager.begin(txnID)
+			transactionManager.clockForward()
+			transactionManager.write(txnID, var, r)
+
+		start = time.time()
+		if grouped :
+			for txnID in txnIDs :
+				transactionManager.clockForward()
+			results = transactionManager.endAll(txnIDs)
+		else :
+			results = []
+			for txnID in txnIDs :
+				transactionManager.clockForward()
+				results.append(transactionManager.end(txnID))
+		elapsed += time.time() - start
+
+		assert all(result.startswith('Ended') for result in results), results
+
+	return groupSize * rounds / elapsed
+
+
+if __name__ == '__main__' :
+	rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+	with Launcher(10, 0, 0, tempfile.mkdtemp()) as launcher :
+		transactionManager = xmlrpclib.ServerProxy(launcher.url(), allow_none = True)
+		counter = [1]
+
+		print ("%-11s %16s %16s %10s" % ('group size', 'end (commits/s)', 'endAll (commits/s)', 'speedup'))
+		for groupSize in [1, 2, 5, 10] :
+			single = commitRounds(transactionManager, groupSize, rounds, False, counter)
+			grouped = commitRounds(transactionManager, groupSize, rounds, True, counter)
+			print ("%-11d %16.1f %18.1f %10.2f" % (groupSize, single, grouped, grouped / single))
@@ -0,0 +1,59 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+import os
+import sys
+import tempfile
+import xmlrpclib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from Launcher import Launcher
+from Regression import replayInto
+from WorkloadGenerator import WorkloadGenerator
+
+'''
+Helpers shared by the benchmarks that replay workloads against a whole cluster.
+'''
+
+# Settings of WorkloadGenerator for increasing contention between transactions
+CONTENTION = {
+	'low' : {'hotVariables': 20, 'hotProbability': 0.0},
+	'medium' : {'hotVariables': 4, 'hotProbability': 0.5},
+	'high' : {'hotVariables': 2, 'hotProbability': 0.9},
+}
+
+def workload(contention, **options) :
+
+	'''
+	args :
+	- contention 				-		One of the keys of CONTENTION.
+	- options 					-		Further keyword arguments for WorkloadGenerator.
+
+	This function generates a workload into a temporary input file and returns its name.
+	'''
+
+	settings = dict(CONTENTION[contention])
+	settings.update(options)
+	fileName = tempfile.mktemp(suffix = '.txt')
+	WorkloadGenerator(**settings).write(fileName)
+	return fileName
+
+def replay(fileName, batch = False, numSites = 10, **tmOptions) :
+
+	'''
+	args :
+	- fileName 					-		The input file to replay.
+	- batch 					-		True, if the simulator is to batch reads and writes.
+	- numSites 					-		The number of client sites.
+	- tmOptions 				-		Keyword arguments for the TransactionManager constructor.
+
+	This function starts a cluster, replays an input file against it while discarding the output of the
+	 simulator, and returns the time taken by the replay in seconds, the statistics of the TM and the
+	 output of the simulator.
+	'''
+
+	with Launcher(numSites, 0, 0, tempfile.mkdtemp(), tmOptions) as launcher :
+		elapsed, output = replayInto(fileName, launcher.url(), batch)
+		statistics = xmlrpclib.ServerProxy(launcher.url(), allow_none = True).statistics()
+		return elapsed, statistics, output
@@ -0,0 +1,311 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+import os
+import sys
+import gc
+import json
+import time
+import random
+import argparse
+import platform
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from Site import Site
+from Variable import Variable
+from LockManager import LockManager, LockException
+from Transaction import Transaction
+from TransactionManager import TransactionManager
+
+'''
+Microbenchmarks of the hot paths of concurrency control, run in a single process without a cluster : lock acquisition
+ and release, reads over long version histories, commits at a site, cycle detection over large conflict graphs,
+ retries of a deep waitlist and the lookup of the sites holding a variable. Each case is run several times and the
+ best time per operation is kept, in microseconds. The garbage collector is disabled while a case runs, as timeit does.
+
+'run' prints the times, and stores them as the baseline with --save. 'compare' runs the cases again and exits with
+ status 1 if any of them is slower than its baseline by more than the threshold (20% by default). Baselines are only
+ comparable on the machine and Python they were recorded with, so re-record them with 'run --save' after moving.
+
+Usage : python Micro.py run [--repeat N] [--save]
+        python Micro.py compare [--repeat N] [--threshold 0.2]
+'''
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+VARIABLES = ['x%d' % i for i in range(1, 21)]
+
+class InProcessSite(object) :
+
+	'''
+	Class that stands in for the client server of a site in the TM, calling the Site directly. The TM sends
+	 transactions as the dictionaries of Transaction.toStruct, so they reach the site as they would over XML-RPC.
+	'''
+
+	def __init__(self, site) :
+
+		'''
+		args :
+		- site 						-		The Site object to be called.
+		'''
+
+		self._site = site
+
+	def __getattr__(self, name) :
+
+		'''
+		args :
+		- name 						-		The name of a function of the site.
+
+		This function returns the function 'name' of the site, to be called as the TM would call it over XML-RPC.
+		'''
+
+		return getattr(self._site, name)
+
+def _transaction(i, isRW = True, timeStamp = None) :
+
+	'''
+	args :
+	- i 							-		The number of the transaction, giving its ID 'T{i}'.
+	- isRW 							-		True, for a read-write transaction.
+	- timeStamp 					-		The time at which it began. i, if None.
+
+	This function returns a transaction as the dictionary a site receives from the TM.
+	'''
+
+	return Transaction('T%d' % i, i if timeStamp is None else timeStamp, isRW).toStruct()
+
+def _transactionManager(numSites = 4) :
+
+	'''
+	This function returns a TM whose sites are Site objects of this process, reached through InProcessSite.
+	'''
+
+	sites = [Site(i, 0, numSites = numSites, serve = False) for i in range(1, numSites + 1)]
+	tm = TransactionManager(0, sitePorts = [site.port for site in sites], serve = False)
+	for site in sites :
+		site.clientServer.server_close()
+		tm._clientSites[site.ID] = InProcessSite(site)
+	return tm
+
+def lockAcquireRelease(transactions = 20000) :
+
+	'''
+	Each transaction read-locks five variables, write-locks a sixth and releases them all.
+	'''
+
+	lockManager = LockManager(VARIABLES)
+	txns = [_transaction(i) for i in range(transactions)]
+
+	start = time.time()
+	for i, transaction in enumerate(txns) :
+		for j in range(5) :
+			lockManager.acquireReadLock(transaction, VARIABLES[(i + j) % 20])
+		lockManager.acquireWriteLock(transaction, VARIABLES[(i + 5) % 20])
+		lockManager.releaseAllLocks(transaction)
+	return (time.time() - start) / transactions
+
+def lockConflict(transactions = 50000) :
+
+	'''
+	Each transaction fails to read-lock a variable write-locked by another one.
+	'''
+
+	lockManager = LockManager(VARIABLES)
+	lockManager.acquireWriteLock(_transaction(0), 'x1')
+	txns = [_transaction(i) for i in range(1, transactions + 1)]
+
+	start = time.time()
+	for transaction in txns :
+		try :
+			lockManager.acquireReadLock(transaction, 'x1')
+		except LockException :
+			pass
+	return (time.time() - start) / transactions
+
+def _history(versions) :
+	var = Variable('x2', 20)
+	for t in range(1, versions + 1) :
+		writer = _transaction(t)
+		var.write(writer, t)
+		var.commit(t, writer)
+	return var
+
+def readCommittedRO(versions = 100000, reads = 20000) :
+
+	'''
+	Read-only transactions read a variable with a long history at random points of it.
+	'''
+
+	var = _history(versions)
+	random.seed(0)
+	readers = [_transaction(i, False, random.randint(0, versions)) for i in range(reads)]
+
+	start = time.time()
+	for transaction in readers :
+		var.readCommitted(transaction)
+	return (time.time() - start) / reads
+
+def readCommittedRW(versions = 100000, reads = 20000) :
+
+	'''
+	Read-write transactions read the last version of a variable with a long history.
+	'''
+
+	var = _history(versions)
+	readers = [_transaction(i) for i in range(reads)]
+
+	start = time.time()
+	for transaction in readers :
+		var.readCommitted(transaction)
+	return (time.time() - start) / reads
+
+def siteCommit(transactions = 10000) :
+
+	'''
+	Each transaction writes five variables at a site and commits.
+	'''
+
+	site = Site(1, 0, serve = False)
+	site.clientServer.server_close()
+	txns = [_transaction(i) for i in range(1, transactions + 1)]
+
+	start = time.time()
+	for t, transaction in enumerate(txns, 1) :
+		for j in range(5) :
+			site.write(transaction, 'x%d' % (2 * ((t + j) % 10) + 2), t)
+		site.commit(transaction, t)
+	return (time.time() - start) / transactions
+
+def cycleDetection(layers = 20, width = 100, edges = 3) :
+
+	'''
+	A cycle is looked for in an acyclic conflict graph of layers * width transactions, each one waiting for 'edges'
+	 transactions of the next layer.
+	'''
+
+	tm = _transactionManager()
+	random.seed(0)
+	for layer in range(layers - 1) :
+		for i in range(width) :
+			for j in random.sample(range(width), edges) :
+				tm._activeTransactions.add('T%d' % (layer * width + i))
+				tm._activeTransactions.add('T%d' % ((layer + 1) * width + j))
+				tm._conflictGraph['T%d' % (layer * width + i)].append('T%d' % ((layer + 1) * width + j))
+
+	start = time.time()
+	assert not tm._isCyclic()
+	return (time.time() - start) / (layers * width)
+
+def retryWaitlist(depth = 300) :
+
+	'''
+	A pass over a waitlist of 'depth' reads, all waiting for the write-lock of the same transaction and still blocked.
+	'''
+
+	tm = _transactionManager()
+	tm.begin('T0')
+	tm.write('T0', 'x1', 1)
+	for i in range(1, depth + 1) :
+		tm.begin('T%d' % i)
+		tm.read('T%d' % i, 'x1')
+	assert len(tm._waitlist) == depth
+
+	start = time.time()
+	tm._retryWaitingTransactions()
+	return (time.time() - start) / depth
+
+def sitesHoldingVar(lookups = 200000) :
+
+	'''
+	The sites holding each of the 20 variables are looked up.
+	'''
+
+	tm = _transactionManager(10)
+	varIDs = [i % 20 + 1 for i in range(lookups)]
+
+	start = time.time()
+	for varID in varIDs :
+		tm._sitesHoldingVar(varID)
+	return (time.time() - start) / lookups
+
+CASES = OrderedDict([
+	('lock-acquire-release', lockAcquireRelease),
+	('lock-conflict', lockConflict),
+	('read-committed-ro', readCommittedRO),
+	('read-committed-rw', readCommittedRW),
+	('site-commit', siteCommit),
+	('cycle-detection', cycleDetection),
+	('retry-waitlist', retryWaitlist),
+	('sites-holding-var', sitesHoldingVar),
+])
+
+def run(repeat) :
+
+	'''
+	args :
+	- repeat 					-		The number of times each case is run.
+
+	This function returns the best time per operation of each case, in microseconds.
+	'''
+
+	results = OrderedDict((name, []) for name in CASES)
+
+	# The cases take turns, so that a burst of load on the machine slows down one run of every case rather than
+	# every run of one case
+	for i in range(repeat) :
+		for name, case in CASES.iteritems() :
+			gc.collect()
+			gc.disable()
+			try :
+				results[name].append(case())
+			finally :
+				gc.enable()
+
+	return OrderedDict((name, min(times) * 1e6) for name, times in results.iteritems())
+
+if __name__ == '__main__' :
+	parser = argparse.ArgumentParser(description = 'Microbenchmarks of the hot paths of concurrency control.')
+	subparsers = parser.add_subparsers(dest = 'command')
+	runParser = subparsers.add_parser('run', help = 'Run the cases and print their times.')
+	runParser.add_argument('--repeat', type = int, default = 7)
+	runParser.add_argument('--save', action = 'store_true', help = 'Store the times as the baseline.')
+	runParser.add_argument('--baseline', default = BASELINE)
+	compareParser = subparsers.add_parser('compare', help = 'Run the cases and compare them with the baseline.')
+	compareParser.add_argument('--repeat', type = int, default = 7)
+	compareParser.add_argument('--threshold', type = float, default = 0.2, help = 'The slowdown over the baseline that is a regression.')
+	compareParser.add_argument('--baseline', default = BASELINE)
+	args = parser.parse_args()
+
+	results = run(args.repeat)
+
+	if args.command == 'run' :
+		for name, micros in results.iteritems() :
+			print ("%-24s %12.3f us/op" % (name, micros))
+
+		if args.save :
+			with open(args.baseline, 'w') as f :
+				json.dump({'python': platform.python_version(), 'machine': platform.machine(), 'repeat': args.repeat, 'results': results}, f, indent = 2)
+				f.write('\n')
+			print ("Saved baseline to %s" % args.baseline)
+	else :
+		with open(args.baseline) as f :
+			baseline = json.load(f)['results']
+
+		regressions = 0
+		print ("%-24s %12s %12s %8s" % ('case', 'baseline', 'now', 'ratio'))
+		for name, micros in results.iteritems() :
+			if not name in baseline :
+				print ("%-24s %12s %12.3f %8s" % (name, '-', micros, '-'))
+				continue
+			ratio = micros / baseline[name]
+			regressed = ratio > 1 + args.threshold
+			regressions += regressed
+			print ("%-24s %12.3f %12.3f %7.2fx%s" % (name, baseline[name], micros, ratio, '  REGRESSION' if regressed else ''))
+
+		if regressions :
+			print ("%d of %d cases regressed by more than %d%%" % (regressions, len(results), args.threshold * 100))
+			sys.exit(1)
+		print ("No case regressed by more than %d%%" % (args.threshold * 100))
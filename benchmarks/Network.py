@@ -0,0 +1,73 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from Launcher import Launcher
+from Simulator import DES
+from NetworkProxy import parseLinks
+from WorkloadGenerator import WorkloadGenerator
+
+'''
+Benchmark of a replay under the conditions of a network between the TM and the client sites, simulated by a
+ NetworkProxy per site (NetworkProxy.py). The same generated workload is replayed with and without batching over
+ each profile of links, and the time of each replay is reported with the time per request of the input.
+
+Usage : python Network.py [transactions]
+'''
+
+PROFILES = [
+	('loopback', []),
+	('lan', ['latency=0.25,jitter=0.05']),
+	('wan', ['latency=10,jitter=3,distribution=normal']),
+	('lossy wan', ['latency=10,jitter=3,distribution=normal,drop=0.01,slow=0.02,slow-delay=200']),
+	('one far site', ['1:latency=40']),
+	('narrow links', ['latency=1,bandwidth=100000']),
+]
+
+def replay(fileName, links, batch, logDir) :
+
+	'''
+	args :
+	- fileName 					-		The input file to replay.
+	- links 					-		The specifications of the links (see NetworkProxy.parseLinks).
+	- batch 					-		True, if reads and writes are to be batched.
+	- logDir 					-		Directory for the output of the sites, the TM and the proxies.
+
+	This function returns the time taken by the replay of the input file against a new cluster, in seconds.
+	'''
+
+	with Launcher(10, 0, 0, logDir = logDir, links = parseLinks(links, 10)) as launcher :
+		stdout = sys.stdout
+		sys.stdout = open(os.devnull, 'w')
+		try :
+			start = time.time()
+			DES(fileName, batch, launcher.url())
+			return time.time() - start
+		finally :
+			sys.stdout.close()
+			sys.stdout = stdout
+
+if __name__ == '__main__' :
+	transactions = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+	workDir = tempfile.mkdtemp()
+	fileName = os.path.join(workDir, 'workload.txt')
+	lines = WorkloadGenerator(transactions = transactions, seed = 1).generate()
+	with open(fileName, 'w') as f :
+		f.write('\n'.join(lines) + '\n')
+
+	try :
+		print ("%-14s %-9s %10s %16s" % ('profile', 'batching', 'replay (s)', 'per request (ms)'))
+		for name, links in PROFILES :
+			for batch in (False, True) :
+				elapsed = replay(fileName, links, batch, workDir)
+				print ("%-14s %-9s %10.2f %16.2f" % (name, 'on' if batch else 'off', elapsed, elapsed * 1000 / len(lines)))
+	finally :
+		shutil.rmtree(workDir)
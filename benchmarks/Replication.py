@@ -0,0 +1,73 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+import os
+import sys
+import time
+import tempfile
+import xmlrpclib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from Launcher import Launcher
+
+'''
+Benchmark that measures the latency of writing and committing a replicated variable (x2, which resides on every
+ site) under available copies and under primary-copy replication, for clusters of a growing number of sites,
+ along with the time a read-only transaction that begins right after the commit waits for a replica to hold it.
+
+Usage : python Replication.py [repetitions]
+'''
+
+def writeLatency(transactionManager, repetitions, counter) :
+
+	'''
+	args :
+	- transactionManager 		-		Connection to the transaction manager.
+	- repetitions 				-		The number of transactions to time.
+	- counter 					-		List holding the next free transaction number.
+
+	This function commits 'repetitions' transactions that each write x2 once, and returns the median time taken
+	 by their write and their end together, and the median time taken by a read of x2 by a read-only transaction
+	 that begins right after each commit, in milliseconds.
+	'''
+
+	writes = []
+	reads = []
+
+	for r in range(repetitions) :
+		txnID = 'T%d' % counter[0]
+		readerID = 'T%d' % (counter[0] + 1)
+		counter[0] += 2
+
+		transactionManager.clockForward()
+		transactionManager.begin(txnID)
+		transactionManager.clockForward()
+		start = time.time()
+		transactionManager.write(txnID, 'x2', r)
+		transactionManager.clockForward()
+		transactionManager.end(txnID)
+		writes.append((time.time() - start) * 1000)
+
+		transactionManager.clockForward()
+		transactionManager.beginRO(readerID)
+		transactionManager.clockForward()
+		start = time.time()
+		transactionManager.read(readerID, 'x2')
+		reads.append((time.time() - start) * 1000)
+		transactionManager.clockForward()
+		transactionManager.end(readerID)
+
+	return sorted(writes)[len(writes) // 2], sorted(reads)[len(reads) // 2]
+
+
+if __name__ == '__main__' :
+	repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+	print ("%-6s %-17s %16s %16s" % ('sites', 'replication', 'write+end (ms)', 'RO read (ms)'))
+	for numSites in [2, 5, 10, 20] :
+		for replication in ['available-copies', 'primary-copy'] :
+			with Launcher(numSites, 0, 0, tempfile.mkdtemp(), {'replication': replication, 'snapshotCacheSize': 0}) as launcher :
+				transactionManager = xmlrpclib.ServerProxy(launcher.url(), allow_none = True)
+				write, read = writeLatency(transactionManager, repetitions, [1])
+				print ("%-6d %-17s %16.2f %16.2f" % (numSites, replication, write, read))
@@ -0,0 +1,71 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from Variable import Variable
+from VersionStore import VersionStore
+
+'''
+Benchmark that compares the time taken to read every variable as of some time, one Variable at a time (as a site
+ does without NumPy) and with a single vectorized lookup in VersionStore. Commits are spread at random over the
+ variables.
+
+Usage : python Snapshot.py [variables] [versions]
+'''
+
+def build(numVariables, numVersions, store) :
+
+	'''
+	args :
+	- numVariables 				-		The number of variables.
+	- numVersions 				-		The number of versions committed after the initial ones.
+	- store 					-		A VersionStore to be filled along with the variables, or None.
+
+	This function returns a list of variables with their committed versions.
+	'''
+
+	rng = random.Random(0)
+	variables = [Variable('x%d' % i, 10 * i) for i in range(1, numVariables + 1)]
+	if store :
+		for i in range(1, numVariables + 1) :
+			store.append(i, 0, 0, 10 * i)
+
+	for t in xrange(1, numVersions + 1) :
+		i = rng.randint(1, numVariables)
+		var = variables[i - 1]
+		writer = {'ID': 'T%d' % t}
+		var.write(writer, t)
+		var.commit(t, writer)
+		if store :
+			store.append(i, t, var.commitWriters[-1], t)
+
+	return variables
+
+if __name__ == '__main__' :
+	numVariables = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+	numVersions = int(sys.argv[2]) if len(sys.argv) > 2 else 1000000
+
+	store = VersionStore() if VersionStore.isAvailable() else None
+	variables = build(numVariables, numVersions, store)
+	asOf = numVersions // 2
+
+	start = time.time()
+	transaction = {'isRW': False, 'timeStamp': asOf}
+	for var in variables :
+		var.readVersion(transaction)
+	print ("%-30s %10.1f ms" % ('one Variable at a time', (time.time() - start) * 1000))
+
+	if store :
+		indices = range(1, numVariables + 1)
+		store.snapshotAt(asOf, indices)
+		start = time.time()
+		store.snapshotAt(asOf, indices)
+		print ("%-30s %10.1f ms" % ('VersionStore', (time.time() - start) * 1000))
+	else :
+		print ("%-30s %13s" % ('VersionStore', 'needs numpy'))
@@ -0,0 +1,24 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+import sys
+
+from Harness import workload, replay
+
+'''
+Benchmark that compares the throughput and the abort rate of read-write transactions under strict two-phase locking
+ and under snapshot isolation, on workloads from WorkloadGenerator with an increasing share of reads.
+
+Usage : python SnapshotIsolation.py [transactions]
+'''
+
+if __name__ == '__main__' :
+	transactions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+	print ("%-10s %-13s %10s %10s %10s %14s %12s" % ('reads', 'isolation', 'committed', 'aborted', 'waits', 'commits/sec', 'abort rate'))
+	for readRatio in [0.5, 0.8, 0.95] :
+		fileName = workload('medium', transactions = transactions, concurrency = 5, operations = 6, readRatio = readRatio)
+		for isolation in ['serializable', 'snapshot'] :
+			elapsed, statistics, output = replay(fileName, isolation = isolation)
+			finished = statistics['committed'] + statistics['aborted']
+			print ("%-10.2f %-13s %10d %10d %10d %14.1f %12.3f" % (readRatio, isolation, statistics['committed'], statistics['aborted'], output.count('Waitlisted'), statistics['committed'] / elapsed, statistics['aborted'] / float(finished or 1)))
@@ -0,0 +1,56 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+import os
+import sys
+import tempfile
+import xmlrpclib
+
+from Harness import replayInto
+from Launcher import Launcher
+from WorkloadGenerator import WorkloadGenerator
+
+'''
+Soak benchmark that keeps a single cluster running for a long workload from WorkloadGenerator, replayed in
+ segments. After every segment, it reports the resident memory of the TM process along with the amount of
+ state held by the TM, which should stay flat however many transactions have been run.
+
+Usage : python Soak.py [transactions] [segments]
+'''
+
+def residentMemory(pid) :
+
+	'''
+	args :
+	- pid 						-		The process ID of the TM.
+
+	This function returns the resident memory of a process in kB, as reported by /proc.
+	'''
+
+	with open('/proc/%d/status' % pid) as f :
+		for line in f :
+			if line.startswith('VmRSS:') :
+				return int(line.split()[1])
+
+if __name__ == '__main__' :
+	transactions = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+	segments = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+	lines = WorkloadGenerator(transactions, concurrency = 5, operations = 4, hotVariables = 4, hotProbability = 0.5).generate()
+	size = (len(lines) + segments - 1) // segments
+
+	with Launcher(10, 0, 0, tempfile.mkdtemp()) as launcher :
+		# The TM is the last child to be forked
+		tmPid = launcher._children[-1]
+		TM = xmlrpclib.ServerProxy(launcher.url(), allow_none = True)
+
+		print ("%8s %10s %10s %10s %12s %10s %14s" % ('segment', 'committed', 'aborted', 'RSS (kB)', 'transactions', 'waitlist', 'conflict graph'))
+		for i in range(segments) :
+			fileName = tempfile.mktemp(suffix = '.txt')
+			with open(fileName, 'w') as f :
+				f.write('\n'.join(lines[i * size : (i + 1) * size]) + '\n')
+			replayInto(fileName, launcher.url())
+			os.remove(fileName)
+
+			statistics = TM.statistics()
+			print ("%8d %10d %10d %10d %12d %10d %14d" % (i + 1, statistics['committed'], statistics['aborted'], residentMemory(tmPid), statistics['transactions'], statistics['waitlist'], statistics['conflictGraph']))
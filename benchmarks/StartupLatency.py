@@ -0,0 +1,107 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+import os
+import sys
+import time
+import socket
+import tempfile
+import subprocess
+import xmlrpclib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from Launcher import Launcher
+
+'''
+Benchmark that measures the time from starting a cluster to the first transaction being accepted by the TM.
+ It compares starting every site and the TM as a separate interpreter (as Start.sh and run-simulation.sh do,
+ without their fixed 2 second sleep, by polling until the TM answers) against Launcher, which forks them from
+ one process that has already imported everything and waits on their readiness reports.
+
+Usage : python StartupLatency.py [repetitions]
+'''
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+def firstTransaction(url) :
+
+	'''
+	args :
+	- url 					-		The URL of the TM.
+
+	This function begins a transaction and returns once the TM has accepted it, retrying while nothing is
+	 listening yet.
+	'''
+
+	while True :
+		try :
+			transactionManager = xmlrpclib.ServerProxy(url, allow_none = True)
+			transactionManager.clockForward()
+			transactionManager.begin('T1')
+			return
+		except socket.error :
+			time.sleep(0.005)
+
+def separateInterpreters(sitePort, tmPort) :
+
+	'''
+	args :
+	- sitePort 				-		The port of site 1.
+	- tmPort 				-		The port of the TM.
+
+	This function starts every site and the TM as its own interpreter and returns the time, in seconds, until the
+	 first transaction is accepted.
+	'''
+
+	devnull = open(os.devnull, 'w')
+	start = time.time()
+
+	processes = [subprocess.Popen([sys.executable, 'Site.py', str(i), str(sitePort + i - 1)], cwd = SRC, stdout = devnull, stderr = devnull) for i in range(1, 11)]
+	# The TM does not connect to the sites until it is asked to, so it is started right away, as in run-simulation.sh
+	processes.append(subprocess.Popen([sys.executable, '-c', 'from TransactionManager import TransactionManager; TransactionManager(%d, range(%d, %d))' % (tmPort, sitePort, sitePort + 10)], cwd = SRC, stdout = devnull, stderr = devnull))
+	# Wait for the sites too, since the first read or write would need them
+	for i in range(10) :
+		while True :
+			try :
+				socket.create_connection(('localhost', sitePort + i)).close()
+				break
+			except socket.error :
+				time.sleep(0.005)
+	firstTransaction('http://localhost:%d' % tmPort)
+	elapsed = time.time() - start
+
+	for process in processes :
+		process.kill()
+		process.wait()
+
+	return elapsed
+
+def launcher() :
+
+	'''
+	This function starts the cluster with Launcher and returns the time, in seconds, until the first transaction
+	 is accepted.
+	'''
+
+	cluster = Launcher(10, 0, 0, tempfile.mkdtemp())
+	start = time.time()
+	try :
+		cluster.start()
+		firstTransaction(cluster.url())
+		elapsed = time.time() - start
+	finally :
+		cluster.stop()
+
+	return elapsed
+
+if __name__ == '__main__' :
+	repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+	legacy = sorted(separateInterpreters(19090 + 20 * r, 17777 + r) for r in range(repetitions))
+	forked = sorted(launcher() for r in range(repetitions))
+
+	print ("%-40s %12s %12s" % ('startup to first transaction', 'p50 (ms)', 'max (ms)'))
+	print ("%-40s %12.1f %12.1f" % ('separate interpreters (polling)', legacy[len(legacy) // 2] * 1000, legacy[-1] * 1000))
+	print ("%-40s %12.1f %12.1f" % ('separate interpreters (run-simulation.sh)', 2000 + legacy[len(legacy) // 2] * 1000, 2000 + legacy[-1] * 1000))
+	print ("%-40s %12.1f %12.1f" % ('Launcher', forked[len(forked) // 2] * 1000, forked[-1] * 1000))
@@ -0,0 +1,56 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import Trace
+from WorkloadGenerator import WorkloadGenerator
+
+'''
+Benchmark that compares the time the simulator spends turning requests into (method, arguments) pairs when
+ reading an input file and when reading the binary trace compiled from it, without a cluster. It also reports
+ the time taken by a random access to the middle of the binary trace.
+
+Usage : python TraceParsing.py [transactions]
+'''
+
+if __name__ == '__main__' :
+	transactions = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+	textFileName = tempfile.mktemp(suffix = '.txt')
+	traceFileName = tempfile.mktemp(suffix = '.bin')
+	WorkloadGenerator(transactions).write(textFileName)
+	count = Trace.compileTrace(textFileName, traceFileName)
+
+	start = time.time()
+	with open(textFileName) as f :
+		for request in f.readlines() :
+			request = request.strip()
+			if request :
+				command = request.strip().strip(')').split('(')
+				method, arguments = command[0], command[1].split(',')
+	textTime = time.time() - start
+
+	start = time.time()
+	reader = Trace.TraceReader(traceFileName)
+	for method, arguments in Trace.requests(reader) :
+		pass
+	traceTime = time.time() - start
+
+	start = time.time()
+	next(reader.records(count // 2))
+	seekTime = time.time() - start
+	reader.close()
+
+	print ("%d requests" % count)
+	print ("%-28s %10.1f ms" % ('input file', textTime * 1000))
+	print ("%-28s %10.1f ms" % ('binary trace', traceTime * 1000))
+	print ("%-28s %10.3f ms" % ('start at the middle tick', seekTime * 1000))
+
+	os.remove(textFileName)
+	os.remove(traceFileName)
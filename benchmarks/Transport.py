@@ -0,0 +1,72 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+import os
+import sys
+import time
+import xmlrpclib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from Launcher import Launcher
+from Transaction import Transaction
+
+'''
+Benchmark that compares the round-trip latency of the requests of the TM to a client site over XML-RPC and over
+ a shared-memory channel (SharedMemory.py). A single site is forked as Launcher forks it, and this process plays
+ the part of the TM, timing Site.read, Site.write and Site.commit one request at a time.
+
+Usage : python Transport.py [requests]
+'''
+
+def percentile(samples, p) :
+	samples = sorted(samples)
+	return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+def measure(transport, requests) :
+
+	'''
+	args :
+	- transport 				-		One of Launcher.TRANSPORTS.
+	- requests 					-		The number of requests of each kind.
+
+	This function returns a dictionary mapping 'read', 'write' and 'commit' to the latencies of their requests, in seconds.
+	'''
+
+	launcher = Launcher(1, 0, 0, transport = transport)
+	try :
+		port = launcher._waitReady(launcher._fork(launcher._startSite, 1, 'site1'))
+		if launcher.channels :
+			site = launcher.channels[1]
+			site.attach('tm')
+		else :
+			site = xmlrpclib.ServerProxy('http://localhost:%d' % port, allow_none = True)
+
+		latencies = {'read': [], 'write': [], 'commit': []}
+		for i in range(1, requests + 1) :
+			transaction = Transaction('T%d' % i, i).toStruct()
+
+			start = time.time()
+			site.read(transaction, 'x2')
+			latencies['read'].append(time.time() - start)
+
+			start = time.time()
+			site.write(transaction, 'x2', i)
+			latencies['write'].append(time.time() - start)
+
+			start = time.time()
+			site.commit(transaction, i)
+			latencies['commit'].append(time.time() - start)
+
+		return latencies
+	finally :
+		launcher.stop()
+
+if __name__ == '__main__' :
+	requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+	print ("%-14s %-8s %10s %10s" % ('transport', 'request', 'p50 (us)', 'p99 (us)'))
+	for transport in Launcher.TRANSPORTS :
+		latencies = measure(transport, requests)
+		for request in ('read', 'write', 'commit') :
+			print ("%-14s %-8s %10.1f %10.1f" % (transport, request, percentile(latencies[request], 0.5) * 1e6, percentile(latencies[request], 0.99) * 1e6))
@@ -0,0 +1,97 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from Variable import Variable
+
+'''
+Benchmark that measures the memory taken per committed version of a variable, for the layout of Variable
+ (typed arrays of commit times, interned committing transactions and values) and for the layout it replaced
+ (a list holding one [time of commit, (committing transaction, value)] list per version). Every transaction
+ commits 'perTransaction' versions, as a transaction commits every variable it wrote to on a site.
+
+Usage : python VersionMemory.py [versions] [perTransaction]
+'''
+
+def residentMemory() :
+
+	'''
+	This function returns the resident memory of this process in bytes, as reported by /proc.
+	'''
+
+	with open('/proc/self/status') as f :
+		for line in f :
+			if line.startswith('VmRSS:') :
+				return int(line.split()[1]) * 1024
+
+def buildList(versions, perTransaction) :
+
+	'''
+	args :
+	- versions 					-		The number of versions to commit.
+	- perTransaction 			-		The number of versions committed by each transaction.
+
+	This function builds the history of a variable in the layout that Variable used to have.
+	'''
+
+	committedValues = [(0, ('default', 10))]
+	for t in xrange(1, versions + 1) :
+		committedValues.append([t, ('T%d' % (t // perTransaction), t)])
+	return committedValues
+
+def buildVariable(versions, perTransaction) :
+
+	'''
+	args :
+	- versions 					-		The number of versions to commit.
+	- perTransaction 			-		The number of versions committed by each transaction.
+
+	This function builds the history of a variable through Variable.write and Variable.commit.
+	'''
+
+	var = Variable('x1', 10)
+	for t in xrange(1, versions + 1) :
+		writer = {'ID': 'T%d' % (t // perTransaction)}
+		var.write(writer, t)
+		var.commit(t, writer)
+	return var
+
+def measure(build, versions, perTransaction) :
+
+	'''
+	args :
+	- build 					-		The function building a history.
+	- versions 					-		The number of versions to commit.
+	- perTransaction 			-		The number of versions committed by each transaction.
+
+	This function builds a history in a forked child, so that every layout starts from the same heap, and
+	 returns the growth of the resident memory of the child per version.
+	'''
+
+	readEnd, writeEnd = os.pipe()
+	pid = os.fork()
+
+	if pid == 0 :
+		os.close(readEnd)
+		before = residentMemory()
+		history = build(versions, perTransaction)
+		os.write(writeEnd, str(residentMemory() - before))
+		os._exit(0)
+
+	os.close(writeEnd)
+	growth = int(os.read(readEnd, 64))
+	os.close(readEnd)
+	os.waitpid(pid, 0)
+	return growth / float(versions)
+
+if __name__ == '__main__' :
+	versions = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+	perTransaction = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+	print ("%-30s %18s" % ('layout', 'bytes per version'))
+	print ("%-30s %18.1f" % ('list of [time, (txn, value)]', measure(buildList, versions, perTransaction)))
+	print ("%-30s %18.1f" % ('Variable (typed arrays)', measure(buildVariable, versions, perTransaction)))
@@ -0,0 +1,47 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+import re
+import sys
+
+from Harness import workload, replay
+
+'''
+Benchmark that compares the tail latency of transactions under each waitlist policy of the TM, on workloads with
+ enough contention for requests to queue up in the waitlist. The latency of a transaction is the number of clock
+ ticks from its begin to its commit, read from the output of the simulator.
+
+Usage : python WaitlistPolicies.py [transactions]
+'''
+
+POLICIES = ['fifo', 'oldest', 'fewest-locks', 'ro-first']
+
+BEGAN = re.compile(r'Began (?:read-only )?Tx (\S+) with time_stamp (\d+)')
+ENDED = re.compile(r'Ended Tx (\S+) at time_stamp (\d+)')
+
+def latencies(output) :
+
+	'''
+	args :
+	- output 					-		The output of the simulator for a whole replay.
+
+	This function returns the sorted latencies, in clock ticks, of the transactions that committed.
+	'''
+
+	began = dict((txnID, int(tick)) for txnID, tick in BEGAN.findall(output))
+	return sorted(int(tick) - began[txnID] for txnID, tick in ENDED.findall(output) if txnID in began)
+
+def percentile(values, p) :
+	return values[min(len(values) - 1, int(p * len(values)))] if values else 0
+
+
+if __name__ == '__main__' :
+	transactions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+	print ("%-10s %-13s %10s %10s %8s %8s %8s" % ('contention', 'policy', 'committed', 'aborted', 'p50', 'p95', 'p99'))
+	for contention in ['medium', 'high'] :
+		fileName = workload(contention, transactions = transactions, concurrency = 8, operations = 6, readRatio = 0.6, readOnlyRatio = 0.25)
+		for policy in POLICIES :
+			elapsed, statistics, output = replay(fileName, waitlistPolicy = policy)
+			ticks = latencies(output)
+			print ("%-10s %-13s %10d %10d %8d %8d %8d" % (contention, policy, statistics['committed'], statistics['aborted'], percentile(ticks, 0.5), percentile(ticks, 0.95), percentile(ticks, 0.99)))
@@ -0,0 +1,255 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+import sys
+import time
+import struct
+import argparse
+from array import array
+from itertools import izip
+
+'''
+Bulk loading of the initial values of the variables, in place of the values 10*i of x1, ..., x20 that a site starts
+ with otherwise. The values are read from a CSV file of 'xi,value' (or 'i,value') lines, or from the binary form of
+ such a file, and split among the sites by the placement rules of the cluster : even-indexed variables on every
+ site, xi for odd i on site 1 + (i mod number of sites) alone. Launcher loads the file once, before it forks the
+ sites, so that each site starts serving with its share of the variables (see Site, VariableTable) and the share
+ of the even-indexed variables, the same for every site, is not copied per site.
+
+Binary form : header (magic 'RCBL', format version, number of variables), then chunks of at most CHUNK variables,
+ each holding the indices of its variables (unsigned 32-bit) followed by their values (signed 64-bit), in the byte
+ order of the machine. A chunk is read with two array.fromfile calls.
+
+Usage : python2 BulkLoader.py compile data.csv data.bin
+        python2 BulkLoader.py generate 10000000 data.bin
+        python2 BulkLoader.py split data.bin [--sites N]
+'''
+
+MAGIC = 'RCBL'
+VERSION = 1
+HEADER = struct.Struct('=4sHxxI')
+CHUNK = 1 << 16
+
+class LoadException(Exception) :
+
+	'''
+	Class used to raise an exception when a data file cannot be read or split.
+	'''
+
+def readCSV(fileName) :
+
+	'''
+	args :
+	- fileName 					-		A CSV file of 'xi,value' or 'i,value' lines. Blank lines are skipped.
+
+	This function yields the (indices, values) arrays of the variables of a CSV file, CHUNK variables at a time.
+	'''
+
+	indices, values = array('I'), array('l')
+
+	with open(fileName) as f :
+		for lineNumber, line in enumerate(f, 1) :
+			line = line.strip()
+			if not line :
+				continue
+			try :
+				var, value = line.split(',')
+				var = var.strip()
+				indices.append(int(var[1:] if var.startswith('x') else var))
+				values.append(int(value))
+			except (ValueError, OverflowError) :
+				raise LoadException('line %d : expected xi,value, found %r' % (lineNumber, line))
+
+			if len(indices) == CHUNK :
+				yield indices, values
+				indices, values = array('I'), array('l')
+
+	if indices :
+		yield indices, values
+
+def readBinary(fileName) :
+
+	'''
+	args :
+	- fileName 					-		A data file in binary form.
+
+	This function yields the (indices, values) arrays of the variables of a binary data file, chunk by chunk.
+	'''
+
+	with open(fileName, 'rb') as f :
+		magic, version, count = HEADER.unpack(f.read(HEADER.size))
+		if magic != MAGIC or version != VERSION :
+			raise LoadException('%s is not a data file of version %d' % (fileName, VERSION))
+
+		while count :
+			size = min(count, CHUNK)
+			indices, values = array('I'), array('l')
+			try :
+				indices.fromfile(f, size)
+				values.fromfile(f, size)
+			except EOFError :
+				raise LoadException('%s is truncated' % fileName)
+			count -= size
+			yield indices, values
+
+def isBinary(fileName) :
+
+	'''
+	args :
+	- fileName 					-		A data file, in CSV or binary form.
+
+	This function is called inside read. It returns True if the data file starts with MAGIC, i.e. is in binary form.
+	'''
+
+	with open(fileName, 'rb') as f :
+		return f.read(len(MAGIC)) == MAGIC
+
+def read(fileName) :
+
+	'''
+	args :
+	- fileName 					-		A data file, in CSV or binary form.
+
+	This function yields the (indices, values) arrays of the variables of a data file, chunk by chunk.
+	'''
+
+	return readBinary(fileName) if isBinary(fileName) else readCSV(fileName)
+
+def write(fileName, chunks) :
+
+	'''
+	args :
+	- fileName 					-		The binary data file to be written.
+	- chunks 					-		Iterable of (indices, values) arrays of at most CHUNK variables each.
+
+	This function writes a binary data file and returns the number of variables written.
+	'''
+
+	count = 0
+
+	with open(fileName, 'wb') as f :
+		f.write(HEADER.pack(MAGIC, VERSION, 0))
+		for indices, values in chunks :
+			indices.tofile(f)
+			values.tofile(f)
+			count += len(indices)
+		f.seek(0)
+		f.write(HEADER.pack(MAGIC, VERSION, count))
+
+	return count
+
+def generate(count) :
+
+	'''
+	args :
+	- count 					-		The number of variables.
+
+	This function yields the chunks of x1, ..., x{count} with the values 10*i that the sites start with by default.
+	'''
+
+	for first in xrange(1, count + 1, CHUNK) :
+		last = min(first + CHUNK, count + 1)
+		yield array('I', xrange(first, last)), array('l', xrange(10 * first, 10 * last, 10))
+
+def split(chunks, numSites) :
+
+	'''
+	args :
+	- chunks 					-		Iterable of (indices, values) arrays, as yielded by read.
+	- numSites 					-		The number of client sites.
+
+	This function is called inside Launcher.start. It splits the variables among the sites as they are read and
+	 returns a dictionary mapping every site ID to its partitions, a list of (indices, values) arrays sorted by index
+	 (see VariableTable) : the even-indexed variables, the same arrays for every site, and the odd-indexed variables
+	 of the site. The site of an odd index i only depends on i mod numSites, so the sites of the numSites residues
+	 are computed once. Variables are expected in increasing order of index, as written by 'compile' and 'generate';
+	 otherwise, each partition is sorted once loaded, which takes longer. A LoadException is raised for an index
+	 given twice, or for x0.
+	'''
+
+	siteOf = [1 + (r % numSites) for r in range(numSites)]
+	evens = (array('I'), array('l'))
+	odds = dict((siteID, (array('I'), array('l'))) for siteID in range(1, numSites + 1))
+	last = 0
+	ordered = True
+
+	for indices, values in chunks :
+		for index, value in izip(indices, values) :
+			if index <= last :
+				ordered = False
+			last = index
+			if index & 1 :
+				partition = odds[siteOf[index % numSites]]
+			else :
+				partition = evens
+			partition[0].append(index)
+			partition[1].append(value)
+
+	if not ordered :
+		evens = _sort(evens)
+		odds = dict((siteID, _sort(partition)) for siteID, partition in odds.iteritems())
+		for indices, values in [evens] + odds.values() :
+			for k in xrange(len(indices) - 1) :
+				if indices[k] == indices[k + 1] :
+					raise LoadException('x%d is given twice' % indices[k])
+
+	if evens[0] and evens[0][0] == 0 :
+		raise LoadException('x0 is not a variable')
+
+	return dict((siteID, [evens, odds[siteID]]) for siteID in odds)
+
+def _sort(partition) :
+
+	'''
+	args :
+	- partition 				-		An (indices, values) pair of arrays, in any order of index.
+
+	This function is called inside split when the variables were not read in increasing order of index. It returns
+	 new arrays holding the same variables, sorted by index.
+	'''
+
+	order = sorted(xrange(len(partition[0])), key = partition[0].__getitem__)
+	return array('I', (partition[0][k] for k in order)), array('l', (partition[1][k] for k in order))
+
+def load(fileName, numSites) :
+
+	'''
+	args :
+	- fileName 					-		A data file, in CSV or binary form.
+	- numSites 					-		The number of client sites.
+
+	This function reads a data file and splits it among the sites (see split).
+	'''
+
+	return split(read(fileName), numSites)
+
+
+if __name__ == '__main__' :
+	parser = argparse.ArgumentParser(description = 'Prepare data files holding the initial values of the variables.')
+	subparsers = parser.add_subparsers(dest = 'command')
+	compileParser = subparsers.add_parser('compile', help = 'Compile a CSV file into a binary data file.')
+	compileParser.add_argument('csvFileName')
+	compileParser.add_argument('outputFileName')
+	generateParser = subparsers.add_parser('generate', help = 'Write a binary data file of x1, ..., xN with the values 10*i.')
+	generateParser.add_argument('count', type = int)
+	generateParser.add_argument('outputFileName')
+	splitParser = subparsers.add_parser('split', help = 'Load a data file and report the share of every site.')
+	splitParser.add_argument('dataFileName')
+	splitParser.add_argument('--sites', type = int, default = 10, help = 'The number of client sites (default: 10).')
+	args = parser.parse_args()
+
+	try :
+		if args.command == 'compile' :
+			print ('Compiled %d variables into %s' % (write(args.outputFileName, readCSV(args.csvFileName)), args.outputFileName))
+		elif args.command == 'generate' :
+			print ('Wrote %d variables into %s' % (write(args.outputFileName, generate(args.count)), args.outputFileName))
+		else :
+			start = time.time()
+			shares = load(args.dataFileName, args.sites)
+			elapsed = time.time() - start
+			for siteID, partitions in sorted(shares.iteritems()) :
+				print ('site %d : %d variables' % (siteID, sum(len(indices) for indices, values in partitions)))
+			print ('Loaded and split in %.2f s' % elapsed)
+	except LoadException as e :
+		print ('LoadException: %s' % e)
+		sys.exit(1)
@@ -0,0 +1,181 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+import sys
+import time
+import pprint
+import argparse
+import xmlrpclib
+from bisect import bisect_right
+
+'''
+Log of the versions committed by read-write transactions, kept at the TM for the consumers that watch variables
+ (see TransactionManager.watch) instead of polling dump(). A consumer reads the events committed after a cursor,
+ the time of commit of the last event it has seen, so that it can stop and resume from where it left off.
+
+Usage : python2 ChangeLog.py [--tm URL] [--from T] [--interval S] [x1 x4:x9 ...]
+'''
+
+class ChangeLog(object) :
+
+	'''
+	Class that will serve as a bounded log of committed versions, in order of their time of commit, as events
+	 [varID, value, time of commit, txnID]. Once it holds more than ChangeLog.capacity events, the oldest ones are
+	 dropped, so that a consumer that falls too far behind is told that it has missed some events (and can read the
+	 whole database at its cursor with TransactionManager.snapshotAt) rather than the TM buffering them for it.
+	'''
+
+	def __init__(self, capacity = 4096) :
+
+		'''
+		args :
+		- capacity 				-		The largest number of events held.
+
+		Constructor to initialize all data members of ChangeLog class.
+
+		Data members :
+
+		- capacity 				-		The largest number of events held.
+		- _timeStamps 			-		List of the times of commit of the events held, in order.
+		- _events 				-		List of the events held, in the same order.
+		- _truncatedAt 			-		The time of commit of the last event dropped, 0 if none has been. Consumers whose
+										 cursor is older have missed events.
+		'''
+
+		self.capacity = capacity
+		self._timeStamps = []
+		self._events = []
+		self._truncatedAt = 0
+
+	def __len__(self) :
+
+		'''
+		This function returns the number of events held, at most ChangeLog.capacity.
+		'''
+
+		return len(self._events)
+
+	def append(self, timeStamp, txnID, writes) :
+
+		'''
+		args :
+		- timeStamp 			-		The time at which the transaction committed.
+		- txnID 				-		The ID of the transaction.
+		- writes 				-		Dictionary of the values committed by the transaction, where the keys are variable IDs.
+
+		This function is called inside TransactionManager.end and TransactionManager._commitGroup once a transaction has
+		 committed at every site it wrote to.
+		'''
+
+		for var in sorted(writes, key = lambda var : int(var[1:])) :
+			self._timeStamps.append(timeStamp)
+			self._events.append([var, writes[var], timeStamp, txnID])
+
+		if len(self._events) > self.capacity :
+			drop = len(self._events) - self.capacity
+			self._truncatedAt = self._timeStamps[drop - 1]
+			del self._timeStamps[:drop]
+			del self._events[:drop]
+
+	def lastTimeStamp(self) :
+
+		'''
+		This function is called inside TransactionManager.watch. It returns the time of commit of the last event logged,
+		 or of the last event dropped if none is held, so that a new watch is sent every event logged after it.
+		'''
+
+		return self._timeStamps[-1] if self._timeStamps else self._truncatedAt
+
+	def since(self, cursor, matches = None, limit = None) :
+
+		'''
+		args :
+		- cursor 				-		The time of commit of the last event seen by the consumer.
+		- matches 				-		Function telling whether a variable ID is watched, or None for all variables.
+		- limit 				-		The number of events after which to stop, or None for no limit. The events of a
+										 time of commit are never split, so that the cursor returned can be resumed from.
+
+		This function is called inside TransactionManager.changes. It returns the events committed after 'cursor' as a
+		 dictionary holding the list of the events ('events'), the cursor to resume from ('cursor'), whether some events
+		 after 'cursor' have been dropped from the log ('truncated') and whether further events are left ('more').
+		'''
+
+		events = []
+		i = bisect_right(self._timeStamps, cursor)
+		more = False
+		truncated = cursor < self._truncatedAt
+
+		while i < len(self._events) :
+			if limit is not None and len(events) >= limit and self._timeStamps[i] != events[-1][2] :
+				more = True
+				break
+			if matches is None or matches(self._events[i][0]) :
+				events.append(self._events[i])
+			i += 1
+
+		if i :
+			cursor = max(cursor, self._timeStamps[i - 1])
+
+		return {'events': events, 'cursor': cursor, 'truncated': truncated, 'more': more}
+
+def variableMatcher(variables) :
+
+	'''
+	args :
+	- variables 			-		List of variable IDs ('x3') and ranges of variables ('x3:x8', both ends included). An
+									 empty list, or None, watches every variable.
+
+	This function is called inside TransactionManager.watch. It returns a function telling whether a variable ID is
+	 watched, or None if every variable is. A ValueError is raised for an entry that is neither.
+	'''
+
+	if not variables :
+		return None
+
+	names = set()
+	ranges = []
+
+	for entry in variables :
+		bounds = entry.split(':')
+		if len(bounds) > 2 or not all(bound.startswith('x') and bound[1:].isdigit() for bound in bounds) :
+			raise ValueError('Expected a variable (x3) or a range of variables (x3:x8), found %r' % entry)
+		if len(bounds) == 1 :
+			names.add(entry)
+		else :
+			ranges.append((int(bounds[0][1:]), int(bounds[1][1:])))
+
+	return lambda var : var in names or any(first <= int(var[1:]) <= last for first, last in ranges)
+
+
+if __name__ == '__main__' :
+	parser = argparse.ArgumentParser(description = 'Print the versions committed to some variables as they are committed.')
+	parser.add_argument('variables', nargs = '*', help = 'Variables (x3) or ranges of variables (x3:x8) to watch (default: all).')
+	parser.add_argument('--tm', default = 'http://localhost:7777', help = 'The URL of the TM (default: http://localhost:7777).')
+	parser.add_argument('--from', dest = 'fromTimeStamp', type = int, default = None, metavar = 'T', help = 'Resume after the versions committed up to time T.')
+	parser.add_argument('--interval', type = float, default = 0.5, help = 'Seconds to wait when there is nothing new (default: 0.5).')
+	args = parser.parse_args()
+
+	transactionManager = xmlrpclib.ServerProxy(args.tm, allow_none = True)
+	cursor = args.fromTimeStamp
+	watchID = transactionManager.watch(args.variables, cursor)
+
+	try :
+		while True :
+			try :
+				changes = transactionManager.changes(watchID)
+			except xmlrpclib.Fault :
+				# The watch was forgotten by the TM while this process was stopped : resume from where it left off
+				watchID = transactionManager.watch(args.variables, cursor)
+				continue
+			cursor = changes['cursor']
+			if changes['truncated'] :
+				print ('Missed some changes; the database at time %d :' % changes['cursor'])
+				pprint.pprint(transactionManager.snapshotAt(changes['cursor']))
+			else :
+				for var, value, timeStamp, txnID in changes['events'] :
+					print ('%s = %s, committed by %s at time %d' % (var, value, txnID, timeStamp))
+			sys.stdout.flush()
+			if not changes['more'] :
+				time.sleep(args.interval)
+	except KeyboardInterrupt :
+		transactionManager.unwatch(watchID)
@@ -0,0 +1,347 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+import os
+import sys
+import signal
+import argparse
+import threading
+import traceback
+
+import BulkLoader
+
+from Site import Site
+from SharedMemory import Channel
+from NetworkProxy import NetworkProxy, parseLinks
+from TransactionManager import TransactionManager
+from Simulator import DES, SimulationException
+
+class LaunchException(Exception) :
+
+	'''
+	Class used to raise an exception when a client site or the TM could not be started.
+	'''
+
+class Launcher(object) :
+
+	'''
+	Class that will start a whole cluster (the client sites and the TM) from a single Python process.
+	Every site and the TM is forked from this process, which has already imported all of our modules, so that no
+	 interpreter has to be started per site. Instead of sleeping and hoping that every server is listening, each child
+	 reports back over a pipe once its server has been created (its port bound and listening) or once it has failed
+	 to do so. Every child also watches a pipe held open by this process, and exits once it is closed, so that the
+	 cluster goes away with this process even if it dies without stopping it.
+	'''
+
+	# How the TM sends its requests to the client sites
+	TRANSPORTS = ('xmlrpc', 'shared-memory')
+
+	def __init__(self, numSites = 10, sitePort = 9090, tmPort = 7777, logDir = None, tmOptions = None, transport = 'xmlrpc', dataFile = None, links = None) :
+
+		'''
+		args :
+		- numSites 				-		The number of client sites to start.
+		- sitePort 				-		The port of site 1; site i listens on sitePort + i - 1. If 0, every site listens on
+										 a free port picked by the OS.
+		- tmPort 				-		The port of the TM. If 0, a free port is picked by the OS.
+		- logDir 				-		Directory in which to write the output of each site (site1.txt, ...) and of the TM
+										 (tm.txt). If None, the output goes wherever the output of this process goes.
+		- tmOptions 			-		Dictionary of further keyword arguments for the TransactionManager constructor. The sites
+										 are given its 'concurrencyControl' and 'replication' too, which must be the same across the cluster,
+										 and its 'traceFile'.
+		- transport 			-		One of Launcher.TRANSPORTS : 'xmlrpc' for XML-RPC over TCP loopback; 'shared-memory' for
+										 a SharedMemory.Channel between the TM and each site, created here before they are forked.
+		- dataFile 				-		A data file of the initial values of the variables (see BulkLoader.py), loaded once the
+										 cluster is started. If None, the sites start with the values 10*i of x1, ..., x20.
+		- links 				-		Dictionary of NetworkProxy.Link objects, where the keys are site IDs : the TM reaches each
+										 of these sites through a NetworkProxy over its link, forked once the sites are started.
+										 Only over XML-RPC.
+
+		Constructor to initialize all data members of Launcher class.
+
+		Data members :
+
+		- numSites 				-		The number of client sites.
+		- sitePorts 			-		List of the ports at which the sites listen, in the order of their site IDs.
+		- tmPort 				-		The port at which the TM listens.
+		- logDir 				-		Directory for the output of the children.
+		- tmOptions 			-		Keyword arguments for the TransactionManager constructor.
+		- channels 				-		Dictionary of the shared-memory channels to the sites, where the keys are their site IDs.
+										 Empty, over XML-RPC.
+		- dataFile 				-		The data file of the initial values of the variables, or None.
+		- links 				-		Dictionary of the links to the sites reached through a proxy.
+		- proxyPorts 			-		Dictionary of the ports at which the proxies listen, where the keys are site IDs.
+		- _siteData 			-		Dictionary of the partitions of the variables of every site, where the keys are their site
+										 IDs (see BulkLoader.split), held from the loading of the data file until the sites are forked.
+		- _children 			-		List of the process IDs of the forked children.
+		- _lifeline 			-		The pipe (read end, write end) whose write end is only held by this process : every
+										 child exits once it reads the end of the pipe. None, until the cluster is started.
+		'''
+
+		if links and transport != 'xmlrpc' :
+			raise ValueError('Links can only be simulated over XML-RPC')
+
+		self.numSites = numSites
+		self.sitePorts = [sitePort + i if sitePort else 0 for i in range(numSites)]
+		self.tmPort = tmPort
+		self.logDir = logDir
+		self.tmOptions = tmOptions or {}
+		self.channels = dict((i + 1, Channel()) for i in range(numSites)) if transport == 'shared-memory' else {}
+		self.dataFile = dataFile
+		self.links = links or {}
+		self.proxyPorts = {}
+		self._siteData = {}
+		self._children = []
+		self._lifeline = None
+
+	def start(self) :
+
+		'''
+		This function forks all the client sites, waits until every one of them is listening, forks a proxy for each site
+		 given a link, and then forks the TM (which needs to know the ports of the sites, or of their proxies) and waits
+		 for it as well. If any child fails to start, every child
+		 that has been started is stopped and a LaunchException is raised.
+		Once the TM has been forked, this process lets go of the shared-memory channels, which only the TM and the sites use.
+		The data file, if any, is loaded and split here before the sites are forked, so that every site inherits its share
+		 and the even-indexed variables are held once in memory until a site writes to the pages holding them.
+		'''
+
+		lifeline = self._lifeline = os.pipe()
+
+		try :
+			if self.dataFile :
+				self._siteData = BulkLoader.load(self.dataFile, self.numSites)
+
+			pipes = []
+			for i in range(self.numSites) :
+				pipes.append(self._fork(self._startSite, i + 1, 'site%d' % (i + 1)))
+
+			for i, pipe in enumerate(pipes) :
+				self.sitePorts[i] = self._waitReady(pipe)
+			self._siteData = {}
+
+			for siteID in sorted(self.links) :
+				self.proxyPorts[siteID] = self._waitReady(self._fork(self._startProxy, siteID, 'proxy%d' % siteID))
+
+			self.tmPort = self._waitReady(self._fork(self._startTransactionManager, None, 'tm'))
+		except :
+			self.stop()
+			raise
+		finally :
+			for channel in self.channels.itervalues() :
+				channel.close()
+			os.close(lifeline[0])
+
+		return self
+
+	def stop(self) :
+
+		'''
+		This function stops every child that has been started and waits for them to exit.
+		'''
+
+		for pid in self._children :
+			try :
+				os.kill(pid, signal.SIGTERM)
+			except OSError :
+				pass
+
+		for pid in self._children :
+			try :
+				os.waitpid(pid, 0)
+			except OSError :
+				pass
+
+		self._children = []
+
+		if self._lifeline :
+			os.close(self._lifeline[1])
+			self._lifeline = None
+
+	def url(self) :
+
+		'''
+		This function returns the URL at which the TM is listening.
+		'''
+
+		return 'http://localhost:%d' % self.tmPort
+
+	def __enter__(self) :
+
+		'''
+		This function starts the cluster (see Launcher.start) when a 'with' block is entered, and returns this Launcher.
+		'''
+
+		return self.start()
+
+	def __exit__(self, *args) :
+
+		'''
+		args :
+		- args 						-		The type, value and traceback of the exception leaving the 'with' block, or Nones.
+
+		This function stops the cluster (see Launcher.stop) when the 'with' block is left, and lets any exception through.
+		'''
+
+		self.stop()
+
+	def _startSite(self, siteID) :
+
+		'''
+		args :
+		- siteID 				-		The ID of the site to be created.
+
+		This function is called inside a forked child to create a client site without serving it yet. The site keeps its
+		 side of its own channel, if any, and closes the others.
+		'''
+
+		for i, channel in self.channels.iteritems() :
+			if i == siteID :
+				channel.attach('site')
+			else :
+				channel.close()
+
+		return Site(siteID, self.sitePorts[siteID - 1], self.numSites, serve = False, concurrencyControl = self.tmOptions.get('concurrencyControl', 'locking'), replication = self.tmOptions.get('replication', 'available-copies'), channel = self.channels.get(siteID), data = self._siteData.get(siteID), traceFile = self.tmOptions.get('traceFile'))
+
+	def _startProxy(self, siteID) :
+
+		'''
+		args :
+		- siteID 				-		The ID of the site to be proxied.
+
+		This function is called inside a forked child to create the proxy of a site without serving it yet.
+		'''
+
+		return NetworkProxy(0, self.sitePorts[siteID - 1], self.links[siteID])
+
+	def _startTransactionManager(self, unused) :
+
+		'''
+		This function is called inside a forked child to create the TM without serving it yet. Sites with a proxy are
+		 reached through it.
+		'''
+
+		for channel in self.channels.itervalues() :
+			channel.attach('tm')
+
+		sitePorts = [self.proxyPorts.get(i, port) for i, port in enumerate(self.sitePorts, 1)]
+		return TransactionManager(self.tmPort, sitePorts, channels = self.channels or None, serve = False, **self.tmOptions)
+
+	def _fork(self, create, arg, name) :
+
+		'''
+		args :
+		- create 				-		Function that creates the server object (a Site, a NetworkProxy or a TransactionManager) in the child.
+		- arg 					-		The argument to be passed to 'create'.
+		- name 					-		The name of the child, used for its log file.
+
+		This function forks a child that creates its server, reports "ready <port>" (or "error <traceback>") on a pipe
+		 and then serves requests until it is stopped. The end of the pipe to read from is returned.
+		'''
+
+		readEnd, writeEnd = os.pipe()
+		pid = os.fork()
+
+		if pid == 0 :
+			os.close(readEnd)
+			os.close(self._lifeline[1])
+			status = 0
+			try :
+				signal.signal(signal.SIGTERM, lambda signum, frame : os._exit(0))
+				watcher = threading.Thread(target = self._watchParent)
+				watcher.daemon = True
+				watcher.start()
+				if self.logDir :
+					log = os.open(os.path.join(self.logDir, name + '.txt'), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0644)
+					os.dup2(log, 1)
+					os.dup2(log, 2)
+				server = create(arg)
+				os.write(writeEnd, 'ready %d' % server.port)
+				os.close(writeEnd)
+				server.serve()
+			except :
+				status = 1
+				try :
+					os.write(writeEnd, 'error ' + traceback.format_exc())
+				except OSError :
+					pass
+			finally :
+				os._exit(status)
+
+		os.close(writeEnd)
+		self._children.append(pid)
+		return readEnd
+
+	def _watchParent(self) :
+
+		'''
+		This function is run by a thread of every forked child. It blocks until the launching process has closed the
+		 write end of Launcher._lifeline, by Launcher.stop or by exiting in any way, and then makes the child exit.
+		'''
+
+		while os.read(self._lifeline[0], 1) :
+			pass
+		os._exit(0)
+
+	def _waitReady(self, readEnd) :
+
+		'''
+		args :
+		- readEnd 				-		The end of the pipe to read the report of a child from.
+
+		This function blocks until the child reports back and returns the port at which it is listening.
+		'''
+
+		message = ''
+		while True :
+			chunk = os.read(readEnd, 4096)
+			if not chunk :
+				break
+			message += chunk
+			if message.startswith('ready ') :
+				break
+		os.close(readEnd)
+
+		if not message.startswith('ready ') :
+			raise LaunchException(message or 'child exited before reporting')
+
+		return int(message.split()[1])
+
+
+if __name__ == '__main__' :
+	parser = argparse.ArgumentParser(description = 'Start a cluster, replay an input file against it and stop the cluster.')
+	parser.add_argument('inputFileName', help = 'The input file to replay.')
+	parser.add_argument('--sites', type = int, default = 10, help = 'The number of client sites (default: 10).')
+	parser.add_argument('--site-port', type = int, default = 9090, help = 'The port of site 1; 0 picks free ports (default: 9090).')
+	parser.add_argument('--tm-port', type = int, default = 7777, help = 'The port of the TM; 0 picks a free port (default: 7777).')
+	parser.add_argument('--log-dir', default = None, help = 'Directory for the output of the sites and the TM.')
+	parser.add_argument('--batch', action = 'store_true', help = 'Batch consecutive reads and writes of a transaction.')
+	parser.add_argument('--deadlock-policy', choices = TransactionManager.DEADLOCK_POLICIES, default = 'detect', help = 'How the TM resolves conflicts (default: detect).')
+	parser.add_argument('--deferred-writes', action = 'store_true', help = 'Buffer writes at the TM until their transaction ends.')
+	parser.add_argument('--max-active', type = int, default = None, help = 'Queue read-write transactions beyond this many running ones.')
+	parser.add_argument('--max-active-ro', type = int, default = None, help = 'Queue read-only transactions beyond this many running ones.')
+	parser.add_argument('--adaptive-admission', action = 'store_true', help = 'Adapt the limit on read-write transactions to the abort rate.')
+	parser.add_argument('--concurrency-control', choices = Site.CONCURRENCY_CONTROLS, default = 'locking', help = 'The engine of the client sites (default: locking).')
+	parser.add_argument('--replication', choices = TransactionManager.REPLICATION_SCHEMES, default = 'available-copies', help = 'How the copies of a variable are kept up to date (default: available-copies).')
+	parser.add_argument('--isolation', choices = TransactionManager.ISOLATION_LEVELS, default = 'serializable', help = 'The isolation level of read-write transactions (default: serializable).')
+	parser.add_argument('--waitlist-policy', choices = TransactionManager.WAITLIST_POLICIES, default = 'fifo', help = 'The order in which waitlisted requests are retried (default: fifo).')
+	parser.add_argument('--transport', choices = Launcher.TRANSPORTS, default = 'xmlrpc', help = 'How the TM reaches the client sites (default: xmlrpc).')
+	parser.add_argument('--data', default = None, metavar = 'FILE', help = 'Load the initial values of the variables from a data file (see BulkLoader.py).')
+	parser.add_argument('--trace', default = None, metavar = 'FILE', help = 'Write the spans of the requests across the cluster to a trace file for chrome://tracing.')
+	parser.add_argument('--trace-sample', type = float, default = 1.0, metavar = 'P', help = 'Trace this fraction of the requests (default: 1).')
+	parser.add_argument('--link', action = 'append', default = [], metavar = '[SITES:]SETTINGS', help = 'Reach sites through a proxy simulating a network link, e.g. 1-5:latency=20,jitter=5,drop=0.01 (see NetworkProxy.py).')
+	parser.add_argument('--hot-keys', type = int, default = 0, metavar = 'N', help = 'Report the N variables with the most contention at the end.')
+	parser.add_argument('--start-tick', type = int, default = 1, metavar = 'T', help = 'Start the replay at the request of clock tick T.')
+	args = parser.parse_args()
+
+	try :
+		links = parseLinks(args.link, args.sites)
+	except ValueError as e :
+		parser.error(str(e))
+
+	with Launcher(args.sites, args.site_port, args.tm_port, args.log_dir, {'deadlockPolicy': args.deadlock_policy, 'deferredWrites': args.deferred_writes, 'maxActive': args.max_active, 'maxActiveRO': args.max_active_ro, 'adaptiveAdmission': args.adaptive_admission, 'waitlistPolicy': args.waitlist_policy, 'isolation': args.isolation, 'concurrencyControl': args.concurrency_control, 'replication': args.replication, 'traceFile': args.trace}, args.transport, args.data, links) as launcher :
+		try :
+			DES(args.inputFileName, args.batch, launcher.url(), args.hot_keys, args.start_tick, args.trace, args.trace_sample)
+		except SimulationException as e :
+			print ('SimulationException: %s' % e)
+			sys.exit(1)
@@ -29,30 +29,42 @@ class LockManager :
 	It will be responsible for granting read-locks and write-locks to transactions if there are no
 	 conflicts, or raising LockException if there is a conflict.
 	'''
+
+	# Counters kept for each variable in LockManager.contention
+	COUNTERS = ('readLocks', 'writeLocks', 'conflicts')
 	
 	def __init__(self, siteVariables) :
 
 		'''
 		args :
-		- siteVariables 		-		The IDs for all the variables that reside on a client site.
+		- siteVariables 		-		The IDs for all the variables that reside on a client site (or the VariableTable of the site,
+										 whose keys they are).
 
 		Constructor to initialize all data members of LockManager class.
 
 		Data members :
 
-		- siteVariables 		- 		List of IDs of all variables on a client site whose locks are to be managed.
+		- siteVariables 		- 		Collection of IDs of all variables on a client site whose locks are to be managed.
 		- readLockTable			-		Dictionary to represent the read-lock table for a site, where the keys are the IDs of variables
 										 and the values are lists of transaction IDs of transactions that have read-locks on that 
-										 particular variable.
+										 particular variable. Only variables that are read-locked have an entry.
 		- writeLockTable 		-		Dictionary to represent the write-lock table for a site, where the keys are the IDs of variables
 										 and the values are transaction IDs of transactions that have a write-lock on that particular
-										 variable.
+										 variable. Only variables that are write-locked have an entry.
+		- heldLocks 			-		Dictionary where the keys are transaction IDs and the values are sets of the IDs of the variables
+										 that the transaction holds a lock (of either kind) on, so that its locks can be released
+										 without going through every variable on the site.
+		- contention 			-		Dictionary where the keys are the IDs of variables and the values are dictionaries counting the
+										 read-locks and write-locks granted over that variable and the conflicts it has caused (see
+										 LockManager.COUNTERS). Only variables that have been locked or conflicted on have an entry.
 
 		'''
 		
 		self.siteVariables = siteVariables
 		self.writeLockTable = {}
 		self.readLockTable= {}
+		self.heldLocks = {}
+		self.contention = {}
 		self._initLockTables()
 
 	def _initLockTables(self) :
@@ -62,9 +74,9 @@ class LockManager :
 		It creates 'blank' lock tables.
 		'''
 
-		for varID in self.siteVariables :
-			self.writeLockTable[varID] = None
-			self.readLockTable[varID] = []
+		self.writeLockTable.clear()
+		self.readLockTable.clear()
+		self.heldLocks.clear()
 
 	def getReaders(self, varID) :
 
@@ -76,10 +88,7 @@ class LockManager :
 		 that own a read-lock over this variable.
 		'''
 
-		if varID in self.readLockTable :
-			return self.readLockTable[varID]
-
-		return []
+		return self.readLockTable.get(varID, [])
 
 	def hasReadLock(self, transaction, varID) :
 
@@ -117,10 +126,20 @@ class LockManager :
 		 on this variable or not.
 		'''
 
-		if varID in self.writeLockTable :
-			return self.writeLockTable[varID] == transaction['ID']
+		return self.writeLockTable.get(varID) == transaction['ID']
+
+	def getWriteLocks(self, transaction) :
+
+		'''
+		args :
+		- transaction 			- 			The transaction whose write-locks are needed.
+
+		This function is called inside Site.prepare and Site.commit to retrieve the IDs of all variables on this
+		 client site that this transaction owns a write-lock on.
+		'''
 
-		return False
+		txnID = transaction['ID']
+		return [varID for varID in self.heldLocks.get(txnID, ()) if self.writeLockTable.get(varID) == txnID]
 
 	def acquireReadLock(self, transaction, varID) :
 
@@ -138,11 +157,14 @@ class LockManager :
 		'''
 		
 		if not self.hasReadLock(transaction, varID) :
-			if self.writeLockTable[varID] != None :
-				if self.writeLockTable[varID] != transaction['ID'] :
-					raise LockException(True, self.writeLockTable[varID]) # (there is a write lock, and who has it)
+			conflict = self.readConflict(transaction, varID)
+			if conflict :
+				self.count(varID, 'conflicts')
+				raise LockException(*conflict)
 			
-			self.readLockTable[varID].append(transaction['ID'])
+			self.readLockTable.setdefault(varID, []).append(transaction['ID'])
+			self.heldLocks.setdefault(transaction['ID'], set()).add(varID)
+			self.count(varID, 'readLocks')
 
 	def acquireWriteLock(self, transaction, varID) :
 
@@ -159,15 +181,86 @@ class LockManager :
 		'''
 
 		if not self.hasWriteLock(transaction, varID) :
-			if self.writeLockTable[varID] != None :
-				if self.writeLockTable[varID] != transaction['ID'] :
-					raise LockException(True, self.writeLockTable[varID])
-			elif self.readLockTable[varID] != [] :
-				for txnID in self.readLockTable[varID] :
-					if txnID != transaction['ID'] :
-						raise LockException(False, self.readLockTable[varID])
+			conflict = self.writeConflict(transaction, varID)
+			if conflict :
+				self.count(varID, 'conflicts')
+				raise LockException(*conflict)
 			
 			self.writeLockTable[varID] = transaction['ID']
+			self.heldLocks.setdefault(transaction['ID'], set()).add(varID)
+			self.count(varID, 'writeLocks')
+
+	def count(self, varID, counter) :
+
+		'''
+		args :
+		- varID 				-			The unique ID of the variable in question.
+		- counter 				-			One of LockManager.COUNTERS.
+
+		This function is called inside LockManager.acquireReadLock, LockManager.acquireWriteLock and Site.execute to add
+		 one to a counter of this variable in LockManager.contention.
+		'''
+
+		counts = self.contention.get(varID)
+		if counts is None :
+			counts = self.contention[varID] = dict.fromkeys(self.COUNTERS, 0)
+		counts[counter] += 1
+
+	def staleReads(self, transaction) :
+
+		'''
+		args :
+		- transaction 			-			The transaction about to commit.
+
+		This function is called inside Site.validate. A read-lock keeps every other transaction from committing the
+		 variable read until this transaction ends, so no read is ever stale.
+		'''
+
+		return []
+
+	def readConflict(self, transaction, varID) :
+
+		'''
+		args :
+		- transaction 			-			The transaction that wishes to acquire a read-lock.
+		- varID 				-			The unique ID of the variable in question.
+
+		This function is called inside LockManager.acquireReadLock and Site.execute. It checks, without acquiring
+		 anything, whether a read-lock over this variable would conflict with another transaction. If it would, the
+		 arguments of the LockException to be raised are returned; otherwise, None.
+		'''
+
+		writer = self.writeLockTable.get(varID)
+
+		if writer != None :
+			if writer != transaction['ID'] :
+				return [True, writer] # (there is a write lock, and who has it)
+
+		return None
+
+	def writeConflict(self, transaction, varID) :
+
+		'''
+		args :
+		- transaction 			-			The transaction that wishes to acquire a write-lock.
+		- varID 				-			The unique ID of the variable in question.
+
+		This function is called inside LockManager.acquireWriteLock and Site.execute. It checks, without acquiring
+		 anything, whether a write-lock over this variable would conflict with another transaction. If it would, the
+		 arguments of the LockException to be raised are returned; otherwise, None.
+		'''
+
+		writer = self.writeLockTable.get(varID)
+
+		if writer != None :
+			if writer != transaction['ID'] :
+				return [True, writer]
+		elif varID in self.readLockTable :
+			for txnID in self.readLockTable[varID] :
+				if txnID != transaction['ID'] :
+					return [False, self.readLockTable[varID]]
+
+		return None
 
 	def releaseAllLocks(self, transaction = None) :
 
@@ -185,6 +278,7 @@ class LockManager :
 		else :
 			self._releaseWriteLocks(transaction)
 			self._releaseReadLocks(transaction)
+			self.heldLocks.pop(transaction['ID'], None)
 
 	def _releaseReadLocks(self, transaction) :
 
@@ -193,14 +287,15 @@ class LockManager :
 		- transaction 			-			The transaction that is releasing all its read-locks.
 
 		This function is called inside LockManager.releaseAllLocks. It will delete the ID of this transaction
-		 from the read-lock table entry for all variables on this client site.
+		 from the read-lock table entry for all variables it holds a lock on.
 		'''
 
-		for varID in self.readLockTable.keys() :
-			try :
-				self.readLockTable[varID].remove(transaction['ID'])			
-			except ValueError :
-				continue
+		for varID in self.heldLocks.get(transaction['ID'], ()) :
+			readers = self.readLockTable.get(varID)
+			if readers and transaction['ID'] in readers :
+				readers.remove(transaction['ID'])
+				if not readers :
+					del self.readLockTable[varID]
 
 	def _releaseWriteLocks(self, transaction) :
 
@@ -209,10 +304,10 @@ class LockManager :
 		- transaction 			-			The transaction that is releasing all its write-locks.
 		
 		This function is called inside LockManager.releaseAllLocks. It will reset the ID of the transaction
-		 holding a write-lock on a variable in the write-lock table to 'None' for all variables on this 
-		 client site.
+		 holding a write-lock on a variable in the write-lock table to 'None' for all variables it holds
+		 a lock on, by removing their entries.
 		'''
 
-		for varID in self.writeLockTable.keys() :
-			if self.writeLockTable[varID] == transaction['ID'] :
-				self.writeLockTable[varID] = None
\ No newline at end of file
+		for varID in self.heldLocks.get(transaction['ID'], ()) :
+			if self.writeLockTable.get(varID) == transaction['ID'] :
+				del self.writeLockTable[varID]
\ No newline at end of file
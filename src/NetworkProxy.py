@@ -0,0 +1,276 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+import time
+import random
+import socket
+import threading
+
+'''
+Proxy between the TM and a client site that makes the loopback connection between them behave like a link of a real
+ network : every chunk of data it forwards is held back by a one-way delay drawn from a distribution, is sent no
+ faster than the bandwidth of the link allows, and may be lost and sent again once a retransmission timeout has
+ passed. A response of the site may also be slow, as if the site had stalled. Launcher starts a proxy per site given
+ a Link (--link), and the TM is then given the ports of the proxies in place of those of the sites, so that its
+ requests to the sites can be benchmarked under the conditions of a wide-area network without leaving the machine.
+
+The opening of a connection is not delayed, and a chunk is only read once the one before it has been delivered, which
+ is close enough for requests and responses of a few kilobytes.
+'''
+
+class Link(object) :
+
+	'''
+	Class that will serve as the profile of the network link between the TM and a client site. Times are given in
+	 milliseconds and bandwidths in bytes per second.
+	'''
+
+	# Distributions of the one-way delay : 'uniform' in latency +/- jitter; 'normal' with mean latency and standard
+	# deviation jitter (never below 0); 'pareto', at least latency with a heavy tail, jitter above it on average
+	DISTRIBUTIONS = ('uniform', 'normal', 'pareto')
+
+	# Names of the settings of a link in a specification (see parseSettings), and the keyword arguments they stand for
+	SETTINGS = {'latency': 'latency', 'jitter': 'jitter', 'distribution': 'distribution', 'bandwidth': 'bandwidth', 'drop': 'dropRate', 'rto': 'rto', 'slow': 'slowRate', 'slow-delay': 'slowDelay', 'seed': 'seed'}
+
+	def __init__(self, latency = 0.0, jitter = 0.0, distribution = 'uniform', bandwidth = None, dropRate = 0.0, rto = 200.0, slowRate = 0.0, slowDelay = 500.0, seed = None) :
+
+		'''
+		args :
+		- latency 					-		The mean one-way delay of the link, in milliseconds.
+		- jitter 					-		The spread of the one-way delay around its mean, in milliseconds.
+		- distribution 				-		One of Link.DISTRIBUTIONS.
+		- bandwidth 				-		The bandwidth of the link in each direction, in bytes per second. None, for no limit.
+		- dropRate 					-		The probability that a chunk of data is lost, and sent again after 'rto' (as many
+											 times as it is lost).
+		- rto 						-		The retransmission timeout, in milliseconds.
+		- slowRate 					-		The probability that a response of the site is held back by a further 'slowDelay'.
+		- slowDelay 				-		The delay of a slow response, in milliseconds.
+		- seed 						-		Seed of the random number generator, so that the delays can be drawn again.
+
+		Constructor to initialize all data members of Link class.
+
+		Data members :
+
+		- latency 					-		The mean one-way delay, in seconds.
+		- jitter 					-		The spread of the one-way delay, in seconds.
+		- rto 						-		The retransmission timeout, in seconds.
+		- slowDelay 				-		The delay of a slow response, in seconds.
+		- distribution 				-		The distribution of the one-way delay.
+		- bandwidth 				-		The bandwidth of the link, or None.
+		- dropRate 					-		The probability that a chunk of data is lost.
+		- slowRate 					-		The probability that a response is slow.
+		- random 					-		The random number generator of the link.
+		- _busyUntil 				-		Dictionary mapping each direction ('request', 'response') to the time at which the
+											 link is done sending the data it has been given in that direction.
+		- _lock 					-		Lock held while drawing a delay, shared by the connections over the link.
+		'''
+
+		if not distribution in self.DISTRIBUTIONS :
+			raise ValueError('Unknown distribution %s' % distribution)
+
+		self.latency = latency / 1000.0
+		self.jitter = jitter / 1000.0
+		self.distribution = distribution
+		self.bandwidth = bandwidth
+		self.dropRate = dropRate
+		self.rto = rto / 1000.0
+		self.slowRate = slowRate
+		self.slowDelay = slowDelay / 1000.0
+		self.random = random.Random(seed)
+		self._busyUntil = {'request': 0.0, 'response': 0.0}
+		self._lock = threading.Lock()
+
+	def _oneWayDelay(self) :
+
+		'''
+		This function is called inside Link.deliveryTime. It draws a one-way delay from the distribution of the link, in
+		 seconds.
+		'''
+
+		if self.distribution == 'uniform' :
+			return max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+		if self.distribution == 'normal' :
+			return max(0.0, self.random.gauss(self.latency, self.jitter))
+		return self.latency + self.jitter * (self.random.paretovariate(2.0) - 1)
+
+	def deliveryTime(self, direction, size, first) :
+
+		'''
+		args :
+		- direction 				-		'request' (from the TM to the site) or 'response' (from the site to the TM).
+		- size 						-		The number of bytes of the chunk of data.
+		- first 					-		True, if the chunk is the first of a response.
+
+		This function is called inside NetworkProxy._forward for every chunk of data, when it is received. It returns the
+		 time at which the chunk is to be delivered.
+		'''
+
+		with self._lock :
+			now = time.time()
+			sent = max(now, self._busyUntil[direction]) + (float(size) / self.bandwidth if self.bandwidth else 0.0)
+			self._busyUntil[direction] = sent
+			delay = self._oneWayDelay()
+			while self.dropRate and self.random.random() < self.dropRate :
+				delay += self.rto
+			if first and self.slowRate and self.random.random() < self.slowRate :
+				delay += self.slowDelay
+
+		return sent + delay
+
+def parseSettings(spec) :
+
+	'''
+	args :
+	- spec 							-		Comma-separated settings of a link, as 'name=value' pairs such as
+											 'latency=20,jitter=5,drop=0.01' (see Link.SETTINGS).
+
+	This function returns the keyword arguments of Link for a specification. A ValueError is raised for an unknown
+	 setting.
+	'''
+
+	settings = {}
+
+	for setting in spec.split(',') :
+		name, _, value = setting.partition('=')
+		name = name.strip()
+		if not name in Link.SETTINGS or not value :
+			raise ValueError('Expected one of %s as name=value, found %r' % (', '.join(sorted(Link.SETTINGS)), setting))
+		settings[Link.SETTINGS[name]] = value.strip() if name == 'distribution' else float(value)
+
+	if 'seed' in settings :
+		settings['seed'] = int(settings['seed'])
+	return settings
+
+def parseLinks(specs, numSites) :
+
+	'''
+	args :
+	- specs 						-		List of specifications of links, each '[SITES:]settings' where SITES is a site ID
+											 or a range of them ('3', '1-5') and settings are as in parseSettings. Without SITES,
+											 the settings apply to every site. Later specifications add to earlier ones.
+	- numSites 						-		The number of client sites.
+
+	This function is called by Launcher for its --link option. It returns a dictionary mapping the IDs of the sites
+	 given a link to their Link objects.
+	'''
+
+	settings = {}
+
+	for spec in specs :
+		sites, _, spec = spec.rpartition(':')
+		if not sites :
+			siteIDs = range(1, numSites + 1)
+		else :
+			first, _, last = sites.partition('-')
+			siteIDs = range(int(first), int(last or first) + 1)
+		for siteID in siteIDs :
+			if not 1 <= siteID <= numSites :
+				raise ValueError('There is no site %d' % siteID)
+			settings.setdefault(siteID, {}).update(parseSettings(spec))
+
+	return dict((siteID, Link(**kwargs)) for siteID, kwargs in settings.iteritems())
+
+class NetworkProxy(object) :
+
+	'''
+	Class that will serve as the proxy of a client site, forwarding every connection it accepts to the site over a Link.
+	'''
+
+	def __init__(self, port, sitePort, link) :
+
+		'''
+		args :
+		- port 						-		The port at which the proxy listens. 0 lets the OS pick a free port.
+		- sitePort 					-		The port of the client site.
+		- link 						-		The Link between the TM and the site.
+
+		Constructor to initialize all data members of NetworkProxy class.
+
+		Data members :
+
+		- port 						-		The port at which the proxy listens.
+		- sitePort 					-		The port of the client site.
+		- link 						-		The Link between the TM and the site.
+		- _socket 					-		The listening socket.
+		'''
+
+		self.sitePort = sitePort
+		self.link = link
+		self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+		self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+		self._socket.bind(('localhost', port))
+		self._socket.listen(64)
+		self.port = self._socket.getsockname()[1]
+
+	def serve(self) :
+
+		'''
+		This function is called by Launcher once it has forked the proxy. It accepts connections until the process is
+		 stopped, and forwards each of them to the site from threads of its own.
+		'''
+
+		while True :
+			client, address = self._socket.accept()
+			connection = threading.Thread(target = self._connect, args = (client,))
+			connection.daemon = True
+			connection.start()
+
+	def _connect(self, client) :
+
+		'''
+		args :
+		- client 					-		The socket of a connection accepted from the TM.
+
+		This function is run by a thread of NetworkProxy.serve. It opens a connection to the site, forwards the requests
+		 from another thread and the responses from this one, and closes both connections once both sides are done.
+		'''
+
+		try :
+			site = socket.create_connection(('localhost', self.sitePort))
+		except socket.error :
+			client.close()
+			return
+
+		for sock in (client, site) :
+			sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+		requests = threading.Thread(target = self._forward, args = (client, site, 'request'))
+		requests.daemon = True
+		requests.start()
+		self._forward(site, client, 'response')
+		requests.join()
+		client.close()
+		site.close()
+
+	def _forward(self, source, destination, direction) :
+
+		'''
+		args :
+		- source 					-		The socket to read from.
+		- destination 				-		The socket to write to.
+		- direction 				-		'request' or 'response'.
+
+		This function is called inside NetworkProxy._connect. It forwards the data of one direction of a connection,
+		 each chunk at the time given by the link, until the source closes its side.
+		'''
+
+		first = True
+
+		try :
+			while True :
+				data = source.recv(65536)
+				if not data :
+					break
+				deliverAt = self.link.deliveryTime(direction, len(data), first and direction == 'response')
+				first = False
+				wait = deliverAt - time.time()
+				if wait > 0 :
+					time.sleep(wait)
+				destination.sendall(data)
+		except socket.error :
+			pass
+		finally :
+			try :
+				destination.shutdown(socket.SHUT_WR)
+			except socket.error :
+				pass
@@ -0,0 +1,177 @@
+# Authors :
+# Sudharshann D (sd3770)
+
+class OptimisticManager :
+
+	'''
+	Class that will serve as an optimistic concurrency control engine for all variables on a client site, in place of
+	 a LockManager. It offers the same functions to Site, but none of them ever conflicts : a read only records the
+	 version it has read (its read set) and a write only records the variable written (its write set), the value
+	 being kept with the variable until the transaction commits. When the transaction ends, Site.validate checks
+	 its read set against the versions committed since, and the TM aborts it if any of them has changed.
+	'''
+
+	# Counters kept for each variable in OptimisticManager.contention, named as those of LockManager
+	COUNTERS = ('readLocks', 'writeLocks', 'conflicts')
+
+	def __init__(self, siteVariables) :
+
+		'''
+		args :
+		- siteVariables 		-		Dictionary of the Variable objects on a client site, where the keys are their IDs.
+
+		Constructor to initialize all data members of OptimisticManager class.
+
+		Data members :
+
+		- siteVariables 		- 		Dictionary of the Variable objects on a client site, used to look up the last committed
+										 version of a variable.
+		- readSets 				-		Dictionary where the keys are transaction IDs and the values are dictionaries mapping the
+										 IDs of the variables read by the transaction to the times of commit of the versions read.
+		- writeSets 			-		Dictionary where the keys are transaction IDs and the values are sets of the IDs of the
+										 variables written by the transaction.
+		- contention 			-		Dictionary where the keys are the IDs of variables and the values are dictionaries counting
+										 the reads and writes recorded over that variable (as readLocks and writeLocks) and the
+										 reads found stale on validation (as conflicts).
+		'''
+
+		self.siteVariables = siteVariables
+		self.readSets = {}
+		self.writeSets = {}
+		self.contention = {}
+
+	def getReaders(self, varID) :
+
+		'''
+		args :
+		- varID 				-			The unique ID associated with the variable in question.
+
+		This function is called inside Site.isReading. No transaction ever holds a read-lock.
+		'''
+
+		return []
+
+	def hasWriteLock(self, transaction, varID) :
+
+		'''
+		args :
+		- transaction 			- 			The transaction in question.
+		- varID 				- 			The unique ID of the variable in question.
+
+		This function is called inside Site.read to check if this transaction has written to this variable, in which
+		 case it reads its own value.
+		'''
+
+		return varID in self.writeSets.get(transaction['ID'], ())
+
+	def getWriteLocks(self, transaction) :
+
+		'''
+		args :
+		- transaction 			- 			The transaction whose write set is needed.
+
+		This function is called inside Site.prepare and Site.commit to retrieve the IDs of all variables on this
+		 client site that this transaction has written to.
+		'''
+
+		return list(self.writeSets.get(transaction['ID'], ()))
+
+	def acquireReadLock(self, transaction, varID) :
+
+		'''
+		args :
+		- transaction 			-			The transaction that reads.
+		- varID 				-			The unique ID of the variable being read.
+
+		This function is called inside Site.read just before a read-write transaction reads the last committed value
+		 of a variable. The version it is about to read is added to its read set, unless it has read this variable
+		 already, in which case the version it read first is the one to be validated.
+		'''
+
+		readSet = self.readSets.setdefault(transaction['ID'], {})
+		if not varID in readSet :
+			readSet[varID] = self.siteVariables[varID].commitTimes[-1]
+			self.count(varID, 'readLocks')
+
+	def acquireWriteLock(self, transaction, varID) :
+
+		'''
+		args :
+		- transaction 			-			The transaction that writes.
+		- varID 				-			The unique ID of the variable being written.
+
+		This function is called inside Site.write. The variable is added to the write set of this transaction.
+		'''
+
+		writeSet = self.writeSets.setdefault(transaction['ID'], set())
+		if not varID in writeSet :
+			writeSet.add(varID)
+			self.count(varID, 'writeLocks')
+
+	def staleReads(self, transaction) :
+
+		'''
+		args :
+		- transaction 			-			The transaction about to commit.
+
+		This function is called inside Site.validate. It returns the IDs of the variables read by this transaction
+		 whose last committed version is no longer the one it read, i.e. that another transaction has committed since.
+		'''
+
+		stale = []
+
+		for varID, version in self.readSets.get(transaction['ID'], {}).iteritems() :
+			if self.siteVariables[varID].commitTimes[-1] != version :
+				stale.append(varID)
+				self.count(varID, 'conflicts')
+
+		return stale
+
+	def count(self, varID, counter) :
+
+		'''
+		args :
+		- varID 				-			The unique ID of the variable in question.
+		- counter 				-			One of OptimisticManager.COUNTERS.
+
+		This function is called inside OptimisticManager.acquireReadLock, OptimisticManager.acquireWriteLock and
+		 OptimisticManager.staleReads to add one to a counter of this variable in OptimisticManager.contention.
+		'''
+
+		counts = self.contention.get(varID)
+		if counts is None :
+			counts = self.contention[varID] = dict.fromkeys(self.COUNTERS, 0)
+		counts[counter] += 1
+
+	def readConflict(self, transaction, varID) :
+
+		'''
+		This function is called inside Site.execute. A read never conflicts.
+		'''
+
+		return None
+
+	def writeConflict(self, transaction, varID) :
+
+		'''
+		This function is called inside Site.execute. A write never conflicts.
+		'''
+
+		return None
+
+	def releaseAllLocks(self, transaction = None) :
+
+		'''
+		args :
+		- transaction 				- 			The transaction that is committing or is to be aborted.
+
+		This function is called inside Site.fail, Site.commit and Site.abort.
+		When a client site fails, we forget every read set and write set. Otherwise, we forget those of this transaction.
+		'''
+
+		if not transaction :
+			self.readSets.clear()
+			self.writeSets.clear()
+		else :
+			self.readSets.pop(transaction['ID'], None)
+			self.writeSets.pop(transaction['ID'], None)
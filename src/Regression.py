@@ -0,0 +1,206 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+import os
+import sys
+import glob
+import time
+import shutil
+import signal
+import difflib
+import argparse
+import tempfile
+import traceback
+import multiprocessing
+
+from Site import Site
+from Launcher import Launcher
+from Simulator import DES
+from TransactionManager import TransactionManager
+
+'''
+Regression runner that replays many input files at once, each against its own cluster (sites and TM on ports
+ picked by the OS), from a pool of worker processes sized to the number of cores. The output of every replay is
+ compared with the expected output kept next to the input files.
+
+A replay that fails, or takes longer than the timeout, is reported as an ERROR and does not hold up the others.
+
+Usage : python2 Regression.py [inputFileNames ...] [--jobs N] [--timeout S] [--update]
+'''
+
+# Seconds after which a replay is given up by default
+TIMEOUT = 60
+
+class ReplayTimeout(Exception) :
+
+	'''
+	Class used to raise an exception when a replay takes longer than the timeout.
+	'''
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+EXPECTED_DIR = os.path.join(DATA_DIR, 'expected')
+
+def replayInto(fileName, url, batch = False) :
+
+	'''
+	args :
+	- fileName 					-		The input file to replay.
+	- url 						-		The URL of the TM of a running cluster.
+	- batch 					-		True, if the simulator is to batch reads and writes.
+
+	This function replays an input file against a running cluster while capturing the output of the simulator,
+	 and returns the time taken by the replay in seconds and that output.
+	'''
+
+	output = tempfile.TemporaryFile()
+	saved = os.dup(1)
+	sys.stdout.flush()
+	os.dup2(output.fileno(), 1)
+	try :
+		start = time.time()
+		DES(fileName, batch, url)
+		sys.stdout.flush()
+		elapsed = time.time() - start
+	finally :
+		os.dup2(saved, 1)
+		os.close(saved)
+
+	output.seek(0)
+	return elapsed, output.read()
+
+def replay(job) :
+
+	'''
+	args :
+	- job 						-		The (fileName, batch, numSites, tmOptions, transport, timeout) of the replay.
+
+	This function is called in the worker processes of the pool. It starts a cluster of its own, replays an input
+	 file against it and stops the cluster. It returns the input file, whether the replay completed, the time taken
+	 and the output of the simulator (or the traceback of the failure). A replay still running after 'timeout'
+	 seconds is interrupted by an alarm and fails. The directory of the logs of the cluster is removed once it stops.
+	'''
+
+	fileName, batch, numSites, tmOptions, transport, timeout = job
+	logDir = tempfile.mkdtemp()
+
+	def expire(signum, frame) :
+		raise ReplayTimeout('%s did not complete in %ds' % (os.path.basename(fileName), timeout))
+
+	signal.signal(signal.SIGALRM, expire)
+	signal.alarm(timeout)
+	try :
+		with Launcher(numSites, 0, 0, logDir, tmOptions, transport) as launcher :
+			elapsed, output = replayInto(fileName, launcher.url(), batch)
+		return fileName, True, elapsed, output
+	except (Exception, SystemExit) :
+		return fileName, False, 0.0, traceback.format_exc()
+	finally :
+		signal.alarm(0)
+		shutil.rmtree(logDir, ignore_errors = True)
+
+def expectedFileName(fileName, expectedDir = EXPECTED_DIR) :
+
+	'''
+	args :
+	- fileName 					-		The input file.
+	- expectedDir 				-		Directory holding the expected outputs.
+
+	This function returns the name of the file holding the expected output of an input file.
+	'''
+
+	return os.path.join(expectedDir, os.path.basename(fileName))
+
+def run(fileNames, jobs = None, batch = False, numSites = 10, tmOptions = None, expectedDir = EXPECTED_DIR, update = False, transport = 'xmlrpc', timeout = TIMEOUT) :
+
+	'''
+	args :
+	- fileNames 				-		The input files to replay.
+	- jobs 						-		The number of worker processes. If None, the number of cores.
+	- batch 					-		True, if the simulator is to batch reads and writes.
+	- numSites 					-		The number of client sites of each cluster.
+	- tmOptions 				-		Dictionary of further keyword arguments for the TransactionManager constructor.
+	- expectedDir 				-		Directory holding the expected outputs.
+	- update 					-		True, if the expected outputs are to be overwritten with the outputs of this run.
+	- transport 				-		How the TM of each cluster reaches its sites, one of Launcher.TRANSPORTS.
+	- timeout 					-		The number of seconds after which a replay is given up.
+
+	This function replays all the input files in parallel and reports, as each replay completes, whether its output
+	 matches the expected one (printing a diff if it does not). It returns the number of input files that failed.
+	Should no replay complete in twice the timeout (a worker process lost, say), the input files left are reported
+	 as errors and the pool is stopped.
+	'''
+
+	pool = multiprocessing.Pool(jobs or multiprocessing.cpu_count())
+	failures = 0
+	start = time.time()
+
+	left = list(fileNames)
+	results = pool.imap_unordered(replay, [(f, batch, numSites, tmOptions or {}, transport, timeout) for f in fileNames])
+
+	try :
+		while left :
+			try :
+				fileName, completed, elapsed, output = results.next(2 * timeout)
+			except multiprocessing.TimeoutError :
+				for fileName in sorted(left) :
+					failures += 1
+					print ("ERROR %s\nno result after %ds" % (os.path.basename(fileName), 2 * timeout))
+				pool.terminate()
+				break
+
+			left.remove(fileName)
+			name = os.path.basename(fileName)
+			expected = expectedFileName(fileName, expectedDir)
+
+			if not completed :
+				failures += 1
+				print ("ERROR %s\n%s" % (name, output))
+			elif update :
+				with open(expected, 'w') as f :
+					f.write(output)
+				print ("WROTE %s (%.2fs)" % (name, elapsed))
+			elif not os.path.exists(expected) :
+				failures += 1
+				print ("MISSING %s : no expected output at %s" % (name, expected))
+			else :
+				with open(expected) as f :
+					expectedOutput = f.read()
+				if output == expectedOutput :
+					print ("ok %s (%.2fs)" % (name, elapsed))
+				else :
+					failures += 1
+					print ("DIFF %s" % name)
+					sys.stdout.writelines(difflib.unified_diff(expectedOutput.splitlines(True), output.splitlines(True), expected, 'replay of ' + name))
+			sys.stdout.flush()
+	finally :
+		pool.close()
+		pool.join()
+
+	print ("%d of %d input files failed in %.2fs" % (failures, len(fileNames), time.time() - start))
+	return failures
+
+
+if __name__ == '__main__' :
+	parser = argparse.ArgumentParser(description = 'Replay input files in parallel, each against its own cluster, and compare their outputs with the expected ones.')
+	parser.add_argument('inputFileNames', nargs = '*', help = 'The input files to replay (default: every input file under data/).')
+	parser.add_argument('--jobs', type = int, default = None, help = 'The number of replays to run at once (default: the number of cores).')
+	parser.add_argument('--sites', type = int, default = 10, help = 'The number of client sites of each cluster (default: 10).')
+	parser.add_argument('--batch', action = 'store_true', help = 'Batch consecutive reads and writes of a transaction.')
+	parser.add_argument('--deadlock-policy', choices = TransactionManager.DEADLOCK_POLICIES, default = 'detect', help = 'How the TM resolves conflicts (default: detect).')
+	parser.add_argument('--deferred-writes', action = 'store_true', help = 'Buffer writes at the TM until their transaction ends.')
+	parser.add_argument('--max-active', type = int, default = None, help = 'Queue read-write transactions beyond this many running ones.')
+	parser.add_argument('--max-active-ro', type = int, default = None, help = 'Queue read-only transactions beyond this many running ones.')
+	parser.add_argument('--adaptive-admission', action = 'store_true', help = 'Adapt the limit on read-write transactions to the abort rate.')
+	parser.add_argument('--concurrency-control', choices = Site.CONCURRENCY_CONTROLS, default = 'locking', help = 'The engine of the client sites (default: locking).')
+	parser.add_argument('--replication', choices = TransactionManager.REPLICATION_SCHEMES, default = 'available-copies', help = 'How the copies of a variable are kept up to date (default: available-copies).')
+	parser.add_argument('--isolation', choices = TransactionManager.ISOLATION_LEVELS, default = 'serializable', help = 'The isolation level of read-write transactions (default: serializable).')
+	parser.add_argument('--waitlist-policy', choices = TransactionManager.WAITLIST_POLICIES, default = 'fifo', help = 'The order in which waitlisted requests are retried (default: fifo).')
+	parser.add_argument('--transport', choices = Launcher.TRANSPORTS, default = 'xmlrpc', help = 'How the TM reaches the client sites (default: xmlrpc).')
+	parser.add_argument('--timeout', type = int, default = TIMEOUT, help = 'Give up a replay after this many seconds (default: %d).' % TIMEOUT)
+	parser.add_argument('--expected-dir', default = EXPECTED_DIR, help = 'Directory holding the expected outputs (default: data/expected).')
+	parser.add_argument('--update', action = 'store_true', help = 'Overwrite the expected outputs with the outputs of this run.')
+	args = parser.parse_args()
+
+	fileNames = args.inputFileNames or sorted(glob.glob(os.path.join(DATA_DIR, '*.txt')))
+	failures = run(fileNames, args.jobs, args.batch, args.sites, {'deadlockPolicy': args.deadlock_policy, 'deferredWrites': args.deferred_writes, 'maxActive': args.max_active, 'maxActiveRO': args.max_active_ro, 'adaptiveAdmission': args.adaptive_admission, 'waitlistPolicy': args.waitlist_policy, 'isolation': args.isolation, 'concurrencyControl': args.concurrency_control, 'replication': args.replication}, args.expected_dir, args.update, args.transport, args.timeout)
+	sys.exit(1 if failures else 0)
@@ -0,0 +1,145 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+import time
+import itertools
+import threading
+import xmlrpclib
+from collections import deque
+
+class Replicator(object) :
+
+	'''
+	Class that will serve as the replication stream of the TM under primary-copy replication. Versions committed at
+	 the primary site of a variable are queued for each of its other sites (its replicas) and sent to them by a
+	 background thread, in the order they were committed, in batches of at most Replicator.batchSize versions per
+	 request (Site.applyReplicated). A replica that is down keeps its queue until it is back up.
+	'''
+
+	def __init__(self, siteURLs, batchSize = 64, retryInterval = 0.01, clients = None) :
+
+		'''
+		args :
+		- siteURLs 					-		Dictionary of the URLs of the client sites, where the keys are their site IDs.
+		- batchSize 				-		The largest number of versions sent to a replica with a single request.
+		- retryInterval 			-		The time, in seconds, to wait before retrying a replica that is down.
+		- clients 					-		Dictionary of clients of the sites that may be shared with the thread of the
+											 Replicator (SharedMemory.Channel objects), where the keys are their site IDs.
+											 None, to open XML-RPC connections to 'siteURLs' from the thread.
+
+		Constructor to initialize all data members of Replicator class, and start its thread.
+
+		Data members :
+
+		- batchSize 				-		The largest number of versions sent to a replica with a single request.
+		- retryInterval 			-		The time, in seconds, to wait before retrying a replica that is down.
+		- _siteURLs 				-		Dictionary of the URLs of the client sites.
+		- _clients 					-		Dictionary of the shared clients of the client sites, or None.
+		- _pending 					-		Dictionary where the keys are site IDs and the values are queues of the versions not yet
+											 applied at that site, as [varID, time of commit, txnID, value] lists, in commit order.
+		- _condition 				-		Condition guarding Replicator._pending, notified whenever versions are queued or applied.
+		- _batches 					-		The number of requests sent to replicas so far.
+		- _thread 					-		The background thread sending the versions.
+		'''
+
+		self.batchSize = batchSize
+		self.retryInterval = retryInterval
+		self._siteURLs = siteURLs
+		self._clients = clients
+		self._pending = dict((siteID, deque()) for siteID in siteURLs)
+		self._condition = threading.Condition()
+		self._batches = 0
+
+		self._thread = threading.Thread(target = self._run, name = 'replicator')
+		self._thread.daemon = True
+		self._thread.start()
+
+	def enqueue(self, siteID, version) :
+
+		'''
+		args :
+		- siteID 					-		The ID of a replica of the variable committed.
+		- version 					-		The version committed at the primary site, as [varID, time of commit, txnID, value].
+
+		This function is called inside TransactionManager._replicate for every replica of every variable committed.
+		'''
+
+		with self._condition :
+			self._pending[siteID].append(version)
+			self._condition.notify_all()
+
+	def waitFor(self, siteID, timeStamp) :
+
+		'''
+		args :
+		- siteID 					-		The ID of a replica.
+		- timeStamp 				-		The time instance up to which the replica must have applied every version.
+
+		This function is called inside TransactionManager.read and TransactionManager.execute before a read-only
+		 transaction reads at a replica. It returns once the replica has applied every version committed at or before
+		 'timeStamp', so that it holds the snapshot of the transaction.
+		'''
+
+		with self._condition :
+			pending = self._pending[siteID]
+			while pending and pending[0][1] <= timeStamp :
+				self._condition.wait()
+
+	def drain(self, siteIDs) :
+
+		'''
+		args :
+		- siteIDs 					-		The IDs of the replicas to wait for, i.e. those that are up.
+
+		This function is called inside TransactionManager.dump. It returns once each of these replicas has applied every
+		 version queued for it so far.
+		'''
+
+		with self._condition :
+			while any(self._pending[siteID] for siteID in siteIDs) :
+				self._condition.wait()
+
+	def statistics(self) :
+
+		'''
+		This function is called inside TransactionManager.statistics. It returns the number of versions not yet applied,
+		 over all replicas, and the number of requests sent to replicas so far.
+		'''
+
+		with self._condition :
+			return {'replicationLag': sum(len(pending) for pending in self._pending.itervalues()), 'replicationBatches': self._batches}
+
+	def _run(self) :
+
+		'''
+		This function is the body of the thread of the Replicator. It waits for versions to be queued, then sends a batch
+		 to every replica that has some, one replica after the other. A batch is only dropped from its queue once the
+		 replica has applied it.
+		'''
+
+		clients = self._clients or dict((siteID, xmlrpclib.ServerProxy(url, allow_none = True)) for siteID, url in self._siteURLs.iteritems())
+
+		while True :
+			with self._condition :
+				while not any(self._pending.itervalues()) :
+					self._condition.wait()
+				batches = [(siteID, list(itertools.islice(pending, self.batchSize))) for siteID, pending in sorted(self._pending.iteritems()) if pending]
+
+			applied = 0
+			for siteID, batch in batches :
+				try :
+					if not clients[siteID].applyReplicated(batch) :
+						continue
+				except Exception :
+					continue
+
+				applied += 1
+				with self._condition :
+					pending = self._pending[siteID]
+					for i in range(len(batch)) :
+						pending.popleft()
+					self._batches += 1
+					self._condition.notify_all()
+
+			if not applied :
+				time.sleep(self.retryInterval)
@@ -0,0 +1,283 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+import os
+import mmap
+import struct
+import marshal
+import xmlrpclib
+import threading
+
+from Transaction import Transaction
+from Tracing import currentTrace, activate
+
+'''
+Transport between the TM and the client sites for a cluster whose processes all run on one host, in place of
+ XML-RPC over TCP loopback. Each site has a Channel : a request ring and a response ring in a memory map shared
+ by the TM and the site, and a pipe per ring used as a doorbell. A request is marshalled straight into the
+ request ring, one byte on the doorbell wakes the site up, and the response comes back the same way, so that a
+ call costs two small pipe writes and two marshal calls instead of an HTTP exchange with an XML body. A request
+ carries the ID of the trace of the calling thread, if any (see Tracing.py).
+
+A Channel is created by Launcher before it forks the site and the TM, which then keep one side each (see
+ Channel.attach).
+'''
+
+class Ring(object) :
+
+	'''
+	Class that will serve as a ring buffer of frames, with a single writer and a single reader. Its header holds the
+	 positions of the reader (head) and of the writer (tail), which only ever grow : a position maps to the byte at
+	 position mod the capacity of the ring, so that frames wrap around its end. A frame is its length followed by its
+	 bytes.
+	'''
+
+	HEADER = struct.Struct('<QQ')
+	LENGTH = struct.Struct('<I')
+
+	def __init__(self, buffer, offset, capacity) :
+
+		'''
+		args :
+		- buffer 					-		The shared memory map holding the ring.
+		- offset 					-		The offset of the header of the ring in 'buffer'.
+		- capacity 					-		The number of bytes of frames the ring can hold.
+
+		Constructor to initialize all data members of Ring class.
+
+		Data members :
+
+		- buffer 					-		The shared memory map holding the ring.
+		- offset 					-		The offset of the header of the ring in the memory map.
+		- capacity 					-		The number of bytes of frames the ring can hold.
+		'''
+
+		self.buffer = buffer
+		self.offset = offset
+		self.capacity = capacity
+
+	def put(self, payload) :
+
+		'''
+		args :
+		- payload 					-		The bytes of the frame to be written.
+
+		This function writes a frame at the tail of the ring. The TM and the site take turns, so the ring is never
+		 short of room unless the frame is larger than the ring itself, which raises a ValueError.
+		'''
+
+		head, tail = self.HEADER.unpack_from(self.buffer, self.offset)
+		size = self.LENGTH.size + len(payload)
+		if size > self.capacity - (tail - head) :
+			raise ValueError('frame of %d bytes does not fit in a ring of %d bytes' % (size, self.capacity))
+
+		self._copyIn(tail, self.LENGTH.pack(len(payload)))
+		self._copyIn(tail + self.LENGTH.size, payload)
+		self.HEADER.pack_into(self.buffer, self.offset, head, tail + size)
+
+	def get(self) :
+
+		'''
+		This function reads the frame at the head of the ring and returns its bytes.
+		'''
+
+		head, tail = self.HEADER.unpack_from(self.buffer, self.offset)
+		length = self.LENGTH.unpack(self._copyOut(head, self.LENGTH.size))[0]
+		payload = self._copyOut(head + self.LENGTH.size, length)
+		self.HEADER.pack_into(self.buffer, self.offset, head + self.LENGTH.size + length, tail)
+		return payload
+
+	def _copyIn(self, position, data) :
+
+		'''
+		args :
+		- position 					-		The position at which the bytes are to be written.
+		- data 						-		The bytes to be written.
+
+		This function is called inside Ring.put. It copies the bytes into the ring from 'position' on, wrapping around the
+		 end of the ring if need be.
+		'''
+
+		start = self.offset + self.HEADER.size
+		i = position % self.capacity
+		first = min(len(data), self.capacity - i)
+		self.buffer[start + i : start + i + first] = data[:first]
+		if first < len(data) :
+			self.buffer[start : start + len(data) - first] = data[first:]
+
+	def _copyOut(self, position, length) :
+
+		'''
+		args :
+		- position 					-		The position of the first byte to be read.
+		- length 					-		The number of bytes to be read.
+
+		This function is called inside Ring.get. It returns the bytes of the ring from 'position' on, wrapping around the
+		 end of the ring if need be.
+		'''
+
+		start = self.offset + self.HEADER.size
+		i = position % self.capacity
+		first = min(length, self.capacity - i)
+		data = self.buffer[start + i : start + i + first]
+		if first < length :
+			data += self.buffer[start : start + length - first]
+		return data
+
+def _plain(value) :
+
+	'''
+	args :
+	- value 					-		An argument or the result of a request.
+
+	This function returns 'value' as XML-RPC would deliver it : transactions as dictionaries (see Transaction.toStruct)
+	 and tuples as lists, so that a site and the TM see the same values over either transport.
+	'''
+
+	if isinstance(value, Transaction) :
+		return value.toStruct()
+	if isinstance(value, (list, tuple)) :
+		return [_plain(v) for v in value]
+	if isinstance(value, dict) :
+		return dict((k, _plain(v)) for k, v in value.iteritems())
+	return value
+
+class Channel(object) :
+
+	'''
+	Class that will serve as the connection between the TM and one client site over shared memory. On the side of the
+	 TM, it is used like the xmlrpclib.ServerProxy of the site (channel.read(transaction, varID), ...), and may be
+	 shared between threads, which take turns. On the side of the site, Channel.serve handles the requests.
+	'''
+
+	def __init__(self, capacity = 1 << 20) :
+
+		'''
+		args :
+		- capacity 					-		The number of bytes each of the two rings can hold.
+
+		Constructor to initialize all data members of Channel class.
+
+		Data members :
+
+		- _buffer 					-		The memory map shared by the TM and the site, holding both rings.
+		- _requests 				-		The Ring of the requests, from the TM to the site.
+		- _responses 				-		The Ring of the responses, from the site to the TM.
+		- _requestBell 				-		The pipe (read end, write end) on which the TM signals a request.
+		- _responseBell 			-		The pipe (read end, write end) on which the site signals a response.
+		- _lock 					-		Lock held by a thread of the TM from its request to its response.
+		'''
+
+		ringSize = Ring.HEADER.size + capacity
+		self._buffer = mmap.mmap(-1, 2 * ringSize)
+		self._requests = Ring(self._buffer, 0, capacity)
+		self._responses = Ring(self._buffer, ringSize, capacity)
+		self._requestBell = os.pipe()
+		self._responseBell = os.pipe()
+		self._lock = threading.Lock()
+
+	def attach(self, side) :
+
+		'''
+		args :
+		- side 						-		'tm' or 'site'.
+
+		This function is called inside the forked TM or site, to close the ends of the doorbells that belong to the other
+		 side. Once the other side has exited, waiting for it then fails instead of blocking forever.
+		'''
+
+		if side == 'tm' :
+			ends = (self._requestBell[0], self._responseBell[1])
+		else :
+			ends = (self._requestBell[1], self._responseBell[0])
+
+		for fd in ends :
+			os.close(fd)
+
+	def close(self) :
+
+		'''
+		This function closes every end of the doorbells and the memory map, in a process that is neither side.
+		'''
+
+		for fd in self._requestBell + self._responseBell :
+			try :
+				os.close(fd)
+			except OSError :
+				pass
+		self._buffer.close()
+
+	def call(self, method, args) :
+
+		'''
+		args :
+		- method 					-		The name of the function of the site to be called.
+		- args 						-		The arguments of the call.
+
+		This function sends a request to the site and waits for its response. An exception raised by the site is raised
+		 here as an xmlrpclib.Fault, as it would be over XML-RPC.
+		'''
+
+		with self._lock :
+			self._requests.put(marshal.dumps((method, _plain(args), currentTrace())))
+			os.write(self._requestBell[1], '.')
+			self._wait(self._responseBell[0])
+			status, result = marshal.loads(self._responses.get())
+
+		if status == 'fault' :
+			raise xmlrpclib.Fault(1, result)
+		return result
+
+	def __getattr__(self, name) :
+
+		'''
+		args :
+		- name 						-		The name of a function of the site.
+
+		This function returns a function sending a request for the function 'name' of the site (see Channel.call), so that
+		 the channel can be used like the xmlrpclib.ServerProxy of the site. Names starting with '_' are not looked up.
+		'''
+
+		if name.startswith('_') :
+			raise AttributeError(name)
+		return lambda *args : self.call(name, args)
+
+	def serve(self, site) :
+
+		'''
+		args :
+		- site 						-		The Site whose requests are handled.
+
+		This function is called inside Site.serve. It handles requests for the functions the site registers with its
+		 XML-RPC server, one after the other, until the TM has exited.
+		'''
+
+		functions = site.clientServer.funcs
+
+		while True :
+			try :
+				self._wait(self._requestBell[0])
+			except EOFError :
+				return
+
+			method, args, traceID = marshal.loads(self._requests.get())
+			try :
+				with activate(traceID) :
+					result = functions[method](*args)
+				self._responses.put(marshal.dumps(('result', _plain(result))))
+			except Exception as e :
+				self._responses.put(marshal.dumps(('fault', '%s:%s' % (type(e), e))))
+			os.write(self._responseBell[1], '.')
+
+	def _wait(self, fd) :
+
+		'''
+		args :
+		- fd 						-		The read end of a doorbell.
+
+		This function is called inside Channel.call and Channel.serve. It blocks until the other side rings the doorbell,
+		 and raises an EOFError if the other side has exited instead.
+		'''
+
+		if not os.read(fd, 1) :
+			raise EOFError('the other side of the channel has exited')
@@ -2,10 +2,21 @@
 # Sanjan Prakash Kumar (spk363)
 
 import sys, os
+import argparse
 import traceback
 from pprint import pprint
 import xmlrpclib
 
+import Trace
+from Tracing import Tracer, TracingTransport
+
+class SimulationException(Exception) :
+
+	'''
+	Class used to raise an exception when a request of an input file cannot be processed : an unknown method, or a
+	 request the TM failed to handle.
+	'''
+
 class DES :
 
 	'''
@@ -15,51 +26,179 @@ class DES :
      Discrete Event Simulator (DES).
 	'''
 
-	def __init__(self, inputFileName) :
+	def __init__(self, inputFileName, batch = False, transactionManagerURL = 'http://localhost:7777', hotKeys = 0, startTick = 1, traceFile = None, traceSample = 1.0) :
 
 		'''
 		args :
 		- inputFileName 			-			The name of the input file containing requests that
-												 comprise a simulation.
+												 comprise a simulation, or of a binary trace compiled
+												 from one by Trace.compileTrace.
+		- batch 					-			True, if consecutive reads and writes of the same transaction
+												 are to be sent to the TM as a single request; False, otherwise.
+		- transactionManagerURL 	-			The URL at which the TM is listening.
+		- hotKeys 					-			The number of hottest variables to report once the input file has
+												 been processed. 0, if no report is wanted.
+		- startTick 				-			The clock tick of the first request to be replayed; the
+												 requests before it are skipped.
+		- traceFile 				-			The trace file to be created, to which the spans of the requests are
+												 appended (see Tracing.py). None, if requests are not traced.
+		- traceSample 				-			The fraction of the requests that are traced, between 0 and 1.
 
 		Constructor to initialize all data members of DES class.
 		
 		Data members :
-		- file 						-			The input file.
+		- file 						-			The input file, or None for a binary trace.
+		- trace 					-			Trace.TraceReader of the binary trace, or None for an input file.
 		- transactionManager 		-			The host site that also serves as the TM. We set up a 
 												 connection with the host server created in the
 												 TransactionManager class.
+		- batch 					-			True, if reads and writes are to be batched.
+		- pending 					-			List of (method, arguments) pairs of the reads and writes
+												 waiting to be sent as one batch.
+		- tracer 					-			The Tracer starting a trace for each request, which records nothing if
+												 requests are not traced.
 
 		'''
 
-		self.file = open(inputFileName)
-		self.transactionManager = xmlrpclib.ServerProxy('http://localhost:7777', allow_none = True)
-		self.parse()
+		self.batch = batch
+		self.pending = []
+		self.tracer = Tracer(traceFile, 'DES', traceSample, create = True)
+		self.transactionManager = xmlrpclib.ServerProxy(transactionManagerURL, allow_none = True, transport = TracingTransport() if traceFile else None)
+
+		if Trace.isBinaryTrace(inputFileName) :
+			self.file = None
+			self.trace = Trace.TraceReader(inputFileName)
+			self.replayTrace(startTick)
+			self.trace.close()
+		else :
+			self.file = open(inputFileName)
+			self.trace = None
+			self.parse(startTick)
+
+		if hotKeys :
+			self.reportHotKeys(hotKeys)
 
-	def parse(self) :
+	def parse(self, startTick = 1) :
 
 		'''
+		args :
+		- startTick 				-		The clock tick of the first request to be processed.
+
 		This function is called by the constructor of the DES class. It parses the input file
 		 line-by-line and processes the respective requests through corresponding calls to
 		 the TM.
 		'''
 
+		tick = 0
+
 		for request in self.file.readlines() :
 			request = request.strip()
 
 			if request :
-				self.transactionManager.clockForward()
+				tick += 1
+				if tick < startTick :
+					continue
 
 				command = request.strip().strip(')').split('(')
-				method = command[0]
-				arguments = command[1].split(',')
+				self.process(command[0], command[1].split(','))
+
+		self.flush()
+
+	def replayTrace(self, startTick = 1) :
+
+		'''
+		args :
+		- startTick 				-		The clock tick of the first request to be processed.
+
+		This function is called by the constructor of the DES class in place of DES.parse for a binary trace. The
+		 records are read from the memory-mapped trace, from the record of 'startTick' onwards, and each is processed
+		 like the request it was compiled from.
+		'''
+
+		for method, arguments in Trace.requests(self.trace, startTick) :
+			self.process(method, arguments)
+
+		self.flush()
+
+	def process(self, method, arguments) :
+
+		'''
+		args :
+		- method 					-		The name of the request ('begin', 'R', 'W', ...).
+		- arguments 				-		The list of the arguments of the request, as strings.
+
+		This function is called inside DES.parse and DES.replayTrace for every request. It moves the clock of the
+		 TM and processes the request through the method of DES of the same name.
+		When batching, reads and writes are held back in DES.pending for as long as they belong
+		 to the same transaction, and are sent together by DES.flush once some other request
+		 comes up (or the input ends). Consecutive ends are held back and sent together the same way,
+		 for the TM to commit them as a group.
+		A SimulationException is raised for a request that cannot be processed, so that the caller (Regression, for
+		 instance) can stop the replay and report it.
+		Each request starts a trace of its own (see Tracer.trace), and each batch one more when it is sent.
+		'''
+
+		if self.batch and self.pending :
+			if self.pending[0][0] == 'end' :
+				joins = method == 'end'
+			else :
+				joins = method in ('R', 'W') and arguments[0].strip() == self.pending[0][1][0].strip()
+			if not joins :
+				self.flush()
 
-				try :
-					operation = getattr(self, method)
-					operation(*arguments)
-				except Exception as e :
-					print ("MissingMethod: Unknown method detected.\n",e)
-					sys.exit(1)
+		with self.tracer.trace('%s(%s)' % (method, ','.join(str(a).strip() for a in arguments))) :
+			self.transactionManager.clockForward()
+
+			if self.batch and method in ('R', 'W', 'end') :
+				self.pending.append((method, arguments))
+				return
+
+			try :
+				operation = getattr(self, method)
+				operation(*arguments)
+			except Exception as e :
+				raise SimulationException('%s(%s) : %s' % (method, ','.join(str(a).strip() for a in arguments), e))
+
+	def flush(self) :
+
+		'''
+		This function is called inside DES.process to send the reads and writes held back in DES.pending
+		 to the TM as a single request, and to print the result of each of them. Ends held back are sent
+		 to TransactionManager.endAll.
+		'''
+
+		if not self.pending :
+			return
+
+		if self.pending[0][0] == 'end' :
+			transactionIDs = [arguments[0].strip() for method, arguments in self.pending]
+			with self.tracer.trace('endAll(%s)' % ','.join(transactionIDs)) :
+				results = self.transactionManager.endAll(transactionIDs)
+			for transactionID, result in zip(transactionIDs, results) :
+				print ("------------")
+				print ("end: " + transactionID)
+				print (result)
+			self.pending = []
+			return
+
+		transactionID = self.pending[0][1][0].strip()
+		operations = []
+
+		for method, arguments in self.pending :
+			if method == 'R' :
+				operations.append(('read', arguments[1].strip()))
+			else :
+				operations.append(('write', arguments[1].strip(), int(arguments[2])))
+
+		with self.tracer.trace('execute(%s,%d operations)' % (transactionID, len(operations))) :
+			results = self.transactionManager.execute(transactionID, operations)
+
+		for (method, arguments), result in zip(self.pending, results) :
+			print ("\n------------\n")
+			print (method + ": " + " ".join(str(a) for a in arguments))
+			print (result)
+
+		self.pending = []
 
 	def begin(self, transactionID) :
 
@@ -183,10 +322,42 @@ class DES :
 		print ("dump: ")
 		pprint (self.transactionManager.dump())
 
+	def reportHotKeys(self, n) :
+
+		'''
+		args :
+		- n 						-		The number of variables to report.
+
+		This function is called by the constructor of the DES class once the input file has been processed. It prints
+		 the n variables with the most contention between transactions, and the contention at each site.
+		'''
+
+		report = self.transactionManager.hotKeys(n)
+		columns = ['readLocks', 'writeLocks', 'conflicts', 'waits', 'waitTime', 'deadlocks', 'staleWrites', 'staleReads']
+
+		print ("------------")
+		print ("hot keys: ")
+		print ("%-8s" % 'variable' + "".join("%12s" % c for c in columns))
+		for var, counts in report['variables'] :
+			print ("%-8s" % var + "".join("%12d" % counts.get(c, 0) for c in columns))
+
+		print ("%-8s" % 'site' + "".join("%12s" % c for c in columns[:3]))
+		for siteID, counts in report['sites'] :
+			print ("%-8s" % siteID + "".join("%12d" % counts.get(c, 0) for c in columns[:3]))
+
 
 if __name__ == '__main__':
-	if len(sys.argv) != 2:
-		print ("MissingInput: Please specify the name of the input file.")
+	parser = argparse.ArgumentParser(description = 'Replay an input file against a running TM.')
+	parser.add_argument('inputFileName', help = 'The input file to replay.')
+	parser.add_argument('--batch', action = 'store_true', help = 'Batch consecutive reads and writes of a transaction.')
+	parser.add_argument('--hot-keys', type = int, default = 0, metavar = 'N', help = 'Report the N variables with the most contention at the end.')
+	parser.add_argument('--start-tick', type = int, default = 1, metavar = 'T', help = 'Start the replay at the request of clock tick T.')
+	parser.add_argument('--trace', default = None, metavar = 'FILE', help = 'Write the spans of the requests to a trace file for chrome://tracing.')
+	parser.add_argument('--trace-sample', type = float, default = 1.0, metavar = 'P', help = 'Trace this fraction of the requests (default: 1).')
+	args = parser.parse_args()
+
+	try :
+		driver = DES(args.inputFileName, args.batch, hotKeys = args.hot_keys, startTick = args.start_tick, traceFile = args.trace, traceSample = args.trace_sample)
+	except SimulationException as e :
+		print ('SimulationException: %s' % e)
 		sys.exit(1)
-
-	driver = DES(sys.argv[1])
\ No newline at end of file
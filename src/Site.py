@@ -2,11 +2,15 @@
 # Sudharshann D (sd3770)
 
 import sys
+from array import array
 from SimpleXMLRPCServer import SimpleXMLRPCServer
 
-from Variable import Variable
+from Variable import VariableTable
+from VersionStore import VersionStore
 from LockManager import LockManager
 from LockManager import LockException
+from OptimisticManager import OptimisticManager
+from Tracing import Tracer, TracingRequestHandler
 
 class Site :
 
@@ -29,12 +33,29 @@ class Site :
 	- Site 10 				- 		{x2, x4, x6, x8, x9, x10, x12, x14, x16, x18, x19, x20}
 	'''
 
-	def __init__(self, siteID, port) :
+	# Engines that can decide whether the reads and writes of transactions conflict
+	CONCURRENCY_CONTROLS = ('locking', 'optimistic')
+
+	def __init__(self, siteID, port, numSites = 10, serve = True, concurrencyControl = 'locking', replication = 'available-copies', channel = None, data = None, traceFile = None) :
 
 		'''
 		args :
 		- siteID			-		The unique identifier for a client site. An integer in the range [1,10].
-		- port				-		The port at which to create a server for a client site.
+		- port				-		The port at which to create a server for a client site. 0 lets the OS pick a free port.
+		- numSites 			-		The number of client sites in the cluster, which decides where odd-indexed variables live.
+		- serve 			-		True, if this site is to start serving requests right away; False, if Site.serve will be
+									 called later (for example, once a launcher has been told that the site is ready).
+		- concurrencyControl -		One of Site.CONCURRENCY_CONTROLS : 'locking' for strict two-phase locking with a LockManager;
+									 'optimistic' for optimistic concurrency control with an OptimisticManager.
+		- replication 		-		'available-copies', if every copy of a variable is written by the transactions themselves;
+									 'primary-copy', if the copies of a variable on sites other than its primary site only
+									 receive its committed versions, through Site.applyReplicated.
+		- channel 			-		SharedMemory.Channel on which to handle the requests of the TM, in place of the client
+									 server. None, to handle them over XML-RPC.
+		- data 				-		The partitions of the initial values of the variables of this site, as split by BulkLoader.
+									 None, for the values 10*i of x1, ..., x20.
+		- traceFile 		-		The trace file to which spans are appended for the requests handled under a trace (see
+									 Tracing.py). None, if requests are not traced.
 
 		Constructor to initialize all data members of Site class.
 
@@ -42,18 +63,38 @@ class Site :
 
 		- clientServer  	-		Server object representing the client server for this particular site.
 		- ID 				-		The unique ID associated with each of the 10 client sites. An integer in the range [1,10].		
+		- numSites 			-		The number of client sites in the cluster.
+		- port 				-		The port at which the client server is listening.
+		- replication 		-		The replication scheme of the cluster.
+		- channel 			-		The SharedMemory.Channel to the TM, or None.
 		- isActive 			-		Status of the client site. True, by default. Set to False, immediately upon the failure of the site.	
 		- siteVariables 	-		Dictionary to maintain each Variable object as value where the key is the Variable ID (x1, x2, ...).
-		- lockManager 		-		LockManager object to manage the read/write locks over the variables on this particular site.
+									 A VariableTable, which only creates the Variable object of a variable once it is accessed.
+		- lockManager 		-		LockManager object to manage the read/write locks over the variables on this particular site, or
+									 OptimisticManager object to record the read and write sets of transactions instead.
+		- versionStore 		-		VersionStore object holding every committed version of the variables on this site, used by
+									 Site.snapshotAt. None, if NumPy is not installed or if the variables are bulk loaded.
+		- tracer 			-		The Tracer recording the spans of this site, or None.
 		
 		'''
 
 		self.ID = siteID
+		self.numSites = numSites
+		self.replication = replication
+		self.channel = channel
 		self.isActive = True
-		self._initVariables()
-		self.lockManager = LockManager(self.siteVariables.keys())
+		self.tracer = Tracer(traceFile, 'site%d' % siteID) if traceFile else None
+		self.versionStore = VersionStore() if VersionStore.isAvailable() and data is None else None
+		self._initVariables(data)
+		if concurrencyControl == 'optimistic' :
+			self.lockManager = OptimisticManager(self.siteVariables)
+		else :
+			self.lockManager = LockManager(self.siteVariables)
 		self._createClient(port)
 
+		if serve :
+			self.serve()
+
 	def _createClient(self, port) :
 
 		'''
@@ -64,22 +105,47 @@ class Site :
 		It creates a server that represents a client site holding some variables. This server will be
 		 handling requests to read, write and commit values to its variables. It will also simulate 
 		 the failure and recovery of this site. We also register functions with this server that will
-         be used for each of these requests.
+         be used for each of these requests. When tracing, each of them is registered so as to record its spans.
 		'''
-		self.clientServer = SimpleXMLRPCServer(("localhost", port), allow_none = True)
+		if self.tracer :
+			self.clientServer = SimpleXMLRPCServer(("localhost", port), TracingRequestHandler, allow_none = True)
+			register = lambda function : self.clientServer.register_function(self.tracer.traced(function))
+		else :
+			self.clientServer = SimpleXMLRPCServer(("localhost", port), allow_none = True)
+			register = self.clientServer.register_function
+		self.port = self.clientServer.server_address[1]
+
+		register(self.getID)
+		register(self.isUp)
+		register(self.isReading)
+		register(self.read)
+		register(self.write)
+		register(self.execute)
+		register(self.fail)
+		register(self.recover)
+		register(self.prepare)
+		register(self.validate)
+		register(self.commit)
+		register(self.prepareGroup)
+		register(self.commitGroup)
+		register(self.applyReplicated)
+		register(self.dump)
+		register(self.snapshotAt)
+		register(self.contention)
+		register(self.abort)
+
+	def serve(self) :
 
-		self.clientServer.register_function(self.getID)
-		self.clientServer.register_function(self.isUp)
-		self.clientServer.register_function(self.isReading)
-		self.clientServer.register_function(self.read)
-		self.clientServer.register_function(self.write)
-		self.clientServer.register_function(self.fail)
-		self.clientServer.register_function(self.recover)
-		self.clientServer.register_function(self.commit)
-		self.clientServer.register_function(self.dump)
-		self.clientServer.register_function(self.abort)
+		'''
+		This function is called by the constructor of the Site class, or by Launcher once it has forked this site.
+		 It handles requests to this client site until the process is stopped, over the shared-memory channel of the
+		 site if it has one.
+		'''
 
-		self.clientServer.serve_forever()
+		if self.channel :
+			self.channel.serve(self)
+		else :
+			self.clientServer.serve_forever()
 
 	def getID(self) :
 
@@ -129,8 +195,10 @@ class Site :
 		 a read-only transaction, then there is no need to acquire a read-lock on this variable. However, if it
 		 is a read-write transaction, then it must first acquire a read-lock before performing the read. While
 		 acquiring the lock, it could conflict with some transaction that must own a write-lock on the same
-		 variable. In this case, the read-lock cannot be acquired and a LockException is raised.
-		A status report is returned to the TM, indicating the success/failure of the read request.
+		 variable. In this case, the read-lock cannot be acquired and a LockException is raised. A read-write
+		 transaction under snapshot isolation reads like a read-only one, without a read-lock.
+		A status report is returned to the TM, indicating the success/failure of the read request. For read-only
+		 transactions, it also carries the commit timestamp of the version read, which the TM uses to cache it.
 		'''
 
 		try :
@@ -140,9 +208,11 @@ class Site :
 				if self.lockManager.hasWriteLock(transaction, varID) :
 					return {'status': 'success', 'data': self.siteVariables[varID].readUncommitted(transaction)}
 				else :
-					if transaction['isRW'] :
+					if transaction['isRW'] and not transaction.get('isSnapshot') :
 						self.lockManager.acquireReadLock(transaction, varID)
-					return {'status': 'success', 'data': self.siteVariables[varID].readCommitted(transaction)}
+						return {'status': 'success', 'data': self.siteVariables[varID].readCommitted(transaction)}
+					time, value = self.siteVariables[varID].readVersion(transaction)
+					return {'status': 'success', 'data': value, 'version': time}
 			else :
 				return {'status': 'error', 'data': None}
 		except LockException as LE :
@@ -171,6 +241,60 @@ class Site :
 		except LockException as LE :
 			return {'status': 'exception', 'args': LE.args}
 
+	def execute(self, transaction, operations, apply = True) :
+
+		'''
+		args :
+		- transaction 		-		The transaction that wishes to perform the operations on this site.
+		- operations 		-		List of operations, in order. Each is either ('read', varID) or ('write', varID, value).
+		- apply 			-		True, if the operations are to be performed when there is no conflict; False, if we
+									 only check for conflicts.
+
+		Notable local variables :
+		- conflicts 		-		List of [index, isWriteLocked, conflictingTransactions] entries, one for each operation
+									 whose lock would conflict with another transaction.
+
+		This function is called inside TransactionManager.execute to perform all the reads and writes of a transaction
+		 on this site with a single request. We first check all the locks needed by these operations in one pass. If any
+		 of them conflicts with another transaction, nothing is acquired and every conflict is reported, with the same
+		 arguments as the LockException that the corresponding Site.read or Site.write would have raised. Otherwise, all
+		 the operations are performed in order and their status reports are returned as a list.
+		Conflicts found here are never counted in the contention counters of the lock manager : the operations that
+		 failed are sent again one at a time by TransactionManager.execute, and Site.read and Site.write count them then.
+		'''
+
+		conflicts = []
+
+		for index, operation in enumerate(operations) :
+			varID = operation[1]
+			if not varID in self.siteVariables :
+				return {'status': 'error'}
+
+			if operation[0] == 'write' :
+				conflict = self.lockManager.writeConflict(transaction, varID)
+			elif transaction['isRW'] and not transaction.get('isSnapshot') and not self.siteVariables[varID].isRecovering() :
+				conflict = self.lockManager.readConflict(transaction, varID)
+			else :
+				conflict = None
+
+			if conflict :
+				conflicts.append([index] + conflict)
+
+		if conflicts :
+			return {'status': 'exception', 'conflicts': conflicts}
+		if not apply :
+			return {'status': 'success', 'results': []}
+
+		results = []
+
+		for operation in operations :
+			if operation[0] == 'write' :
+				results.append(self.write(transaction, operation[1], operation[2]))
+			else :
+				results.append(self.read(transaction, operation[1]))
+
+		return {'status': 'success', 'results': results}
+
 	def fail(self) :
 
 		'''
@@ -182,6 +306,8 @@ class Site :
 		if self.isUp() :
 			self.isActive = False
 			self.lockManager.releaseAllLocks()
+			for var in self.siteVariables.materialized() :
+				var.discard()
 
 	def recover(self) :
 
@@ -189,15 +315,65 @@ class Site :
 		This function is called inside TransactionManager.recover when a failed client site recovers. When that
 		 happens, we recover all those variables that had originally existed on this site and that also have
 		 separate copies existing on other client sites, i.e. even-indexed variables.
+		Under primary-copy replication, there is nothing to recover : the versions committed while this site was down
+		 are still queued for it by the Replicator of the TM, and are applied in order once it is back up.
 		'''
 
-		if not self.isUp() :
-			for varID, var in self.siteVariables.iteritems() :
-				if var.isReplicated() :
-					var.recover()
-
+		if not self.isUp() and self.replication == 'primary-copy' :
+			self.isActive = True
+		elif not self.isUp() :
+			self.siteVariables.recover()
 			self.isActive = True
 
+	def prepare(self, transaction) :
+
+		'''
+		args :
+		- transaction 				- 			The transaction that has reached its natural end and is about to commit.
+
+		This function is called inside TransactionManager.end as the first phase of two-phase commit. This site votes
+		 to commit this transaction only if it is up and still holds the write-locks acquired by this transaction,
+		 i.e. it has not failed since this transaction wrote to it. Nothing is changed on this site.
+		'''
+
+		if self.isUp() :
+			if self.lockManager.getWriteLocks(transaction) :
+				return True
+
+		return False
+
+	def validate(self, transaction) :
+
+		'''
+		args :
+		- transaction 				- 			A transaction under snapshot isolation or optimistic concurrency control that is
+												 about to commit.
+
+		This function is called inside TransactionManager.end in place of Site.prepare for transactions under snapshot
+		 isolation, and on every site accessed by a transaction under optimistic concurrency control.
+		- Under snapshot isolation, besides the checks of Site.prepare, it checks that no other transaction has committed
+			any of the variables written by this transaction on this site since this transaction began (first-committer-
+			wins). Since this transaction holds the write-locks on them, no other transaction can commit them before it ends.
+		- Under optimistic concurrency control, it checks that no other transaction has committed any of the variables
+			read by this transaction on this site since it read them (see OptimisticManager.staleReads).
+		A status report is returned to the TM : 'success', 'failed' if this site is down (or, under snapshot isolation, if
+		 Site.prepare would vote no), or 'conflict' with the IDs of the variables committed by other transactions.
+		'''
+
+		if transaction.get('isSnapshot') :
+			if not self.prepare(transaction) :
+				return {'status': 'failed'}
+			conflicts = [varID for varID in self.lockManager.getWriteLocks(transaction) if self.siteVariables[varID].commitTimes[-1] > transaction['timeStamp']]
+		elif self.isUp() :
+			conflicts = self.lockManager.staleReads(transaction)
+		else :
+			return {'status': 'failed'}
+
+		if conflicts :
+			return {'status': 'conflict', 'args': sorted(conflicts)}
+
+		return {'status': 'success'}
+
 	def commit(self, transaction, timestamp) :
 
 		'''
@@ -205,17 +381,72 @@ class Site :
 		- transaction 				- 			The transaction that has reached its natural end and needs to commit its operations.
 		- timestamp 				-			The time instance at which this transaction ends.
 
-		This function is called inside TransactionManager.end. When a transaction reaches its natural end, we 
+		This function is called inside TransactionManager.end, once every site holding write-locks for this transaction
+		 has voted to commit it in Site.prepare. When a transaction reaches its natural end, we 
 		 need to commit all the most-recent writes performed it. Further, since this transaction is ending, we
 		 also release all the locks (both, read and write) owned by this transaction. 
 		'''
 		
-		for varID in self.siteVariables.keys() :
-			if (self.lockManager.hasWriteLock(transaction, varID)) :
-				self.siteVariables[varID].commit(timestamp)
+		for varID in self.lockManager.getWriteLocks(transaction) :
+			var = self.siteVariables[varID]
+			var.commit(timestamp, transaction)
+			if self.versionStore :
+				self.versionStore.append(int(varID[1:]), timestamp, var.commitWriters[-1], var.commitValues[-1])
 
 		self.lockManager.releaseAllLocks(transaction)
 
+	def prepareGroup(self, transactions) :
+
+		'''
+		args :
+		- transactions 				- 			The transactions that have reached their natural end together.
+
+		This function is called inside TransactionManager.endAll, as the first phase of a group commit. It returns the
+		 vote of Site.prepare for each of these transactions, in order, with a single request.
+		'''
+
+		return [self.prepare(transaction) for transaction in transactions]
+
+	def commitGroup(self, commits, releases, timestamp) :
+
+		'''
+		args :
+		- commits 					- 			The transactions to be committed on this site, in order.
+		- releases 					- 			The transactions that have only read on this site, whose locks are to be released.
+		- timestamp 				-			The time instance at which these transactions end.
+
+		This function is called inside TransactionManager.endAll, as the second phase of a group commit. It performs
+		 Site.commit and Site.abort for all these transactions with a single request.
+		'''
+
+		for transaction in commits :
+			self.commit(transaction, timestamp)
+		for transaction in releases :
+			self.abort(transaction)
+
+	def applyReplicated(self, versions) :
+
+		'''
+		args :
+		- versions 					-			Versions committed at the primary sites of variables on this site, in commit order,
+												 as [varID, time of commit, txnID, value] lists.
+
+		This function is called by the Replicator of the TM under primary-copy replication. It applies each version to
+		 the copy of its variable on this site, and returns True; or False, if this site is down, in which case the
+		 versions are sent again later.
+		'''
+
+		if not self.isUp() :
+			return False
+
+		for varID, timeStamp, txnID, value in versions :
+			var = self.siteVariables[varID]
+			var.install(timeStamp, txnID, value)
+			if self.versionStore :
+				self.versionStore.append(int(varID[1:]), timeStamp, var.commitWriters[-1], value)
+
+		return True
+
 	def dump(self) :
 
 		'''
@@ -232,6 +463,44 @@ class Site :
 
 		return output
 
+	def snapshotAt(self, timeStamp) :
+
+		'''
+		args :
+		- timeStamp 			-			The time instance as of which the variables are to be read.
+
+		This function is called inside TransactionManager.snapshotAt. It retrieves, for every variable on this site, the
+		 most recent value committed at or before 'timeStamp'. A dictionary is returned, where the keys are the IDs of
+		 the variables and the values are lists of the time of commit, the ID of the committing transaction and the value.
+		If NumPy is installed, all variables are looked up at once in Site.versionStore; otherwise, one at a time.
+		'''
+
+		output = {}
+
+		if self.versionStore :
+			varIDs = self.siteVariables.keys()
+			found, times, writers, values = self.versionStore.snapshotAt(timeStamp, [int(varID[1:]) for varID in varIDs])
+			for i, varID in enumerate(varIDs) :
+				if found[i] :
+					output[varID] = [int(times[i]), self.siteVariables.writers.writerOf(int(writers[i])), int(values[i])]
+		else :
+			asOf = {'isRW': False, 'timeStamp': timeStamp}
+			for varID, var in self.siteVariables.iteritems() :
+				time, (txnID, value) = var.readVersion(asOf)
+				if time <= timeStamp :
+					output[varID] = [time, txnID, value]
+
+		return output
+
+	def contention(self) :
+
+		'''
+		This function is called inside TransactionManager.hotKeys. It retrieves the counters kept by the lock manager of
+		 this site for each of its variables : the read-locks and write-locks granted and the conflicts caused.
+		'''
+
+		return self.lockManager.contention
+
 	def abort(self, transaction) :
 
 		'''
@@ -241,30 +510,49 @@ class Site :
 		This function is called inside TransactionManager._abort, which in turn is called when a transaction 
 		 reaches its natural end or when it must be forcibly aborted either due to the failure of a site being
 		 accessed by this transaction or due to the detection of a deadlock. In either case, all we do is
-		 release all the locks over the variables of this site owned by this transaction.
+		 drop the uncommitted writes of this transaction and release all the locks over the variables of this
+		 site owned by this transaction.
 		'''
 
+		for varID in self.lockManager.getWriteLocks(transaction) :
+			self.siteVariables[varID].discard(transaction)
 		self.lockManager.releaseAllLocks(transaction)
 
-	def _initVariables(self) :
+	def _initVariables(self, data = None) :
 
 		'''
+		args :
+		- data 				-		The partitions of the initial values of the variables of this site, or None.
+
         This function is called by the constructor of the Site class.
-        It creates Variable objects for each of the variables that this site holds. It also initializes
-         with some default values that depend on their IDs. We place the even-indexed variables in all 
+        It creates the VariableTable of the variables that this site holds. Unless they are bulk loaded, they are
+         initialized with some default values that depend on their IDs. We place the even-indexed variables in all
          of the client sites, but we are more selective with the odd-indexed variables.
         '''
-		
-		self.siteVariables = {}
+
+		if data is not None :
+			self.siteVariables = VariableTable(data)
+			return
+
+		evens = (array('I'), array('l'))
+		odds = (array('I'), array('l'))
 
 		for i in range(1, 21) :
-			varID = 'x' + str(i)
 			value = 10*i
 
-			if (i%2 == 0) :		
-				self.siteVariables[varID] = Variable(varID, value)
-			elif (1 + (i%10) == self.ID) :
-				self.siteVariables[varID] = Variable(varID, value)
+			if (i%2 == 0) :
+				partition = evens
+			elif (1 + (i%self.numSites) == self.ID) :
+				partition = odds
+			else :
+				continue
+
+			partition[0].append(i)
+			partition[1].append(value)
+			if self.versionStore :
+				self.versionStore.append(i, 0, 0, value)
+
+		self.siteVariables = VariableTable([evens, odds])
 
 
 if __name__ == '__main__' :
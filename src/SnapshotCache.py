@@ -0,0 +1,176 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+from bisect import bisect_right
+from collections import OrderedDict
+
+class SnapshotCache(object) :
+
+	'''
+	Class that will serve as a bounded LRU cache of committed versions, kept at the TM.
+	Once a value has been committed, the version that a read-only transaction sees at its snapshot
+	 timestamp can never change. We exploit this by remembering committed versions along with the
+	 range of timestamps for which each of them is known to be the visible one, so that repeated
+	 snapshot reads of the same variable can be answered without contacting any client site.
+	'''
+
+	def __init__(self, capacity = 1024) :
+
+		'''
+		args :
+		- capacity 				-		The maximum number of versions to hold. A capacity of 0 disables the cache.
+
+		Constructor to initialize all data members of SnapshotCache class.
+
+		Data members :
+
+		- capacity 				-		The maximum number of versions to hold.
+		- hits 					-		Number of lookups answered from the cache.
+		- misses 				-		Number of lookups that had to go to a client site.
+		- evictions 			-		Number of versions dropped to stay within the capacity.
+		- _entries 				-		Ordered dictionary (least recently used first) where the keys are (varID, commit timestamp)
+										 and the values are [data, validThrough]. 'data' is the committed (txnID, value) pair and
+										 'validThrough' is the last timestamp known to see this version, or None if this is the
+										 most recent version of the variable.
+		- _versions 			-		Dictionary where the keys are variable IDs and the values are sorted lists of the commit
+										 timestamps of their cached versions.
+		- _lastCommit 			-		Dictionary where the keys are variable IDs and the values are the timestamps of their
+										 most recent commits. Variables that were never written carry their initial value from
+										 time 0.
+		'''
+
+		self.capacity = capacity
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self._entries = OrderedDict()
+		self._versions = {}
+		self._lastCommit = {}
+
+	def lookup(self, varID, timeStamp) :
+
+		'''
+		args :
+		- varID 				-		The ID of the variable to be read.
+		- timeStamp 			-		The snapshot timestamp of the read-only transaction.
+
+		This function is called inside TransactionManager.read for read-only transactions. It finds the most recent
+		 cached version committed at or before 'timeStamp' and returns its data if that version is known to still be
+		 the visible one at 'timeStamp'. Otherwise, None is returned and the read must go to a client site.
+		'''
+
+		versions = self._versions.get(varID)
+
+		if versions :
+			i = bisect_right(versions, timeStamp) - 1
+			if i >= 0 :
+				key = (varID, versions[i])
+				entry = self._entries[key]
+				if entry[1] is None or entry[1] >= timeStamp :
+					self._touch(key)
+					self.hits += 1
+					return entry[0]
+
+		self.misses += 1
+		return None
+
+	def commit(self, varID, timeStamp, txnID, value) :
+
+		'''
+		args :
+		- varID 				-		The ID of the variable being committed.
+		- timeStamp 			-		The time instance of the commit.
+		- txnID 				-		The ID of the committing transaction.
+		- value 				-		The committed value.
+
+		This function is called inside TransactionManager.end once a transaction has committed at all of its sites. The
+		 version that was the most recent one until now stops being visible at 'timeStamp', and the new version
+		 becomes the most recent one.
+		'''
+
+		previous = self._entries.get((varID, self._lastCommit.get(varID, 0)))
+		if previous is not None and previous[1] is None :
+			previous[1] = timeStamp - 1
+
+		self._lastCommit[varID] = timeStamp
+		self._insert(varID, timeStamp, [[txnID, value], None])
+
+	def insert(self, varID, commitTimeStamp, data, timeStamp) :
+
+		'''
+		args :
+		- varID 				-		The ID of the variable that was read.
+		- commitTimeStamp 		-		The commit timestamp of the version returned by the client site.
+		- data 					-		The (txnID, value) pair returned by the client site.
+		- timeStamp 			-		The snapshot timestamp of the read-only transaction that read it.
+
+		This function is called inside TransactionManager.read after a read-only transaction has read from a client site.
+		 If the version read is the most recent commit of the variable, it stays visible until the next commit.
+		 Otherwise, we only know that it is visible up to 'timeStamp'.
+		'''
+
+		if commitTimeStamp == self._lastCommit.get(varID, 0) :
+			validThrough = None
+		else :
+			validThrough = timeStamp
+
+		key = (varID, commitTimeStamp)
+		entry = self._entries.get(key)
+
+		if entry is not None :
+			if entry[1] is not None and (validThrough is None or validThrough > entry[1]) :
+				entry[1] = validThrough
+			self._touch(key)
+		else :
+			self._insert(varID, commitTimeStamp, [list(data), validThrough])
+
+	def stats(self) :
+
+		'''
+		This function is called inside TransactionManager.snapshotCacheStats. It reports the hit, miss and eviction
+		 counters along with the number of versions currently held.
+		'''
+
+		return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'size': len(self._entries), 'capacity': self.capacity}
+
+	def _insert(self, varID, commitTimeStamp, entry) :
+
+		'''
+		args :
+		- varID 				-		The ID of the variable.
+		- commitTimeStamp 		-		The commit timestamp of the version.
+		- entry 				-		The [data, validThrough] pair to be held for this version.
+
+		This function is called inside SnapshotCache.commit and SnapshotCache.insert. It adds a version as the most
+		 recently used one and evicts the least recently used versions beyond the capacity.
+		'''
+
+		if self.capacity <= 0 :
+			return
+
+		key = (varID, commitTimeStamp)
+		if key in self._entries :
+			del self._entries[key]
+		else :
+			versions = self._versions.setdefault(varID, [])
+			versions.insert(bisect_right(versions, commitTimeStamp), commitTimeStamp)
+		self._entries[key] = entry
+
+		while len(self._entries) > self.capacity :
+			(evictedVar, evictedTimeStamp), _ = self._entries.popitem(last = False)
+			versions = self._versions[evictedVar]
+			versions.remove(evictedTimeStamp)
+			if not versions :
+				del self._versions[evictedVar]
+			self.evictions += 1
+
+	def _touch(self, key) :
+
+		'''
+		args :
+		- key 					-		The (varID, commit timestamp) of the version being used.
+
+		This function marks a version as the most recently used one.
+		'''
+
+		self._entries[key] = self._entries.pop(key)
@@ -0,0 +1,266 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+import sys
+import mmap
+import struct
+import argparse
+
+'''
+Binary form of the input files of the simulator. An input file is compiled once into a header followed by one
+ fixed-width record per request, so that a replay reads each request with a single struct.unpack_from from a
+ memory-mapped file instead of splitting and stripping its line. Since every request moves the clock of the TM by
+ one unit, the record of the request at clock tick t (1, 2, ...) lives at a fixed offset, and a replay can start
+ at any tick.
+
+Header : magic 'RCTR', format version, number of records.
+Record : opcode, transaction number (i for Ti), variable number (i for xi) or site ID, value.
+
+Usage : python2 Trace.py compile Test1.txt Test1.bin
+        python2 Trace.py decompile Test1.bin
+'''
+
+MAGIC = 'RCTR'
+VERSION = 1
+HEADER = struct.Struct('<4sHxxI')
+RECORD = struct.Struct('<B3xIIq')
+
+# Number of records unpacked by a single call when records are read in order
+CHUNK = 1024
+CHUNK_RECORDS = struct.Struct('<' + 'B3xIIq' * CHUNK)
+
+# Opcodes of the requests, in the order of the methods of DES they are replayed with
+BEGIN, BEGIN_RO, READ, WRITE, END, FAIL, RECOVER, DUMP = range(1, 9)
+METHODS = {BEGIN: 'begin', BEGIN_RO: 'beginRO', READ: 'R', WRITE: 'W', END: 'end', FAIL: 'fail', RECOVER: 'recover', DUMP: 'dump'}
+OPCODES = dict((method, opcode) for opcode, method in METHODS.iteritems())
+
+class TraceFormatException(Exception) :
+
+	'''
+	Class used to raise an exception when an input file cannot be compiled, or a binary trace cannot be read.
+	'''
+
+def _number(argument, prefix, lineNumber) :
+
+	'''
+	args :
+	- argument 					-		An argument of a request, such as 'T3' or 'x12'.
+	- prefix 					-		The letter expected before the number ('T' or 'x'), or '' for a plain number.
+	- lineNumber 				-		The number of the line of the request, for error messages.
+
+	This function is called inside compileTrace to turn an argument into the number stored in a record.
+	'''
+
+	argument = argument.strip()
+	if not argument.startswith(prefix) or not argument[len(prefix):].lstrip('-').isdigit() :
+		raise TraceFormatException('line %d : expected %s<number>, found %r' % (lineNumber, prefix, argument))
+	return int(argument[len(prefix):])
+
+def compileTrace(inputFileName, outputFileName) :
+
+	'''
+	args :
+	- inputFileName 			-		The input file, in the grammar of the files under data/.
+	- outputFileName 			-		The binary trace to be written.
+
+	This function compiles an input file into a binary trace and returns the number of records written. Blank lines
+	 are skipped, as the simulator does.
+	'''
+
+	records = []
+
+	with open(inputFileName) as f :
+		for lineNumber, request in enumerate(f, 1) :
+			request = request.strip()
+			if not request :
+				continue
+
+			command = request.strip(')').split('(')
+			method = command[0].strip()
+			arguments = command[1].split(',') if len(command) > 1 else []
+
+			if not method in OPCODES :
+				raise TraceFormatException('line %d : unknown request %r' % (lineNumber, request))
+			opcode = OPCODES[method]
+
+			if opcode in (BEGIN, BEGIN_RO, END) :
+				records.append(RECORD.pack(opcode, _number(arguments[0], 'T', lineNumber), 0, 0))
+			elif opcode == READ :
+				records.append(RECORD.pack(opcode, _number(arguments[0], 'T', lineNumber), _number(arguments[1], 'x', lineNumber), 0))
+			elif opcode == WRITE :
+				records.append(RECORD.pack(opcode, _number(arguments[0], 'T', lineNumber), _number(arguments[1], 'x', lineNumber), _number(arguments[2], '', lineNumber)))
+			elif opcode in (FAIL, RECOVER) :
+				records.append(RECORD.pack(opcode, 0, _number(arguments[0], '', lineNumber), 0))
+			else :
+				records.append(RECORD.pack(opcode, 0, 0, 0))
+
+	with open(outputFileName, 'wb') as f :
+		f.write(HEADER.pack(MAGIC, VERSION, len(records)))
+		f.write(''.join(records))
+
+	return len(records)
+
+def isBinaryTrace(fileName) :
+
+	'''
+	args :
+	- fileName 					-		The name of an input file or of a binary trace.
+
+	This function is called inside DES to tell a binary trace from an input file.
+	'''
+
+	with open(fileName, 'rb') as f :
+		return f.read(len(MAGIC)) == MAGIC
+
+class TraceReader(object) :
+
+	'''
+	Class that will serve as a reader of a binary trace, memory-mapped so that only the records being replayed are
+	 ever read from the file.
+	'''
+
+	def __init__(self, fileName) :
+
+		'''
+		args :
+		- fileName 					-		The name of the binary trace.
+
+		Constructor to initialize all data members of TraceReader class.
+
+		Data members :
+
+		- file 						-		The binary trace.
+		- buffer 					-		The memory map of the binary trace.
+		- count 					-		The number of records in the binary trace.
+		'''
+
+		self.file = open(fileName, 'rb')
+		self.buffer = mmap.mmap(self.file.fileno(), 0, access = mmap.ACCESS_READ)
+
+		magic, version, self.count = HEADER.unpack_from(self.buffer, 0)
+		if magic != MAGIC or version != VERSION :
+			raise TraceFormatException('%s is not a binary trace of version %d' % (fileName, VERSION))
+		if len(self.buffer) != HEADER.size + self.count * RECORD.size :
+			raise TraceFormatException('%s is truncated' % fileName)
+
+	def __len__(self) :
+		return self.count
+
+	def __getitem__(self, i) :
+
+		'''
+		args :
+		- i 						-		The index of a record; record i holds the request at clock tick i + 1.
+
+		This function returns the (opcode, transaction number, variable number or site ID, value) of a record.
+		'''
+
+		if not 0 <= i < self.count :
+			raise IndexError('record %d out of range' % i)
+		return RECORD.unpack_from(self.buffer, HEADER.size + i * RECORD.size)
+
+	def records(self, startTick = 1) :
+
+		'''
+		args :
+		- startTick 				-		The clock tick of the first request to be read.
+
+		This function yields the records of the requests from 'startTick' onwards, in order. They are unpacked
+		 CHUNK at a time.
+		'''
+
+		first = max(startTick, 1) - 1
+		fullChunks = (self.count - first) // CHUNK if first < self.count else 0
+
+		for i in xrange(fullChunks) :
+			fields = iter(CHUNK_RECORDS.unpack_from(self.buffer, HEADER.size + (first + i * CHUNK) * RECORD.size))
+			for record in zip(fields, fields, fields, fields) :
+				yield record
+
+		for i in xrange(first + fullChunks * CHUNK, self.count) :
+			yield RECORD.unpack_from(self.buffer, HEADER.size + i * RECORD.size)
+
+	def close(self) :
+
+		'''
+		This function releases the memory map and the file.
+		'''
+
+		self.buffer.close()
+		self.file.close()
+
+def requests(reader, startTick = 1) :
+
+	'''
+	args :
+	- reader 					-		The TraceReader of a binary trace.
+	- startTick 				-		The clock tick of the first request to be read.
+
+	This function is called inside DES.replayTrace. It yields the requests of a binary trace as (method, arguments)
+	 pairs, as DES.parse would have found them in the input file. The IDs of transactions and variables are only
+	 formatted once each.
+	'''
+
+	txnIDs = {}
+	varIDs = {}
+
+	for opcode, txn, var, value in reader.records(startTick) :
+		if opcode in (READ, WRITE) :
+			txnID = txnIDs.get(txn) or txnIDs.setdefault(txn, 'T%d' % txn)
+			varID = varIDs.get(var) or varIDs.setdefault(var, 'x%d' % var)
+			if opcode == READ :
+				yield 'R', [txnID, varID]
+			else :
+				yield 'W', [txnID, varID, str(value)]
+		elif opcode in (FAIL, RECOVER) :
+			yield METHODS[opcode], [str(var)]
+		elif opcode == DUMP :
+			yield 'dump', ['']
+		else :
+			yield METHODS[opcode], [txnIDs.get(txn) or txnIDs.setdefault(txn, 'T%d' % txn)]
+
+def decompile(fileName) :
+
+	'''
+	args :
+	- fileName 					-		The name of the binary trace.
+
+	This function yields the requests of a binary trace as lines of the grammar of the files under data/.
+	'''
+
+	reader = TraceReader(fileName)
+	try :
+		for opcode, txn, var, value in reader.records() :
+			if opcode in (BEGIN, BEGIN_RO, END) :
+				yield '%s(T%d)' % (METHODS[opcode], txn)
+			elif opcode == READ :
+				yield 'R(T%d,x%d)' % (txn, var)
+			elif opcode == WRITE :
+				yield 'W(T%d,x%d,%d)' % (txn, var, value)
+			elif opcode in (FAIL, RECOVER) :
+				yield '%s(%d)' % (METHODS[opcode], var)
+			else :
+				yield 'dump()'
+	finally :
+		reader.close()
+
+
+if __name__ == '__main__' :
+	parser = argparse.ArgumentParser(description = 'Compile input files of the simulator into binary traces, or back.')
+	subparsers = parser.add_subparsers(dest = 'command')
+	compileParser = subparsers.add_parser('compile', help = 'Compile an input file into a binary trace.')
+	compileParser.add_argument('inputFileName')
+	compileParser.add_argument('outputFileName')
+	decompileParser = subparsers.add_parser('decompile', help = 'Print a binary trace as an input file.')
+	decompileParser.add_argument('traceFileName')
+	args = parser.parse_args()
+
+	try :
+		if args.command == 'compile' :
+			print ('Compiled %d requests into %s' % (compileTrace(args.inputFileName, args.outputFileName), args.outputFileName))
+		else :
+			for line in decompile(args.traceFileName) :
+				print (line)
+	except TraceFormatException as e :
+		print ('TraceFormatException: %s' % e)
+		sys.exit(1)
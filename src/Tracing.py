@@ -0,0 +1,367 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+import os
+import json
+import time
+import thread
+import random
+import itertools
+import threading
+import xmlrpclib
+from contextlib import contextmanager
+from SimpleXMLRPCServer import SimpleXMLRPCRequestHandler
+
+'''
+Tracing of the requests of a replay across the simulator, the TM and the client sites. Every request sent by DES gets
+ a trace ID (or, when sampling, only some of them do), which goes along with every request it causes : in an HTTP
+ header over XML-RPC (TracingTransport, TracingRequestHandler), or in the frame of a shared-memory request. Each
+ process holding a Tracer records a span for every request it handles or sends under a trace, and appends it to a
+ trace file in the trace event format of Chrome, so that a whole replay can be opened in chrome://tracing or Perfetto.
+
+The ID of the trace a thread works for is kept in a thread-local variable, so that the functions between the server
+ of a process and its clients need not pass it along.
+'''
+
+HEADER = 'X-Trace-ID'
+
+_context = threading.local()
+
+def currentTrace() :
+
+	'''
+	This function returns the ID of the trace the calling thread works for, or None.
+	'''
+
+	return getattr(_context, 'traceID', None)
+
+@contextmanager
+def activate(traceID) :
+
+	'''
+	args :
+	- traceID 					-		The ID of a trace, or None.
+
+	This function returns a context manager by which the calling thread works for the trace 'traceID' (for none, if it
+	 is None), and then for the trace it worked for before.
+	'''
+
+	previous = currentTrace()
+	_context.traceID = traceID
+	try :
+		yield
+	finally :
+		_context.traceID = previous
+
+def bind(function) :
+
+	'''
+	args :
+	- function 					-		The function to be called from other threads.
+
+	This function returns 'function' wrapped so that it is called for the trace of the calling thread, from whichever
+	 thread (of TransactionManager._sitePool, for instance) it is called.
+	'''
+
+	traceID = currentTrace()
+	if traceID is None :
+		return function
+
+	def call(*args) :
+		with activate(traceID) :
+			return function(*args)
+
+	return call
+
+class TracingTransport(xmlrpclib.Transport) :
+
+	'''
+	Class used as the transport of an xmlrpclib.ServerProxy, which sends the ID of the trace of the calling thread along
+	 with each request.
+	'''
+
+	def send_content(self, connection, request_body) :
+
+		'''
+		args :
+		- connection 				-		The HTTP connection the request is sent over, whose headers are not yet ended.
+		- request_body 				-		The XML-RPC request.
+
+		This function is called by xmlrpclib.Transport.single_request. It adds the header of the trace of the calling
+		 thread, if any, and then ends the headers and sends the request.
+		'''
+
+		traceID = currentTrace()
+		if traceID is not None :
+			connection.putheader(HEADER, traceID)
+		xmlrpclib.Transport.send_content(self, connection, request_body)
+
+class TracingRequestHandler(SimpleXMLRPCRequestHandler) :
+
+	'''
+	Class used as the request handler of a SimpleXMLRPCServer, which handles each request for the trace whose ID came
+	 along with it.
+	'''
+
+	def _dispatch(self, method, params) :
+
+		'''
+		args :
+		- method 					-		The name of the function requested.
+		- params 					-		The arguments of the request.
+
+		This function is called by SimpleXMLRPCRequestHandler.do_POST. It calls the function registered with the server
+		 for the trace given in the header of the request, if any.
+		'''
+
+		with activate(self.headers.get(HEADER)) :
+			return self.server._dispatch(method, params)
+
+class _Span(object) :
+
+	'''
+	Class used as a context manager timing a span of a trace, which is recorded by its Tracer once it ends.
+	'''
+
+	def __init__(self, tracer, name, traceID) :
+
+		'''
+		args :
+		- tracer 					-		The Tracer recording the span.
+		- name 						-		The name of the span.
+		- traceID 					-		The ID of the trace of the span.
+
+		Constructor to initialize all data members of _Span class.
+
+		Data members :
+
+		- tracer 					-		The Tracer recording the span.
+		- name 						-		The name of the span.
+		- traceID 					-		The ID of the trace of the span.
+		- previous 					-		The ID of the trace the thread worked for before the span, set when it starts.
+		- start 					-		The time at which the span started, set when it starts.
+		'''
+
+		self.tracer = tracer
+		self.name = name
+		self.traceID = traceID
+
+	def __enter__(self) :
+
+		'''
+		This function starts the span : the calling thread works for its trace until the span ends.
+		'''
+
+		self.previous = currentTrace()
+		_context.traceID = self.traceID
+		self.start = time.time()
+
+	def __exit__(self, *args) :
+
+		'''
+		args :
+		- args 						-		The type, value and traceback of the exception ending the span, or Nones.
+
+		This function ends the span, lets the thread work for the trace it worked for before, and records the span.
+		'''
+
+		end = time.time()
+		_context.traceID = self.previous
+		self.tracer.record(self.name, self.traceID, self.start, end)
+
+class _NoSpan(object) :
+
+	'''
+	Class used as the context manager of a span that is not recorded.
+	'''
+
+	def __enter__(self) :
+		pass
+
+	def __exit__(self, *args) :
+		pass
+
+_NO_SPAN = _NoSpan()
+
+class TracedClient(object) :
+
+	'''
+	Class that stands in for the client of a server (an xmlrpclib.ServerProxy or a SharedMemory.Channel), recording a
+	 span for every request sent through it under a trace.
+	'''
+
+	def __init__(self, tracer, name, client) :
+
+		'''
+		args :
+		- tracer 					-		The Tracer recording the spans.
+		- name 						-		The name of the server the client sends requests to.
+		- client 					-		The client.
+
+		Constructor to initialize all data members of TracedClient class.
+
+		Data members :
+
+		- _tracer 					-		The Tracer recording the spans.
+		- _name 					-		The name of the server, which the name of each span starts with ('site3.read').
+		- _client 					-		The client the requests are sent through.
+		'''
+
+		self._tracer = tracer
+		self._name = name
+		self._client = client
+
+	def __getattr__(self, method) :
+
+		'''
+		args :
+		- method 					-		The name of a function of the server.
+
+		This function returns a function sending a request for 'method' through the client, within a span of the trace
+		 of the calling thread.
+		'''
+
+		function = getattr(self._client, method)
+		name = '%s.%s' % (self._name, method)
+
+		def call(*args) :
+			with self._tracer.span(name) :
+				return function(*args)
+
+		return call
+
+class Tracer(object) :
+
+	'''
+	Class that will serve as the recorder of the spans of the traces in one process, appended to a trace file in the
+	 JSON array format of the trace event format of Chrome, as complete events ('X') with the ID of their trace as
+	 argument. Every process appends its own events to the same file, each with a single write, and names itself with
+	 a metadata event ('M') before its first span. The file is created, with the opening bracket of the array, by the
+	 Tracer of DES, before any request is traced; the closing bracket may be left out.
+	'''
+
+	def __init__(self, fileName, processName, sampleRate = 1.0, create = False) :
+
+		'''
+		args :
+		- fileName 					-		The trace file, or None for a Tracer that records nothing.
+		- processName 				-		The name under which the spans of this process are shown ('DES', 'TM', 'site3').
+		- sampleRate 				-		The fraction of the traces started by Tracer.trace that are recorded, between 0 and 1.
+		- create 					-		True, if the trace file is to be created (or emptied) now.
+
+		Constructor to initialize all data members of Tracer class.
+
+		Data members :
+
+		- fileName 					-		The trace file, or None.
+		- processName 				-		The name of this process in the trace.
+		- sampleRate 				-		The fraction of the traces started here that are recorded.
+		- _fd 						-		The file descriptor of the trace file, opened for appending on the first span; None
+											 until then.
+		- _traceIDs 				-		Counter giving the trace IDs of the traces started here.
+		- _lock 					-		Lock held while the trace file is opened.
+		'''
+
+		self.fileName = fileName
+		self.processName = processName
+		self.sampleRate = sampleRate
+		self._fd = None
+		self._traceIDs = itertools.count(1)
+		self._lock = threading.Lock()
+
+		if fileName and create :
+			with open(fileName, 'w') as f :
+				f.write('[\n')
+
+	def trace(self, name) :
+
+		'''
+		args :
+		- name 						-		The name of the request starting the trace.
+
+		This function is called inside DES.process and DES.flush for every request to the TM. It starts a new trace,
+		 unless it is left out by sampling, and returns the context manager of its first span.
+		'''
+
+		if not self.fileName or (self.sampleRate < 1 and random.random() >= self.sampleRate) :
+			return _NO_SPAN
+		return _Span(self, name, '%x-%x' % (os.getpid(), next(self._traceIDs)))
+
+	def span(self, name) :
+
+		'''
+		args :
+		- name 						-		The name of the span.
+
+		This function returns the context manager of a span of the trace of the calling thread, which is not recorded if
+		 the thread works for none.
+		'''
+
+		traceID = currentTrace()
+		if traceID is None or not self.fileName :
+			return _NO_SPAN
+		return _Span(self, name, traceID)
+
+	def traced(self, function) :
+
+		'''
+		args :
+		- function 					-		A function registered with the server of this process.
+
+		This function returns 'function' wrapped so that a span is recorded for each of its calls under a trace. The
+		 wrapper keeps the name of the function, under which it is registered.
+		'''
+
+		name = function.__name__
+
+		def call(*args) :
+			with self.span(name) :
+				return function(*args)
+
+		call.__name__ = name
+		return call
+
+	def client(self, name, client) :
+
+		'''
+		args :
+		- name 						-		The name of the server the client sends requests to ('site3').
+		- client 					-		The client.
+
+		This function returns 'client' wrapped in a TracedClient, so that a span is recorded for each of its requests
+		 under a trace.
+		'''
+
+		return TracedClient(self, name, client)
+
+	def record(self, name, traceID, start, end) :
+
+		'''
+		args :
+		- name 						-		The name of the span.
+		- traceID 					-		The ID of the trace of the span.
+		- start 					-		The time at which the span started, in seconds since the epoch.
+		- end 						-		The time at which the span ended.
+
+		This function appends a complete event to the trace file.
+		'''
+
+		self._write({'name': name, 'ph': 'X', 'ts': int(start * 1e6), 'dur': int((end - start) * 1e6), 'pid': os.getpid(), 'tid': thread.get_ident(), 'args': {'trace': traceID}})
+
+	def _write(self, event) :
+
+		'''
+		args :
+		- event 					-		An event of the trace event format, as a dictionary.
+
+		This function is called inside Tracer.record. It appends the event to the trace file with a single write,
+		 opening the file and naming this process first if this is its first event.
+		'''
+
+		if self._fd is None :
+			with self._lock :
+				if self._fd is None :
+					fd = os.open(self.fileName, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0644)
+					os.write(fd, json.dumps({'name': 'process_name', 'ph': 'M', 'pid': os.getpid(), 'args': {'name': self.processName}}) + ',\n')
+					self._fd = fd
+		os.write(self._fd, json.dumps(event) + ',\n')
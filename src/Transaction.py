@@ -1,16 +1,19 @@
 # Authors :
 # Sanjan Prakash Kumar (spk363)
 
-class Transaction :
+class Transaction(object) :
 
 	'''
 	Class that will serve as a transaction.
 	It will be used to hold transaction identifiers such as the ID of the transaction, the type of
 	 the transaction, the timestamp at the start of the transaction and the status of the
 	 transaction (0 = Active; 1 = Aborted; 2 = Waiting).
+	A transaction is sent to the client sites as a struct with one member per data member.
 	'''
 
-	def __init__(self, txnID, timeStamp, RW = True, txnStatus = 0) :
+	__slots__ = ('ID', 'timeStamp', 'isRW', 'status', 'isSnapshot')
+
+	def __init__(self, txnID, timeStamp, RW = True, txnStatus = 0, snapshot = False) :
 
 		'''
 		args :
@@ -18,6 +21,7 @@ class Transaction :
 		- timeStamp 				- 			The time instance at which this transaction is to be created.
 		- RW 						- 			Boolean value to indicate the type of transaction. True, if read-write; False, otherwise. 
 		- txnStatus 				- 			Status of the transaction. 0, if active (default); 1, if aborted; 2, if waiting.
+		- snapshot 					-			Boolean value to indicate that a read-write transaction runs under snapshot isolation.
 
 		Constructor to initialize all data members of Transaction class.
 
@@ -27,12 +31,16 @@ class Transaction :
 		- timeStamp 				- 			The time instance at which this transaction began. 
 		- isRW 		 				-			Boolean value to indicate the type of transaction. True, if read-write; False, otherwise. 
 		- status 					-			Status of the transaction. 0, if active; 1, if aborted; 2, if waiting.
+		- isSnapshot 				-			Boolean value to indicate that this read-write transaction runs under snapshot isolation :
+												 it reads the values committed before it began without taking read-locks, and its
+												 writes are validated when it ends.
 		'''
 
 		self.ID = txnID
 		self.timeStamp = timeStamp
 		self.isRW = RW
 		self.status = txnStatus
+		self.isSnapshot = snapshot
 
 	def getID(self) :
 
@@ -62,6 +70,16 @@ class Transaction :
 
 		return self.isRW
 
+	def readsSnapshot(self) :
+
+		'''
+		This function is called inside TransactionManager.read to check if this transaction reads the values committed
+		 before it began, without read-locks. This is the case of read-only transactions and of read-write transactions
+		 under snapshot isolation.
+		'''
+
+		return not self.isRW or self.isSnapshot
+
 	# def getStatus(self) :
 	# 	'''
 	# 	get the status of the transaction.
@@ -128,6 +146,15 @@ class Transaction :
 		if (self.status != 2) :
 			self.status = 2
 
+	def toStruct(self) :
+
+		'''
+		This function returns the data members of this transaction as a dictionary. It is what the TM sends to a client
+		 site in place of the transaction, which the site then accesses as transaction['ID'], transaction['isRW'], etc.
+		'''
+
+		return {'ID': self.ID, 'timeStamp': self.timeStamp, 'isRW': self.isRW, 'status': self.status, 'isSnapshot': self.isSnapshot}
+
 
 if __name__ == '__main__' :
 	Transaction(0, 0, True, 0)
\ No newline at end of file
@@ -1,11 +1,21 @@
 # Authors :
 # Sanjan Prakash Kumar (spk363)
 
+import time
+import argparse
+import itertools
 import xmlrpclib
 from SimpleXMLRPCServer import SimpleXMLRPCServer
-from collections import defaultdict
+from collections import defaultdict, deque
+from multiprocessing.pool import ThreadPool
 
+from Site import Site
 from Transaction import Transaction
+from SnapshotCache import SnapshotCache
+from Waitlist import Waitlist
+from Replicator import Replicator
+from ChangeLog import ChangeLog, variableMatcher
+from Tracing import Tracer, TracingTransport, TracingRequestHandler, bind
 
 class TransactionManager(object) :
 
@@ -15,33 +25,174 @@ class TransactionManager(object) :
      on an available site hold them, using the available copies algorithm.
     '''
 
-    def __init__(self) :
+    DEADLOCK_POLICIES = ('detect', 'wait-die', 'wound-wait')
+
+    # Counters kept for each variable in TransactionManager._contention, next to those kept by the lock managers of the sites
+    CONTENTION_COUNTERS = ('waits', 'waitTime', 'deadlocks', 'staleWrites', 'staleReads')
+
+    # Isolation levels of read-write transactions
+    ISOLATION_LEVELS = ('serializable', 'snapshot')
+
+    # How the copies of a variable are kept up to date
+    REPLICATION_SCHEMES = ('available-copies', 'primary-copy')
+
+    # Orders in which waitlisted requests are retried
+    WAITLIST_POLICIES = ('fifo', 'oldest', 'fewest-locks', 'ro-first')
+
+    # Cap on the admission limit of read-write transactions under adaptive admission, if no maximum is given
+    ADAPTIVE_ADMISSION_CAP = 64
+
+    def __init__(self, port = 7777, sitePorts = range(9090, 9100), snapshotCacheSize = 1024, deadlockPolicy = 'detect', deferredWrites = False, maxActive = None, maxActiveRO = None, adaptiveAdmission = False, waitlistPolicy = 'fifo', isolation = 'serializable', concurrencyControl = 'locking', replication = 'available-copies', changeLogSize = 4096, watchTimeout = 300, traceFile = None, channels = None, serve = True) :
 
         '''
+        args :
+        - port                  -       The port at which to create the host server. 0 lets the OS pick a free port.
+        - sitePorts             -       The ports of the client sites, in the order of their site IDs (1, 2, ...).
+        - snapshotCacheSize     -       The number of committed versions to cache for read-only transactions. 0 disables the cache.
+        - deadlockPolicy        -       How conflicts are resolved. One of TransactionManager.DEADLOCK_POLICIES :
+                                         'detect' waitlists conflicting requests and aborts the younger transaction once the
+                                         conflict graph has a cycle; 'wait-die' and 'wound-wait' prevent deadlocks using the
+                                         timestamps of the transactions alone, without keeping a conflict graph.
+        - deferredWrites        -       True, if the writes of read-write transactions are to be buffered at the TM and only sent
+                                         to the sites when the transaction ends; False, if every write is sent right away.
+        - maxActive             -       The largest number of read-write transactions running at once. Further transactions are
+                                         queued when they begin, and admitted once running ones finish. None, for no limit.
+        - maxActiveRO           -       The largest number of read-only transactions running at once, counted separately from
+                                         read-write transactions. None, for no limit.
+        - adaptiveAdmission     -       True, if the limit on read-write transactions is to be adapted to the abort rate : it
+                                         is halved whenever a transaction aborts and grows by one over as many commits as the
+                                         limit, up to 'maxActive' (or TransactionManager.ADAPTIVE_ADMISSION_CAP).
+        - waitlistPolicy        -       The order in which waitlisted requests are retried. One of
+                                         TransactionManager.WAITLIST_POLICIES : 'fifo' retries them in the order they were
+                                         waitlisted; 'oldest' retries the requests of older transactions (lower timestamp)
+                                         first; 'fewest-locks' those of transactions holding the fewest locks first; 'ro-first'
+                                         those of read-only transactions first. Ties are retried in the order they were waitlisted.
+        - isolation             -       The isolation level of read-write transactions. One of TransactionManager.ISOLATION_LEVELS :
+                                         'serializable' runs them under strict two-phase locking; 'snapshot' lets them read the
+                                         values committed before they began without read-locks, as read-only transactions do,
+                                         and aborts them when they end if another transaction has committed a variable they
+                                         wrote since they began (first-committer-wins).
+        - concurrencyControl    -       The engine of the client sites, one of Site.CONCURRENCY_CONTROLS. Under 'optimistic', reads
+                                         and writes never conflict, and a read-write transaction is validated on every site it
+                                         accessed when it ends.
+        - replication           -       One of TransactionManager.REPLICATION_SCHEMES. Under 'available-copies', a write goes to
+                                         every available copy of its variable. Under 'primary-copy', a variable is locked,
+                                         written and committed at its primary site alone (site 1 + (i mod number of sites) for
+                                         xi), and its committed versions are sent to its other copies in the background by a
+                                         Replicator. Read-only transactions may read any copy, once it holds their snapshot.
+        - changeLogSize         -       The number of committed versions kept for the consumers watching variables (see
+                                         TransactionManager.watch). A consumer that falls further behind is told it missed some.
+        - watchTimeout          -       The number of seconds after which a watch that has not been read from is forgotten, so
+                                         that consumers that stop without calling TransactionManager.unwatch are not kept forever.
+        - traceFile             -       The trace file to which spans are appended for the requests handled and sent to the client
+                                         sites under a trace (see Tracing.py). None, if requests are not traced.
+        - channels              -       Dictionary of SharedMemory.Channel objects to the client sites, where the keys are their site
+                                         IDs, over which requests are sent in place of XML-RPC. None, to use XML-RPC.
+        - serve                 -       True, if the TM is to start serving requests right away; False, if TransactionManager.serve
+                                         will be called later.
+
         Constructor to initialize all data members of TransactionManager class.
 
         Data members :
         
         - _server               -       Server object representing the host server for the 10 client sites.
         - _clientSites          -       The 10 sites, as client servers.
+        - _siteURLs             -       Dictionary to maintain the URL of each client site, used to open connections from worker threads.
+        - _channels             -       True, if the client sites are reached over shared-memory channels, which worker threads share.
+        - _tracer               -       The Tracer recording the spans of the TM, or None.
+        - _sitePool             -       Pool of worker threads used to send the same request to many client sites in parallel.
         - _clock                -       The clock of the system.
         - _transactionSites     -       Dictionary to maintain list of sites accessed by each transaction.
+        - _transactionWriteSites -      Dictionary to maintain list of sites on which each transaction holds write-locks.
+        - _siteTransactions     -       Dictionary to maintain the set of running read-write transactions that have accessed each site.
         - _transactions         -       Dictionary to maintain each Transaction object as value where the key is the Transaction ID (T1, T2, ...).
-        - _waitlist             -       List to maintain all waitlisted transactions.
+        - _transactionWrites    -       Dictionary to maintain the most recent value written to each variable by each read-write transaction.
+                                         When writes are deferred, this is the buffer of the writes not yet sent to any site.
+        - _transactionReads     -       Dictionary to maintain the set of variables read by each read-write transaction, i.e. on
+                                         which it holds read-locks.
+        - _snapshotCache        -       SnapshotCache object holding committed versions to serve reads of read-only transactions.
+        - _changeLog            -       ChangeLog of the versions committed lately, read by the consumers watching variables.
+        - _watches              -       Dictionary where the keys are the IDs of watches and the values are [matcher, cursor, lastRead]
+                                         lists : the function telling whether a variable is watched (None for all), the time of
+                                         commit of the last version the consumer has been sent and the wall-clock time at which
+                                         the watch was last created or read from.
+        - _watchIDs             -       Counter giving the IDs of watches.
+        - _watchTimeout         -       The number of seconds after which an idle watch is forgotten.
+        - _waitlist             -       Waitlist of all waitlisted requests, retried in the order given by the waitlist policy.
+        - _waitlistPolicy       -       The waitlist policy in use.
+        - _isolation            -       The isolation level of read-write transactions.
+        - _optimistic           -       True, if the client sites run optimistic concurrency control.
+        - _replicator           -       The Replicator sending committed versions to the copies of variables under primary-copy
+                                         replication; None, under available copies.
+        - _waitlistedAt         -       Dictionary to maintain the time at which each request in the waitlist was added to it.
+        - _contention           -       Dictionary where the keys are the IDs of variables and the values are dictionaries counting the
+                                         requests on that variable that were waitlisted, the time they spent in the waitlist and the
+                                         deadlocks (or, under 'wait-die' and 'wound-wait', the aborts preventing them) they were
+                                         involved in (see TransactionManager.CONTENTION_COUNTERS).
         - _activeTransactions   -       Set of active transactions being managed and under conflict (all nodes in the conflict graph).
         - _conflictGraph        -       The conflict graph as an adjacency list.
+        - _deadlockPolicy       -       How conflicts are resolved ('detect', 'wait-die' or 'wound-wait').
+        - _deferredWrites       -       True, if writes are buffered at the TM until the end of their transaction.
+        - _running              -       Dictionary mapping True (read-write) and False (read-only) to the sets of IDs of the
+                                         transactions of that type that have been admitted and are running.
+        - _admissionLimit       -       The current limit on running read-write transactions (a float under adaptive admission),
+                                         or None for no limit.
+        - _maxActive            -       The largest value of the limit on running read-write transactions.
+        - _maxActiveRO          -       The limit on running read-only transactions, or None for no limit.
+        - _adaptiveAdmission    -       True, if the limit on running read-write transactions is adapted to the abort rate.
+        - _admissionQueues      -       Dictionary mapping True (read-write) and False (read-only) to the queues of the IDs of
+                                         the transactions of that type waiting to be admitted, in the order they began.
+        - _queued               -       Dictionary where the keys are the IDs of queued transactions and the values are lists of
+                                         the requests they issued while queued, as (method, arguments) pairs.
+        - _statistics           -       Dictionary counting the transactions that have committed and that have been aborted, and
+                                         the group commits of TransactionManager.endAll with the transactions they committed.
 
         '''
 
+        if not deadlockPolicy in self.DEADLOCK_POLICIES :
+            raise ValueError('Unknown deadlock policy %s' % deadlockPolicy)
+
         self._clientSites = {}
-        self._connectAllClients()
+        self._siteURLs = {}
+        self._channels = bool(channels)
+        self._tracer = Tracer(traceFile, 'TM') if traceFile else None
+        self._connectAllClients(sitePorts, channels)
+        self._sitePool = ThreadPool(len(self._clientSites))
         self._clock = 0
         self._transactionSites = {}
+        self._transactionWriteSites = {}
+        self._siteTransactions = defaultdict(set)
         self._transactions = {}
-        self._waitlist = []
+        self._transactionWrites = {}
+        self._transactionReads = {}
+        self._snapshotCache = SnapshotCache(snapshotCacheSize)
+        self._changeLog = ChangeLog(changeLogSize)
+        self._watches = {}
+        self._watchIDs = itertools.count(1)
+        self._watchTimeout = watchTimeout
+        self._waitlist = Waitlist()
+        self._waitlistPolicy = waitlistPolicy
+        self._isolation = isolation
+        self._optimistic = concurrencyControl == 'optimistic'
+        self._replicator = Replicator(self._siteURLs, clients = self._clientSites if self._channels else None) if replication == 'primary-copy' else None
+        self._waitlistedAt = {}
+        self._contention = {}
         self._activeTransactions = set()
         self._conflictGraph = defaultdict(list)
-        self._createHost(7777)
+        self._deadlockPolicy = deadlockPolicy
+        self._deferredWrites = deferredWrites
+        self._running = {True: set(), False: set()}
+        self._maxActive = maxActive or (self.ADAPTIVE_ADMISSION_CAP if adaptiveAdmission else None)
+        self._admissionLimit = float(self._maxActive) if self._maxActive else None
+        self._maxActiveRO = maxActiveRO
+        self._adaptiveAdmission = adaptiveAdmission
+        self._admissionQueues = {True: deque(), False: deque()}
+        self._queued = {}
+        self._statistics = {'committed': 0, 'aborted': 0, 'groupCommits': 0, 'groupCommitted': 0}
+        self._createHost(port)
+
+        if serve :
+            self.serve()
 
     def _createHost(self, port = 7777) :
 
@@ -52,20 +203,43 @@ class TransactionManager(object) :
         This function is called by the constructor of the TransactionManager class.
         It creates a server that represents the host OR the TM. This server will be handling
          requests to all the 10 client sites. We also register functions with this server
-         that will be used as each line in the input file (requests) is processed.
+         that will be used as each line in the input file (requests) is processed. When tracing, each of them is
+         registered so as to record its spans.
         '''
 
-        self._server = SimpleXMLRPCServer(("localhost", port), allow_none = True)
+        if self._tracer :
+            self._server = SimpleXMLRPCServer(("localhost", port), TracingRequestHandler, allow_none = True)
+            register = lambda function : self._server.register_function(self._tracer.traced(function))
+        else :
+            self._server = SimpleXMLRPCServer(("localhost", port), allow_none = True)
+            register = self._server.register_function
+        self.port = self._server.server_address[1]
+
+        register(self.clockForward)
+        register(self.begin)
+        register(self.beginRO)
+        register(self.read)
+        register(self.write)
+        register(self.execute)
+        register(self.fail)
+        register(self.recover)
+        register(self.end)
+        register(self.endAll)
+        register(self.dump)
+        register(self.snapshotAt)
+        register(self.snapshotCacheStats)
+        register(self.watch)
+        register(self.changes)
+        register(self.unwatch)
+        register(self.statistics)
+        register(self.hotKeys)
+
+    def serve(self) :
 
-        self._server.register_function(self.clockForward)
-        self._server.register_function(self.begin)
-        self._server.register_function(self.beginRO)
-        self._server.register_function(self.read)
-        self._server.register_function(self.write)
-        self._server.register_function(self.fail)
-        self._server.register_function(self.recover)
-        self._server.register_function(self.end)
-        self._server.register_function(self.dump)
+        '''
+        This function is called by the constructor of the TransactionManager class, or by Launcher once it has forked the TM.
+         It handles requests to the TM until the process is stopped.
+        '''
 
         self._server.serve_forever()
 
@@ -86,11 +260,14 @@ class TransactionManager(object) :
 
         This function is called when we encounter a line in the input file that reads for example, "begin(T2)".
          We create a new Transaction instance with ID equal to "T2" of Read-Write type (default).
+        If as many read-write transactions as allowed are already running (or others are already queued), T2 is queued
+         instead, and only created once TransactionManager._admit admits it.
         '''
 
-        self._transactions[txnID] = Transaction(txnID, self._clock)
-        self._transactionSites[txnID] = []
-        return 'Began Tx %s with time_stamp %d' % (txnID, self._transactions[txnID].getTimeStamp())
+        if self._admissionQueues[True] or not self._hasRoom(True) :
+            return self._enqueue(txnID, True)
+
+        return self._start(txnID, True)
 
     def beginRO(self, txnID) :
 
@@ -100,10 +277,13 @@ class TransactionManager(object) :
 
         This function is called when we encounter a line in the input file that reads for example, "beginRO(T2)".
          We create a new Transaction instance with ID equal to "T2" of Read-Only type.
+        Read-only transactions are queued like read-write ones (see TransactionManager.begin), but within their own limit.
         '''
 
-        self._transactions[txnID] = Transaction(txnID, self._clock, RW = False)
-        return 'Began read-only Tx %s with time_stamp %d' % (txnID, self._transactions[txnID].getTimeStamp())
+        if self._admissionQueues[False] or not self._hasRoom(False) :
+            return self._enqueue(txnID, False)
+
+        return self._start(txnID, False)
 
     def read(self, txnID, var) :
 
@@ -118,19 +298,47 @@ class TransactionManager(object) :
          We then check and see if making a read would lead to a conflict. If it does, we head to 
          TransactionManager._detectDeadlock; otherwise, the read get executed successfully. However, if none of the
          relevant sites are up, then this read request is added to the waitlist.
+        Under primary-copy replication, read-write transactions read at the primary site of the variable alone, while
+         read-only transactions read at the first available copy, once it has applied every version they may see.
+        Read-only transactions are first looked up in the snapshot cache, and only go to a site on a miss. The
+         version they read from the site is then added to the cache. So are read-write transactions under snapshot isolation,
+         for the variables they have not written.
+        When writes are deferred, a read-write transaction reading a variable it has written reads its own buffered value.
+        The reads of a transaction waiting to be admitted are held until it is admitted.
         '''
 
-        transaction = self._transactions[txnID]
-        if not transaction.isAborted() :
+        if txnID in self._queued :
+            return self._hold(txnID, 'read', (var,))
+
+        transaction = self._transactions.get(txnID)
+        if transaction and not transaction.isAborted() :
+            if self._deferredWrites and var in self._transactionWrites.get(txnID, ()) :
+                if transaction.isWaiting() :
+                    transaction.activate()
+                return 'Read var %s for Tx %s at time_stamp %d, value: %s' % (var, txnID, self._clock, repr(self._transactionWrites[txnID][var]))
+
+            if transaction.readsSnapshot() and not var in self._transactionWrites.get(txnID, ()) :
+                cached = self._snapshotCache.lookup(var, transaction.getTimeStamp())
+                if cached is not None :
+                    if transaction.isWaiting() :
+                        transaction.activate()
+                    return 'Read var %s for Tx %s at time_stamp %d, value: %s' % (var, txnID, self._clock, repr(cached))
+
             varID = int(var[1:])
-            sites = self._sitesHoldingVar(varID)
+            sites = self._primarySites(varID) if transaction.isReadWrite() else self._sitesHoldingVar(varID)
             for s in sites :
                 if self._clientSites[s].isUp() :
                     self._addTransactionSites(transaction, s)
-                    readResult = self._clientSites[s].read(transaction, var)
+                    if self._replicator and not transaction.isReadWrite() :
+                        self._replicator.waitFor(s, transaction.getTimeStamp())
+                    readResult = self._clientSites[s].read(transaction.toStruct(), var)
                     
                     if readResult :
                         if readResult['status'] == 'success' :
+                            if 'version' in readResult and readResult['data'] is not None :
+                                self._snapshotCache.insert(var, readResult['version'], readResult['data'], transaction.getTimeStamp())
+                            if not transaction.readsSnapshot() :
+                                self._transactionReads[txnID].add(var)
                             if transaction.isWaiting() :
                                 transaction.activate()
                             return 'Read var %s for Tx %s at time_stamp %d, value: %s' % (var, txnID, self._clock, repr(readResult['data']))
@@ -159,21 +367,31 @@ class TransactionManager(object) :
          TransactionManager._detectDeadlock. However, if no such conflict arises, we attempt to write at the first available
          client site. If a conflict arises now, we head to TransactionManager._detectDeadlock just like before. Otherwise, we
          proceed to make an uncommitted write on that site. 
+        When writes are deferred, the write is only recorded in TransactionManager._transactionWrites, replacing any earlier
+         write of the same variable by this transaction. The sites see it when the transaction ends.
+        The writes of a transaction waiting to be admitted are held until it is admitted.
         '''
 
-        transaction = self._transactions[txnID]
+        if txnID in self._queued :
+            return self._hold(txnID, 'write', (var, value))
+
+        transaction = self._transactions.get(txnID)
         resultStr = ""
 
-        if not transaction.isAborted() :
+        if transaction and not transaction.isAborted() and self._deferredWrites and transaction.isReadWrite() :
+            self._transactionWrites[txnID][var] = int(value)
+            return '\nWrote var %s for txn %s at time_stamp %d' % (var, txnID, self._clock)
+
+        if transaction and not transaction.isAborted() :
             varID = int(var[1:])
-            siteIDs = self._sitesHoldingVar(varID)
+            siteIDs = self._primarySites(varID)
             succeededWrites = 0
 
             for s in siteIDs :
                 if self._clientSites[s].isUp() :
                     if self._clientSites[s].isReading(txnID, var) :
-                        for command in self._waitlist :
-                            if int(command[2][1:]) == varID and not transaction.isAborted() and txnID != command[1] :
+                        for command in self._waitlist.waitingOn(var) :
+                            if not transaction.isAborted() and txnID != command[1] and command[1] in self._transactions :
                                 if command[0] == 'write' :
                                     resultStr += self._detectDeadlock(('write', txnID, var, value), True, command[1])
                                 else :
@@ -181,15 +399,18 @@ class TransactionManager(object) :
                     
                     if not transaction.isAborted() :
                         self._addTransactionSites(transaction, s)
-                        writeResult = self._clientSites[s].write(transaction, var, int(value))
+                        writeResult = self._clientSites[s].write(transaction.toStruct(), var, int(value))
 
                         if writeResult['status'] == 'exception' :
                             args = writeResult['args']
                             return resultStr + "\n" + self._detectDeadlock(('write', txnID, var, value), args[0], args[1])
                         elif writeResult['status'] == 'success' :
+                            self._addTransactionWriteSites(transaction, s)
                             succeededWrites += 1
             
             if succeededWrites > 0 :
+                if not transaction.isAborted() :
+                    self._transactionWrites[txnID][var] = int(value)
                 if transaction.isWaiting() :
                     transaction.activate()
                 return resultStr + '\nWrote var %s for txn %s at time_stamp %d' % (var, txnID, self._clock)
@@ -202,6 +423,141 @@ class TransactionManager(object) :
         else :
             return resultStr + '\nTx %s is in aborted state' % txnID
 
+    def execute(self, txnID, operations) :
+
+        '''
+        args :
+        - txnID                     -           The ID of the transaction being processed at present
+        - operations                -           List of reads and writes of this transaction, in order. Each is either
+                                                 ('read', var) or ('write', var, value).
+
+        Notable local variables :
+        - siteOperations            -           Dictionary where the keys are site IDs and the values are the indices of the
+                                                 operations to be sent to that site.
+        - batched                   -           The number of leading operations that can be sent to the sites in one go.
+        - failed                    -           The index of the first operation that was not performed at all its sites.
+
+        This function is called by the simulator for a run of consecutive reads and writes of the same transaction, so
+         that a transaction touching k variables on a site does not pay k separate requests to it. We send each
+         operation to the sites that TransactionManager.read and TransactionManager.write would have used (the first
+         available site for a read, all available sites for a write), grouped into a single Site.execute request per site,
+         and send these requests in parallel. When more than one site is involved, the sites are first asked only to check
+         for lock conflicts, so that nothing is performed anywhere unless it can be performed everywhere.
+        An operation that needs the waitlist (no site available, or a waitlisted request on the same variable), as well
+         as every operation after it, is instead processed on its own through TransactionManager.read and
+         TransactionManager.write. The same holds for all operations from the first one that a site could not perform
+         because of a lock conflict, so that deadlock detection and waitlisting work exactly as before.
+        A list with the result of each operation is returned.
+        When writes are deferred, the writes never reach a site here, so the operations are simply processed one at a time.
+        The operations of a transaction waiting to be admitted are held until it is admitted.
+        '''
+
+        if txnID in self._queued :
+            return [self._hold(txnID, operation[0], tuple(operation[1:])) for operation in operations]
+
+        transaction = self._transactions.get(txnID)
+
+        if not transaction or transaction.isAborted() :
+            return [('\nTx %s is in aborted state' if operation[0] == 'write' else 'Tx %s is in aborted state') % txnID for operation in operations]
+
+        if self._deferredWrites :
+            return [self.write(txnID, *operation[1:]) if operation[0] == 'write' else self.read(txnID, operation[1]) for operation in operations]
+
+        results = []
+        cached = {}
+        siteOperations = defaultdict(list)
+        siteIsUp = {}
+        batched = 0
+
+        if not transaction.isWaiting() :
+            waitlistedVars = self._waitlist.variables()
+
+            for operation in operations :
+                var = operation[1]
+                if var in waitlistedVars :
+                    break
+
+                if operation[0] == 'read' and not transaction.isReadWrite() :
+                    data = self._snapshotCache.lookup(var, transaction.getTimeStamp())
+                    if data is not None :
+                        cached[batched] = data
+                        batched += 1
+                        continue
+
+                sites = []
+                if operation[0] == 'read' and not transaction.isReadWrite() :
+                    candidates = self._sitesHoldingVar(int(var[1:]))
+                else :
+                    candidates = self._primarySites(int(var[1:]))
+                for s in candidates :
+                    if not s in siteIsUp :
+                        siteIsUp[s] = self._clientSites[s].isUp()
+                    if siteIsUp[s] :
+                        sites.append(s)
+
+                if not sites :
+                    break
+                if operation[0] == 'read' :
+                    sites = sites[:1]
+
+                for s in sites :
+                    siteOperations[s].append(batched)
+                batched += 1
+
+        siteIDs = sorted(siteOperations.keys())
+        siteResults = defaultdict(list)
+
+        if self._replicator and not transaction.isReadWrite() :
+            for s in siteIDs :
+                self._replicator.waitFor(s, transaction.getTimeStamp())
+        failed = batched
+
+        if len(siteIDs) > 1 :
+            checks = self._broadcast([(s, 'execute', (transaction.toStruct(), [operations[i] for i in siteOperations[s]], False)) for s in siteIDs])
+            for s, check in zip(siteIDs, checks) :
+                if check['status'] != 'success' :
+                    failed = min(failed, siteOperations[s][0])
+            if failed < batched :
+                failed = min(indices[0] for indices in siteOperations.values())
+                siteIDs = []
+
+        replies = self._broadcast([(s, 'execute', (transaction.toStruct(), [operations[i] for i in siteOperations[s]])) for s in siteIDs])
+
+        for s, reply in zip(siteIDs, replies) :
+            if reply['status'] == 'success' :
+                self._addTransactionSites(transaction, s)
+                for i, result in zip(siteOperations[s], reply['results']) :
+                    siteResults[i].append((s, result))
+            else :
+                failed = min(failed, siteOperations[s][0])
+
+        for i in range(failed) :
+            operation = operations[i]
+            var = operation[1]
+
+            if i in cached :
+                results.append('Read var %s for Tx %s at time_stamp %d, value: %s' % (var, txnID, self._clock, repr(cached[i])))
+            elif operation[0] == 'read' :
+                readResult = siteResults[i][0][1]
+                if 'version' in readResult and readResult['data'] is not None :
+                    self._snapshotCache.insert(var, readResult['version'], readResult['data'], transaction.getTimeStamp())
+                if not transaction.readsSnapshot() :
+                    self._transactionReads[txnID].add(var)
+                results.append('Read var %s for Tx %s at time_stamp %d, value: %s' % (var, txnID, self._clock, repr(readResult['data'])))
+            else :
+                for s, writeResult in siteResults[i] :
+                    self._addTransactionWriteSites(transaction, s)
+                self._transactionWrites[txnID][var] = int(operation[2])
+                results.append('\nWrote var %s for txn %s at time_stamp %d' % (var, txnID, self._clock))
+
+        for operation in operations[failed:] :
+            if operation[0] == 'write' :
+                results.append(self.write(txnID, operation[1], operation[2]))
+            else :
+                results.append(self.read(txnID, operation[1]))
+
+        return results
+
     def fail(self, siteID) :
 
         '''
@@ -235,6 +591,9 @@ class TransactionManager(object) :
          waitlisted requests can now be executed.
         '''
 
+        if not siteID in self._clientSites :
+            return 'Unknown site %s' % siteID
+
         self._clientSites[siteID].recover()
         resultStr = self._retryWaitingTransactions()
         
@@ -250,52 +609,313 @@ class TransactionManager(object) :
         - txnID                -           The ID of the transaction to be terminated
 
         This function is called when we encounter a line in the input file that reads, for example "end(T3)". 
-         If T3 is a Read-Write type transaction, we go to all the sites that T3 had access to. If any of these
-         sites is down, we abort T3 right away. Otherwise, we commit the uncommitted values of all variables
-         at all up-and-running sites before we 'abort' (in this context, it is a termination upon completion)
-         the transaction and check if any of the waitlisted requests can be executed.
+         If T3 is a Read-Write type transaction, we commit it using two-phase commit. In the prepare phase, every site
+         on which T3 holds write-locks is asked, in parallel, whether it is still up and holding them. If any of them
+         votes no, we abort T3 everywhere without having committed anything. Otherwise, in the commit phase, we commit
+         the uncommitted values at those sites and release the read-locks held by T3 at all other sites it accessed,
+         again in parallel, before we 'abort' (in this context, it is a termination upon completion) the transaction
+         and check if any of the waitlisted requests can be executed. The committed values are also handed to the
+         snapshot cache.
+        Once a transaction has ended (or has been aborted), TransactionManager._reclaim drops it from the TM. Any later
+         request of it finds it missing and is answered as for an aborted transaction.
+        When writes are deferred, the buffered writes of T3 are first sent to the sites by TransactionManager._installWrites.
+        Under snapshot isolation, the prepare phase is Site.validate, which also votes no if another transaction has
+         committed a variable written by T3 since T3 began. T3 is then aborted, the first committer having won.
+        Under optimistic concurrency control, the prepare phase is Site.validate on every site accessed by T3, which also
+         votes no if another transaction has committed a variable read by T3 since T3 read it. T3 is then aborted.
+        If T3 is still waiting to be admitted, its end is held like its other requests. Once T3 has ended, queued
+         transactions are admitted while there is room for them.
         '''
 
-        transaction = self._transactions[txnID]
+        if txnID in self._queued :
+            return self._hold(txnID, 'end', ())
+
+        transaction = self._transactions.get(txnID)
 
-        if not transaction.isAborted() :
+        if transaction and not transaction.isAborted() :
             if transaction.isReadWrite() :
-                for s in self._transactionSites[txnID] :
-                    if self._clientSites[s].isUp() :
-                        self._clientSites[s].commit(transaction, self._clock)
-                    else :
-                        resultStr = self._abort(transaction)
-                        if resultStr :
-                            return 'One of the sites accessed by Tx failed; aborting\n' + resultStr
+                if self._deferredWrites and self._transactionWrites[txnID] :
+                    resultStr = self._installWrites(transaction)
+                    if resultStr is not None :
+                        return resultStr
+
+                writeSites = self._transactionWriteSites[txnID]
+
+                if transaction.isSnapshot or self._optimistic :
+                    validateSites = self._transactionSites[txnID] if self._optimistic else writeSites
+                    votes = self._broadcast([(s, 'validate', (transaction.toStruct(),)) for s in validateSites])
+                    conflicts = sorted(set(var for vote in votes if vote['status'] == 'conflict' for var in vote['args']))
+                    if conflicts and all(vote['status'] != 'failed' for vote in votes) :
+                        if transaction.isSnapshot :
+                            resultStr = 'Tx %s wrote %s, committed by another transaction since it began; aborting\n' % (txnID, ', '.join(conflicts))
                         else :
-                            return 'One of the sites accessed by Tx failed; aborting'
-                
+                            resultStr = 'Tx %s read %s, committed by another transaction since; aborting\n' % (txnID, ', '.join(conflicts))
+                        for var in conflicts :
+                            self._count(var, 'staleWrites' if transaction.isSnapshot else 'staleReads')
+                        return resultStr + self._abort(transaction)
+                    votes = [vote['status'] == 'success' for vote in votes]
+                else :
+                    votes = self._broadcast([(s, 'prepare', (transaction.toStruct(),)) for s in writeSites])
+
+                if not all(votes) :
+                    resultStr = self._abort(transaction)
+                    if resultStr :
+                        return 'One of the sites accessed by Tx failed; aborting\n' + resultStr
+                    else :
+                        return 'One of the sites accessed by Tx failed; aborting'
+
+                commits = [(s, 'commit', (transaction.toStruct(), self._clock)) for s in writeSites]
+                releases = [(s, 'abort', (transaction.toStruct(),)) for s in self._transactionSites[txnID] if not s in writeSites]
+                self._broadcast(commits + releases)
+
+                for var, value in self._transactionWrites[txnID].iteritems() :
+                    self._snapshotCache.commit(var, self._clock, txnID, value)
+                self._replicate(txnID)
+                self._changeLog.append(self._clock, txnID, self._transactionWrites[txnID])
+
                 transaction.abort()
+                self._statistics['committed'] += 1
+                self._adaptAdmission(True)
+                self._reclaim(transaction)
                 resultStr = self._retryWaitingTransactions()
                 
                 if resultStr :
-                    return 'Ended Tx %s at time_stamp %d\n' % (txnID, self._clock) + resultStr
+                    return 'Ended Tx %s at time_stamp %d\n' % (txnID, self._clock) + resultStr + self._admit()
                 else :
-                    return 'Ended Tx %s at time_stamp %d' % (txnID, self._clock)
+                    return 'Ended Tx %s at time_stamp %d' % (txnID, self._clock) + self._admit()
             else :
-                return 'Ended Tx %s at time_stamp %d' % (txnID, self._clock)
+                transaction.abort()
+                self._reclaim(transaction)
+                return 'Ended Tx %s at time_stamp %d' % (txnID, self._clock) + self._admit()
         else :
             return 'Tx %s is in aborted state' % txnID
 
+    def endAll(self, txnIDs) :
+
+        '''
+        args :
+        - txnIDs               -           The IDs of the transactions to be terminated, in order
+
+        This function is called when the simulator batches consecutive lines of the input file that read, for example
+         "end(T3)", "end(T4)" and "end(T5)". It has the same outcome as calling TransactionManager.end for each of them in
+         turn, and returns the result of each, in order. However, read-write transactions that end one after the other
+         while no request is waitlisted and no transaction is queued for admission are committed as a group : each site
+         receives a single Site.prepareGroup and a single Site.commitGroup for all of them, instead of one Site.prepare
+         and one Site.commit per transaction. Since the waitlist is empty, ending any of them could not have let another
+         request run in between, and since they hold their write-locks until then, none of their votes depends on the
+         others having committed.
+        Transactions whose vote is no are terminated by TransactionManager.end once those before them have committed.
+         Under deferred writes, snapshot isolation or optimistic concurrency control, where ending a transaction may
+         depend on those that committed before it, every transaction is simply terminated by TransactionManager.end.
+        '''
+
+        if self._deferredWrites or self._optimistic or self._isolation == 'snapshot' :
+            return [self.end(txnID) for txnID in txnIDs]
+
+        results = []
+        i = 0
+
+        while i < len(txnIDs) :
+            group = []
+            while i + len(group) < len(txnIDs) and not self._waitlist and not self._queued :
+                transaction = self._transactions.get(txnIDs[i + len(group)])
+                if not transaction or transaction.isAborted() or not transaction.isReadWrite() :
+                    break
+                group.append(transaction)
+
+            if not group :
+                results.append(self.end(txnIDs[i]))
+                i += 1
+                continue
+
+            votes = self._prepareGroup(group)
+            prepared = votes.index(False) if False in votes else len(group)
+            results.extend(self._commitGroup(group[:prepared]))
+            i += prepared
+
+            if prepared < len(group) :
+                results.append(self.end(txnIDs[i]))
+                i += 1
+
+        return results
+
     def dump(self) :
 
         '''
         This function is called when we encounter a line in the input file that reads "dump()".
          This results in fetching the last committed values of all variables on all 10 client sites.
+        Under primary-copy replication, we first wait for every available copy to apply the versions sent to it.
         '''
 
         result = {}
 
+        if self._replicator :
+            self._replicator.drain([siteID for siteID, client in self._clientSites.iteritems() if client.isUp()])
+
         for siteID, client in self._clientSites.iteritems() :
             result[str(siteID)] = client.dump()
 
         return result
 
+    def snapshotAt(self, timeStamp) :
+
+        '''
+        args :
+        - timeStamp             -           The time instance as of which the database is to be read.
+
+        This function retrieves the whole database as it was at 'timeStamp', for example for an audit. Every client site
+         is asked, in parallel, for its versions of its variables as of 'timeStamp'. A site that was down when a value was
+         committed lacks that version, so for each variable we keep the most recently committed of the versions returned.
+         A dictionary is returned, where the keys are the IDs of all variables and the values are their committing
+         transactions and values, as in TransactionManager.dump.
+        '''
+
+        latest = {}
+
+        for snapshot in self._broadcast([(s, 'snapshotAt', (timeStamp,)) for s in self._clientSites]) :
+            for varID, (time, txnID, value) in snapshot.iteritems() :
+                if not varID in latest or time > latest[varID][0] :
+                    latest[varID] = (time, [txnID, value])
+
+        return dict((varID, version[1]) for varID, version in latest.iteritems())
+
+    def watch(self, variables = None, fromTimeStamp = None) :
+
+        '''
+        args :
+        - variables             -           List of the variables ('x3') and ranges of variables ('x3:x8') to watch. None, or
+                                             an empty list, to watch every variable.
+        - fromTimeStamp         -           The time after which the versions committed are to be sent, for example the cursor
+                                             of an earlier watch to resume it. None, to only send the versions committed from now on.
+
+        This function lets a consumer follow the versions committed to some variables instead of polling dump(). It returns
+         the ID of the watch, to read its versions from with TransactionManager.changes.
+        A new watch starts after the last version in the change log rather than at the current time, since the versions
+         committed at the current time (by an end yet to come in this clock tick) have not been sent to anyone yet.
+        '''
+
+        self._expireWatches()
+        watchID = next(self._watchIDs)
+        cursor = self._changeLog.lastTimeStamp() if fromTimeStamp is None else fromTimeStamp
+        self._watches[watchID] = [variableMatcher(variables), cursor, time.time()]
+        return watchID
+
+    def changes(self, watchID, limit = 1024) :
+
+        '''
+        args :
+        - watchID               -           The ID of a watch, as returned by TransactionManager.watch.
+        - limit                 -           The largest number of versions to be sent (more may be, so as not to split those
+                                             committed at the same time).
+
+        This function sends the versions committed to the watched variables since the last call, oldest first, as
+         [varID, value, time of commit, txnID] events, and moves the cursor of the watch past them. The result also holds
+         the cursor, to resume from with a new watch, whether more versions are left ('more') and whether some were
+         dropped from the change log before they could be sent ('truncated'), in which case the consumer should read
+         the database at the cursor with TransactionManager.snapshotAt instead.
+        A watch that has not been read from for TransactionManager._watchTimeout seconds is forgotten, and is then
+         unknown here; the consumer can resume from its cursor with a new watch.
+        '''
+
+        self._expireWatches()
+        if not watchID in self._watches :
+            raise ValueError('Unknown watch %s' % watchID)
+        if limit < 1 :
+            raise ValueError('The limit must be at least 1')
+
+        watch = self._watches[watchID]
+        changes = self._changeLog.since(watch[1], watch[0], limit)
+        watch[1] = changes['cursor']
+        watch[2] = time.time()
+        return changes
+
+    def unwatch(self, watchID) :
+
+        '''
+        args :
+        - watchID               -           The ID of a watch.
+
+        This function forgets a watch.
+        '''
+
+        return self._watches.pop(watchID, None) is not None
+
+    def _expireWatches(self) :
+
+        '''
+        This function is called inside TransactionManager.watch and TransactionManager.changes. It forgets the watches
+         that have not been read from for TransactionManager._watchTimeout seconds.
+        '''
+
+        expiry = time.time() - self._watchTimeout
+        for watchID in [watchID for watchID, watch in self._watches.iteritems() if watch[2] < expiry] :
+            del self._watches[watchID]
+
+    def snapshotCacheStats(self) :
+
+        '''
+        This function reports the hit, miss and eviction counters of the snapshot cache used by read-only transactions.
+        '''
+
+        return self._snapshotCache.stats()
+
+    def statistics(self) :
+
+        '''
+        This function reports the number of transactions that have committed and that have been aborted so far, along
+         with the deadlock policy in use and the amount of state held by the TM (transactions still running, waitlisted
+         requests and nodes of the conflict graph). Under primary-copy replication, it also reports the number of
+         versions not yet applied at the copies they were sent to, and the number of batches sent so far.
+        '''
+
+        statistics = dict(self._statistics)
+        statistics['deadlockPolicy'] = self._deadlockPolicy
+        statistics['transactions'] = len(self._transactions)
+        statistics['waitlist'] = len(self._waitlist)
+        statistics['conflictGraph'] = len(self._activeTransactions)
+        statistics['queued'] = len(self._queued)
+        statistics['admissionLimit'] = int(self._admissionLimit) if self._admissionLimit else None
+        statistics['watches'] = len(self._watches)
+        statistics['changeLog'] = len(self._changeLog)
+        if self._replicator :
+            statistics.update(self._replicator.statistics())
+        return statistics
+
+    def hotKeys(self, n = 10) :
+
+        '''
+        args :
+        - n                     -           The number of variables to report.
+
+        This function reports where the contention between transactions lies. The counters kept by the lock manager of
+         every client site (read-locks and write-locks granted, conflicts caused) are fetched in parallel and added up,
+         per variable and per site, and the counters kept by the TM (waitlisted requests, time spent in the waitlist,
+         deadlocks) are added to those of each variable. The n variables with the most conflicts, waits and deadlocks
+         are returned, hottest first, along with every site, as lists of [ID, counters] pairs.
+        '''
+
+        siteIDs = sorted(self._clientSites.keys())
+        variables = {}
+        sites = []
+
+        for siteID, contention in zip(siteIDs, self._broadcast([(s, 'contention', ()) for s in siteIDs])) :
+            siteCounts = {}
+            for var, counts in contention.iteritems() :
+                for counter, value in counts.iteritems() :
+                    siteCounts[counter] = siteCounts.get(counter, 0) + value
+                    variables.setdefault(var, {})
+                    variables[var][counter] = variables[var].get(counter, 0) + value
+            sites.append([str(siteID), siteCounts])
+
+        for var, counts in self._contention.iteritems() :
+            variables.setdefault(var, {}).update(counts)
+
+        heat = lambda entry : (entry[1].get('conflicts', 0) + entry[1].get('waits', 0) + entry[1].get('deadlocks', 0) + entry[1].get('staleWrites', 0) + entry[1].get('staleReads', 0), entry[1].get('waitTime', 0))
+        hottest = sorted(variables.iteritems(), key = heat, reverse = True)[:n]
+        sites.sort(key = heat, reverse = True)
+
+        return {'variables': [list(entry) for entry in hottest], 'sites': sites}
+
     def _detectDeadlock(self, command, isWriteLocked, conflictingTransactions) :
 
         '''
@@ -317,8 +937,12 @@ class TransactionManager(object) :
         The conflicting pair of transactions P = (T1, T2) is added as an edge to the conflict graph. A deadlock check is
          performed by checking for the existence of a cycle in the conflict graph. If a deadlock is detected, 
          the younger transaction (higher timestamp) in P is aborted. Else, the current request is added to the waitlist.
+        Under the 'wait-die' and 'wound-wait' policies, the conflict is instead handed to TransactionManager._preventDeadlock.
         '''
 
+        if self._deadlockPolicy != 'detect' :
+            return self._preventDeadlock(command, conflictingTransactions)
+
         txnID = command[1]
         transaction = self._transactions[txnID]
         
@@ -326,12 +950,13 @@ class TransactionManager(object) :
             conflictingTxn = self._transactions[conflictingTransactions]
             isDeadlocked = self._addConflictGraph(txnID, conflictingTransactions)            
             if isDeadlocked :
+                self._count(command[2], 'deadlocks')
                 if transaction.getTimeStamp() > conflictingTxn.getTimeStamp() :
                     self._removeConflictGraph(txnID)
                     return self._abort(transaction)
                 else :
                     self._removeConflictGraph(conflictingTransactions)
-                    return self._abort(conflictingTransactions)            
+                    return self._abort(conflictingTxn)
             else :
                 self._addWaitlist(command)
                 return 'Waitlisted Tx %s at time_stamp %d' % (txnID, self._clock)
@@ -342,6 +967,7 @@ class TransactionManager(object) :
                     conflictingTxn = self._transactions[conflictingTxnID]
                     isDeadlocked = self._addConflictGraph(txnID, conflictingTxnID)
                     if isDeadlocked :
+                        self._count(command[2], 'deadlocks')
                         if transaction.getTimeStamp() > conflictingTxn.getTimeStamp() :
                             self._removeConflictGraph(txnID)
                             return self._abort(transaction)
@@ -352,6 +978,49 @@ class TransactionManager(object) :
             self._addWaitlist(command)
             return 'Waitlisted transaction %s at time_stamp %d' % (txnID, self._clock)
 
+    def _preventDeadlock(self, command, conflictingTransactions) :
+
+        '''
+        args :
+        - command                       -       The current request being processed (Read or Write operation)
+        - conflictingTransactions       -       The conflicting transactions with present transaction. A list of 
+                                                    transaction IDs or a single transaction ID.
+
+        This function is called inside TransactionManager._detectDeadlock when a timestamp-based policy is in use. Let T be
+         the transaction issuing the current request. Since a transaction may only ever wait for younger transactions (under
+         'wait-die') or only for older transactions (under 'wound-wait'), no cycle can form and no conflict graph is kept.
+        - wait-die : if T is older than every conflicting transaction, T waits (its request is added to the waitlist).
+            Otherwise, T dies, i.e. it is aborted.
+        - wound-wait : T waits, but every conflicting transaction younger than T is wounded, i.e. aborted, which in turn
+            lets the waitlisted request of T be retried.
+        '''
+
+        txnID = command[1]
+        transaction = self._transactions[txnID]
+
+        if isinstance(conflictingTransactions, str) :
+            conflictingTransactions = [conflictingTransactions]
+        holders = [self._transactions[t] for t in conflictingTransactions if t != txnID]
+
+        if self._deadlockPolicy == 'wait-die' :
+            for holder in holders :
+                if holder.getTimeStamp() < transaction.getTimeStamp() :
+                    self._count(command[2], 'deadlocks')
+                    return self._abort(transaction)
+
+            self._addWaitlist(command)
+            return 'Waitlisted Tx %s at time_stamp %d' % (txnID, self._clock)
+
+        self._addWaitlist(command)
+        resultStr = 'Waitlisted Tx %s at time_stamp %d' % (txnID, self._clock)
+
+        for holder in holders :
+            if holder.getTimeStamp() > transaction.getTimeStamp() and not holder.isAborted() :
+                self._count(command[2], 'deadlocks')
+                resultStr += '\n' + self._abort(holder)
+
+        return resultStr
+
     def _addConflictGraph(self, currentTransaction, conflictingTransaction) :
 
         '''
@@ -382,8 +1051,13 @@ class TransactionManager(object) :
         This function is called inside TransactionManager._detectDeadlock when a deadlock is found to exist and
          is resolved by choosing to abort the younger transaction. Before the transaction is aborted, we erase
          the node corresponding to this transaction from the conflict graph as well as all edges involving it. 
+        It is also called inside TransactionManager._reclaim for every transaction that ends, since no other
+         transaction can be waiting for it any longer.
         '''
-        
+
+        if not abortingTransaction in self._activeTransactions :
+            return
+
         # Removing node from conflict graph
         self._activeTransactions.remove(abortingTransaction)
 
@@ -393,7 +1067,7 @@ class TransactionManager(object) :
         
         # Removing incoming edges
         for txn, conflicts in self._conflictGraph.items() :
-            if abortingTransaction in conflicts :
+            while abortingTransaction in conflicts :
                 conflicts.remove(abortingTransaction)
 
     def _isCyclic(self) :
@@ -416,7 +1090,7 @@ class TransactionManager(object) :
             if not visited[t] :
                 if self._dfs(t, visited, grey) :
                     return True
-            return False
+        return False
 
     def _dfs(self, node, visited, grey) :
 
@@ -446,18 +1120,73 @@ class TransactionManager(object) :
         grey[node] = False
         return False
 
-    def _connectAllClients(self):
+    def _connectAllClients(self, sitePorts, channels = None):
 
         '''
+        args :
+        - sitePorts                 -       The ports of the client sites, in the order of their site IDs.
+        - channels                  -       Dictionary of the shared-memory channels to the client sites, or None.
+
         This function is called by the constructor of the TransactionManager class.
         It sets up connections with each of the 10 client servers.
         We will be using these client servers as client sites in our simulation.
+        When the sites are reached over shared memory, their channels stand in for the client servers.
         '''
 
-        for i in range(1, 11) :
-            url = 'http://localhost:' + str(9089 + i)
-            clientSite = xmlrpclib.ServerProxy(url, allow_none = True)
-            self._clientSites[i] = clientSite
+        for i, port in enumerate(sitePorts, 1) :
+            self._siteURLs[i] = 'http://localhost:' + str(port)
+            self._clientSites[i] = self._siteClient(i, channels[i] if channels else None)
+
+    def _siteClient(self, siteID, channel = None) :
+
+        '''
+        args :
+        - siteID                    -       The ID of the client site.
+        - channel                   -       The shared-memory channel to the client site, or None.
+
+        This function is called inside TransactionManager._connectAllClients and TransactionManager._callSite. It returns
+         a client of the site : its channel, if any, or else a new connection to it. When tracing, the client sends the
+         ID of the trace of the calling thread along with each request, and records a span for it.
+        '''
+
+        if self._tracer is None :
+            return channel or xmlrpclib.ServerProxy(self._siteURLs[siteID], allow_none = True)
+        client = channel or xmlrpclib.ServerProxy(self._siteURLs[siteID], allow_none = True, transport = TracingTransport())
+        return self._tracer.client('site%d' % siteID, client)
+
+    def _broadcast(self, calls) :
+
+        '''
+        args :
+        - calls                     -       List of (siteID, method, args) triples, one per request to be sent.
+
+        This function is called inside TransactionManager.end and TransactionManager._abort to send requests to many
+         client sites at once. The requests are sent in parallel from the worker threads of TransactionManager._sitePool,
+         each over its own connection and for the trace of the calling thread, and the list of their results is returned
+         in the same order as 'calls'. A single request is simply sent from the calling thread.
+        '''
+
+        if len(calls) == 1 :
+            siteID, method, args = calls[0]
+            return [getattr(self._clientSites[siteID], method)(*args)]
+
+        return self._sitePool.map(bind(self._callSite), calls)
+
+    def _callSite(self, call) :
+
+        '''
+        args :
+        - call                      -       The (siteID, method, args) triple of the request to be sent.
+
+        This function is called from the worker threads of TransactionManager._sitePool. Since a connection to a client site
+         cannot be shared between threads, it opens a new one for this request. A shared-memory channel can be shared,
+         and is used as it is.
+        '''
+
+        siteID, method, args = call
+        if self._channels :
+            return getattr(self._clientSites[siteID], method)(*args)
+        return getattr(self._siteClient(siteID), method)(*args)
 
     def _sitesHoldingVar(self, varID) :
 
@@ -468,13 +1197,50 @@ class TransactionManager(object) :
         This function is called inside TransactionManager.read and Transaction.write. For both these operations,
          this function fetches all the target sites on which the variable whose ID is 'varID' resides. Variables
          with even 'varID's reside on all client sites; variables with odd 'varID's reside only on site number
-         1 + (varID mod 10). 
+         1 + (varID mod 10), or more generally 1 + (varID mod number of sites). 
         '''
         
         if (varID % 2) == 0 :
             return self._clientSites.keys()
         else :
-            return [1 + (varID % 10)]
+            return [1 + (varID % len(self._clientSites))]
+
+    def _primarySites(self, varID) :
+
+        '''
+        args :
+        - varID                     -       The ID of the variable. For example, the ID of x12 is 12.
+
+        This function is called inside TransactionManager.read, TransactionManager.write, TransactionManager.execute and
+         TransactionManager._installWrites to fetch the sites at which the variable is locked and written. Under available
+         copies, these are all the sites holding it (see TransactionManager._sitesHoldingVar). Under primary-copy
+         replication, this is its primary site alone, site number 1 + (varID mod number of sites), which is also the only
+         site holding an odd-indexed variable.
+        '''
+
+        if self._replicator :
+            return [1 + (varID % len(self._clientSites))]
+        return self._sitesHoldingVar(varID)
+
+    def _replicate(self, txnID) :
+
+        '''
+        args :
+        - txnID                     -       The ID of a transaction that has just committed
+
+        This function is called inside TransactionManager.end and TransactionManager._commitGroup. Under primary-copy
+         replication, every version committed by this transaction is queued for every other copy of its variable.
+        '''
+
+        if not self._replicator :
+            return
+
+        for var, value in sorted(self._transactionWrites[txnID].iteritems()) :
+            varID = int(var[1:])
+            primary = self._primarySites(varID)[0]
+            for s in self._sitesHoldingVar(varID) :
+                if s != primary :
+                    self._replicator.enqueue(s, [var, self._clock, txnID, value])
 
     def _addTransactionSites(self, transaction, siteID) :
 
@@ -486,7 +1252,7 @@ class TransactionManager(object) :
         This function is called in TransactionManager.read and TransactionManager.write where we are building an
          association between the transaction and the client sites that it needs to access by adding the necessary
          site IDs to the list of sites this transaction can access. We do this by modifying 
-         TransactionManager._transactionSites.
+         TransactionManager._transactionSites, along with its reverse index TransactionManager._siteTransactions.
         '''
         
         if transaction.isReadWrite() :
@@ -494,6 +1260,24 @@ class TransactionManager(object) :
 
             if not siteID in self._transactionSites[txnID] :
                 self._transactionSites[txnID].append(siteID)
+                self._siteTransactions[siteID].add(txnID)
+
+    def _addTransactionWriteSites(self, transaction, siteID) :
+
+        '''
+        args :
+        - transaction                   -           The transaction that has written to this site.
+        - siteID                        -           The ID of the site written to.
+
+        This function is called in TransactionManager.write and TransactionManager.execute once a write has succeeded on a
+         site, to record that this transaction holds write-locks there and must take part in its two-phase commit. We do
+         this by modifying TransactionManager._transactionWriteSites.
+        '''
+
+        txnID = transaction.getID()
+
+        if not siteID in self._transactionWriteSites[txnID] :
+            self._transactionWriteSites[txnID].append(siteID)
 
     def _retryWaitingTransactions(self) :
 
@@ -502,16 +1286,14 @@ class TransactionManager(object) :
          transaction could result in the releasing of some locks that were conflicting with some of the
          waitlisted requests, which implies that some requests in the waitlist can proceed without any conflicts.
          In other words, this function tries to execute each of the requests in the waitlist, if there are no 
-         conflicts.
+         conflicts. The requests are tried in the order given by the waitlist policy.
         '''
 
         resultStr = ""
-        i = 0
 
-        while i < len(self._waitlist) :
-            operation = self._waitlist[i]
+        for operation in self._waitlist.retry() :
             txnID = operation[1]
-            transaction = self._transactions[txnID]
+            transaction = self._transactions.get(txnID)
 
             if operation[0] == 'write' :
                 var, value = operation[2:]
@@ -520,10 +1302,9 @@ class TransactionManager(object) :
                 var = operation[2]
                 resultStr += '\n' + self.read(txnID, var)
 
-            if not transaction.isWaiting() and operation in self._waitlist :
+            if (not transaction or not transaction.isWaiting()) and operation in self._waitlist :
                 self._waitlist.remove(operation)
-            else :
-                i += 1
+                self._count(operation[2], 'waitTime', self._clock - self._waitlistedAt.pop(operation, self._clock))
 
         return resultStr
 
@@ -544,7 +1325,9 @@ class TransactionManager(object) :
         transaction = self._transactions[txnID]
 
         if not transaction.isWaiting() :
-            self._waitlist.append(command)
+            self._waitlist.add(command, self._waitPriority(transaction))
+            self._waitlistedAt[command] = self._clock
+            self._count(command[2], 'waits')
             transaction.wait()
 
     def _abortSiteTransactions(self, siteID) :
@@ -554,18 +1337,21 @@ class TransactionManager(object) :
         - siteID                    -           The ID of the failing site
 
         This function is called inside TransactionManager.fail, where upon the failure of a site we abort all
-         transactions that were accessing variables on this site.
+         transactions that were accessing variables on this site. These are found from TransactionManager._siteTransactions
+         and aborted together, oldest first. Only then do we check, once, if any of the waitlisted requests can be executed.
         '''
 
+        victims = [self._transactions[txnID] for txnID in self._siteTransactions[siteID]]
+        if not victims :
+            return ""
+
+        victims.sort(key = lambda transaction : transaction.getTimeStamp())
         resultStr = ""
 
-        for txnID, sites in self._transactionSites.iteritems() :
-            if siteID in sites :
-                transaction = self._transactions[txnID]
-                if not transaction.isAborted() :
-                    resultStr += self._abort(transaction)
+        for transaction in victims :
+            resultStr += self._terminate(transaction) + "\n"
 
-        return resultStr
+        return resultStr + self._retryWaitingTransactions() + self._admit()
 
     def _abort(self, transaction) :
 
@@ -583,15 +1369,344 @@ class TransactionManager(object) :
         txnID = transaction.getID()
 
         if txnID in self._transactionSites :
-            for s in self._transactionSites[txnID] :
-                self._clientSites[s].abort(transaction)
-                transaction.abort()
-            resultStr = 'Aborted Tx %s at time_stamp %d' % (txnID, self._clock)
+            resultStr = self._terminate(transaction)
             resultStr += "\n" + self._retryWaitingTransactions()
+            resultStr += self._admit()
             
             return resultStr
         else :
             return 'Tx %s not found on transaction manager' % txnID
 
+    def _terminate(self, transaction) :
+
+        '''
+        args :
+        - transaction               -           An instance of Transaction to be aborted
+
+        This function is called inside TransactionManager._abort and TransactionManager._abortSiteTransactions. It aborts
+         the transaction on all the client sites that it was active on and then on its own, without retrying any of the
+         waitlisted requests.
+        '''
+
+        txnID = transaction.getID()
+
+        self._broadcast([(s, 'abort', (transaction.toStruct(),)) for s in self._transactionSites[txnID]])
+        transaction.abort()
+        self._statistics['aborted'] += 1
+        if transaction.isReadWrite() :
+            self._adaptAdmission(False)
+        self._reclaim(transaction)
+
+        return 'Aborted Tx %s at time_stamp %d' % (txnID, self._clock)
+
+    def _installWrites(self, transaction) :
+
+        '''
+        args :
+        - transaction               -           An instance of Transaction whose buffered writes are to be sent to the sites
+
+        Notable local variables :
+        - siteOperations            -           Dictionary where the keys are site IDs and the values are the writes to be
+                                                 performed on that site.
+
+        This function is called inside TransactionManager.end when writes are deferred. Every buffered write goes to all
+         available sites holding its variable, grouped into a single Site.execute request per site. The sites are first
+         asked only to check for lock conflicts, so that either every write-lock is acquired or none is. Since the
+         transaction is ending, it cannot wait for a conflicting transaction : if a variable has no available site or a
+         write-lock conflicts with another transaction, the transaction is aborted and the resulting message is returned.
+         Otherwise, the writes are performed and None is returned, leaving the commit to TransactionManager.end.
+        '''
+
+        txnID = transaction.getID()
+        siteOperations = defaultdict(list)
+        siteIsUp = {}
+
+        for var, value in sorted(self._transactionWrites[txnID].iteritems()) :
+            sites = []
+            for s in self._primarySites(int(var[1:])) :
+                if not s in siteIsUp :
+                    siteIsUp[s] = self._clientSites[s].isUp()
+                if siteIsUp[s] :
+                    sites.append(s)
+
+            if not sites :
+                return 'Unable to write %s, no site available; aborting\n' % var + self._abort(transaction)
+
+            for s in sites :
+                siteOperations[s].append(('write', var, value))
+
+        siteIDs = sorted(siteOperations.keys())
+        checks = self._broadcast([(s, 'execute', (transaction.toStruct(), siteOperations[s], False)) for s in siteIDs])
+
+        if not all(check['status'] == 'success' for check in checks) :
+            return 'Tx %s could not acquire its write-locks; aborting\n' % txnID + self._abort(transaction)
+
+        self._broadcast([(s, 'execute', (transaction.toStruct(), siteOperations[s])) for s in siteIDs])
+
+        for s in siteIDs :
+            self._addTransactionSites(transaction, s)
+            self._addTransactionWriteSites(transaction, s)
+
+        return None
+
+    def _start(self, txnID, isRW) :
+
+        '''
+        args :
+        - txnID                     -           The ID of the transaction to be created
+        - isRW                      -           True, if the transaction is of read-write type; False, if read-only
+
+        This function is called inside TransactionManager.begin, TransactionManager.beginRO and TransactionManager._admit
+         to create a transaction that has been admitted.
+        '''
+
+        self._running[isRW].add(txnID)
+
+        if isRW :
+            self._transactions[txnID] = Transaction(txnID, self._clock, snapshot = self._isolation == 'snapshot')
+            self._transactionSites[txnID] = []
+            self._transactionWriteSites[txnID] = []
+            self._transactionWrites[txnID] = {}
+            self._transactionReads[txnID] = set()
+            return 'Began Tx %s with time_stamp %d' % (txnID, self._transactions[txnID].getTimeStamp())
+        else :
+            self._transactions[txnID] = Transaction(txnID, self._clock, RW = False)
+            return 'Began read-only Tx %s with time_stamp %d' % (txnID, self._transactions[txnID].getTimeStamp())
+
+    def _hasRoom(self, isRW) :
+
+        '''
+        args :
+        - isRW                      -           True, for read-write transactions; False, for read-only ones
+
+        This function checks if one more transaction of this type can be admitted right now.
+        '''
+
+        limit = self._admissionLimit if isRW else self._maxActiveRO
+        return limit is None or len(self._running[isRW]) < max(int(limit), 1)
+
+    def _enqueue(self, txnID, isRW) :
+
+        '''
+        args :
+        - txnID                     -           The ID of the transaction that wishes to begin
+        - isRW                      -           True, if the transaction is of read-write type; False, if read-only
+
+        This function is called inside TransactionManager.begin and TransactionManager.beginRO when a transaction cannot be
+         admitted yet. The transaction joins the back of the admission queue of its type.
+        '''
+
+        self._admissionQueues[isRW].append(txnID)
+        self._queued[txnID] = []
+        return 'Queued Tx %s for admission at time_stamp %d' % (txnID, self._clock)
+
+    def _hold(self, txnID, method, arguments) :
+
+        '''
+        args :
+        - txnID                     -           The ID of a transaction waiting to be admitted
+        - method                    -           The request issued by the transaction ('read', 'write' or 'end')
+        - arguments                 -           The arguments of the request, after the transaction ID
+
+        This function is called inside TransactionManager.read, TransactionManager.write, TransactionManager.execute and
+         TransactionManager.end for a transaction waiting to be admitted. The request is kept, to be processed in order
+         once the transaction is admitted.
+        '''
+
+        self._queued[txnID].append((method, arguments))
+        resultStr = 'Held %s of queued Tx %s at time_stamp %d' % (method, txnID, self._clock)
+        return '\n' + resultStr if method == 'write' else resultStr
+
+    def _admit(self) :
+
+        '''
+        This function is called whenever transactions finish (inside TransactionManager.end, TransactionManager._abort and
+         TransactionManager._abortSiteTransactions). While there is room, the transaction at the front of each admission
+         queue is admitted : it is created as of now, and the requests it issued while queued are processed in order.
+         The results of all of these are returned.
+        '''
+
+        resultStr = ""
+
+        for isRW in (True, False) :
+            queue = self._admissionQueues[isRW]
+            while queue and self._hasRoom(isRW) :
+                txnID = queue.popleft()
+                requests = self._queued.pop(txnID)
+                resultStr += '\nAdmitted Tx %s at time_stamp %d\n' % (txnID, self._clock) + self._start(txnID, isRW)
+                for method, arguments in requests :
+                    resultStr += '\n' + getattr(self, method)(txnID, *arguments)
+
+        return resultStr
+
+    def _adaptAdmission(self, committed) :
+
+        '''
+        args :
+        - committed                 -           True, if a read-write transaction has just committed; False, if it has aborted
+
+        This function is called inside TransactionManager.end and TransactionManager._terminate. Under adaptive admission,
+         the limit on running read-write transactions is increased additively on commits and decreased multiplicatively
+         on aborts, so that it settles where transactions mostly commit.
+        '''
+
+        if not self._adaptiveAdmission :
+            return
+
+        if committed :
+            self._admissionLimit = min(float(self._maxActive), self._admissionLimit + 1.0 / self._admissionLimit)
+        else :
+            self._admissionLimit = max(1.0, self._admissionLimit / 2)
+
+    def _prepareGroup(self, transactions) :
+
+        '''
+        args :
+        - transactions              -           Read-write transactions ending together, in order
+
+        This function is called inside TransactionManager.endAll. It sends, in parallel, one Site.prepareGroup to every
+         site written to by any of these transactions, and returns for each transaction whether all its sites voted yes.
+        '''
+
+        siteTransactions = defaultdict(list)
+        for transaction in transactions :
+            for s in self._transactionWriteSites[transaction.getID()] :
+                siteTransactions[s].append(transaction)
+
+        siteIDs = sorted(siteTransactions.keys())
+        votes = dict((transaction.getID(), True) for transaction in transactions)
+
+        for s, siteVotes in zip(siteIDs, self._broadcast([(s, 'prepareGroup', ([transaction.toStruct() for transaction in siteTransactions[s]],)) for s in siteIDs])) :
+            for transaction, vote in zip(siteTransactions[s], siteVotes) :
+                votes[transaction.getID()] = votes[transaction.getID()] and vote
+
+        return [votes[transaction.getID()] for transaction in transactions]
+
+    def _commitGroup(self, transactions) :
+
+        '''
+        args :
+        - transactions              -           Read-write transactions ending together, in order, all of which have been
+                                                 voted to commit by their sites
+
+        This function is called inside TransactionManager.endAll. It sends, in parallel, one Site.commitGroup to every
+         site accessed by any of these transactions, to commit their writes and release their read-locks, and then
+         terminates each of them as TransactionManager.end would have. It returns the result of each, in order.
+        '''
+
+        if not transactions :
+            return []
+
+        commits = defaultdict(list)
+        releases = defaultdict(list)
+        for transaction in transactions :
+            txnID = transaction.getID()
+            writeSites = self._transactionWriteSites[txnID]
+            for s in self._transactionSites[txnID] :
+                if s in writeSites :
+                    commits[s].append(transaction.toStruct())
+                else :
+                    releases[s].append(transaction.toStruct())
+
+        siteIDs = sorted(set(commits) | set(releases))
+        self._broadcast([(s, 'commitGroup', (commits[s], releases[s], self._clock)) for s in siteIDs])
+
+        results = []
+        for transaction in transactions :
+            txnID = transaction.getID()
+            for var, value in self._transactionWrites[txnID].iteritems() :
+                self._snapshotCache.commit(var, self._clock, txnID, value)
+            self._replicate(txnID)
+            self._changeLog.append(self._clock, txnID, self._transactionWrites[txnID])
+
+            transaction.abort()
+            self._statistics['committed'] += 1
+            self._adaptAdmission(True)
+            self._reclaim(transaction)
+            results.append('Ended Tx %s at time_stamp %d' % (txnID, self._clock))
+
+        self._statistics['groupCommits'] += 1
+        self._statistics['groupCommitted'] += len(transactions)
+        return results
+
+    def _waitPriority(self, transaction) :
+
+        '''
+        args :
+        - transaction               -           The transaction whose request is being waitlisted
+
+        This function is called inside TransactionManager._addWaitlist. It returns the priority of the request under the
+         waitlist policy, lower priorities being retried first. A waiting transaction neither acquires nor releases locks,
+         so its priority does not change for as long as its request is in the waitlist.
+        '''
+
+        if self._waitlistPolicy == 'oldest' :
+            return (transaction.getTimeStamp(),)
+        elif self._waitlistPolicy == 'fewest-locks' :
+            txnID = transaction.getID()
+            return (len(self._transactionReads.get(txnID, set()).union(self._transactionWrites.get(txnID, {}))),)
+        elif self._waitlistPolicy == 'ro-first' :
+            return (transaction.isReadWrite(),)
+        return ()
+
+    def _count(self, var, counter, amount = 1) :
+
+        '''
+        args :
+        - var                       -           The ID of the variable in question
+        - counter                   -           One of TransactionManager.CONTENTION_COUNTERS
+        - amount                    -           The amount to be added to the counter
+
+        This function is called whenever a request is waitlisted or leaves the waitlist, and whenever a deadlock is
+         resolved or prevented, or a write fails validation under snapshot isolation, to add to a counter of this
+         variable in TransactionManager._contention.
+        '''
+
+        counts = self._contention.get(var)
+        if counts is None :
+            counts = self._contention[var] = dict.fromkeys(self.CONTENTION_COUNTERS, 0)
+        counts[counter] += amount
+
+    def _reclaim(self, transaction) :
+
+        '''
+        args :
+        - transaction               -           An instance of Transaction that has ended or has been aborted
+
+        This function is called inside TransactionManager.end and TransactionManager._abort once a transaction has been
+         terminated on all its sites. Nothing can refer to this transaction any longer : its locks have been released, its
+         committed values are with the sites (and the snapshot cache), and its waitlisted request, if any, is answered as
+         for an aborted transaction on the next retry. So we drop it from every structure of the TM, including the
+         conflict graph, to keep the memory of the TM and the cost of scanning these structures independent of the number
+         of transactions run so far.
+        '''
+
+        txnID = transaction.getID()
+
+        if self._transactions.get(txnID) is transaction :
+            del self._transactions[txnID]
+        for s in self._transactionSites.get(txnID, []) :
+            self._siteTransactions[s].discard(txnID)
+        self._transactionSites.pop(txnID, None)
+        self._transactionWriteSites.pop(txnID, None)
+        self._transactionWrites.pop(txnID, None)
+        self._transactionReads.pop(txnID, None)
+        self._running[transaction.isReadWrite()].discard(txnID)
+        self._removeConflictGraph(txnID)
+
 if __name__ == '__main__' :
-    TM = TransactionManager()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description = 'Start the transaction manager.')
+    parser.add_argument('--port', type = int, default = 7777, help = 'The port of the TM (default: 7777).')
+    parser.add_argument('--deadlock-policy', choices = TransactionManager.DEADLOCK_POLICIES, default = 'detect', help = 'How conflicts are resolved (default: detect).')
+    parser.add_argument('--deferred-writes', action = 'store_true', help = 'Buffer writes at the TM until their transaction ends.')
+    parser.add_argument('--max-active', type = int, default = None, help = 'Queue read-write transactions beyond this many running ones.')
+    parser.add_argument('--max-active-ro', type = int, default = None, help = 'Queue read-only transactions beyond this many running ones.')
+    parser.add_argument('--adaptive-admission', action = 'store_true', help = 'Adapt the limit on read-write transactions to the abort rate.')
+    parser.add_argument('--concurrency-control', choices = Site.CONCURRENCY_CONTROLS, default = 'locking', help = 'The engine of the client sites (default: locking).')
+    parser.add_argument('--replication', choices = TransactionManager.REPLICATION_SCHEMES, default = 'available-copies', help = 'How the copies of a variable are kept up to date (default: available-copies).')
+    parser.add_argument('--isolation', choices = TransactionManager.ISOLATION_LEVELS, default = 'serializable', help = 'The isolation level of read-write transactions (default: serializable).')
+    parser.add_argument('--waitlist-policy', choices = TransactionManager.WAITLIST_POLICIES, default = 'fifo', help = 'The order in which waitlisted requests are retried (default: fifo).')
+    parser.add_argument('--trace', default = None, metavar = 'FILE', help = 'Append the spans of traced requests to a trace file.')
+    args = parser.parse_args()
+
+    TM = TransactionManager(args.port, deadlockPolicy = args.deadlock_policy, deferredWrites = args.deferred_writes, maxActive = args.max_active, maxActiveRO = args.max_active_ro, adaptiveAdmission = args.adaptive_admission, waitlistPolicy = args.waitlist_policy, isolation = args.isolation, concurrencyControl = args.concurrency_control, replication = args.replication, traceFile = args.trace)
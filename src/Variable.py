@@ -1,35 +1,107 @@
 # Authors :
 # Sudharshann D (sd3770)
 
+from array import array
+from itertools import izip
+from bisect import bisect_left, bisect_right
+
+class WriterTable(object) :
+
+	'''
+	Class that will serve as the table of the IDs of the transactions that have committed a version of the variables of
+	 a client site, so that each version only holds an index into this table. Every site has a table of its own, which
+	 goes away with the site.
+	'''
+
+	__slots__ = ('_writers', '_writerIndex')
+
+	def __init__(self) :
+
+		'''
+		Constructor to initialize all data members of WriterTable class.
+
+		Data members :
+
+		- _writers 					-			List of the IDs of the committing transactions, where the index of an ID is the
+												 one held by its versions. The initial values are committed by 'default', at 0.
+		- _writerIndex 				-			Dictionary mapping each ID in _writers to its index.
+		'''
+
+		self._writers = ['default']
+		self._writerIndex = {'default': 0}
+
+	def intern(self, txnID) :
+
+		'''
+		args :
+		- txnID 					-			The ID of a committing transaction.
+
+		This function is called inside Variable.commit and Variable.install. It returns the index of this transaction ID,
+		 adding it first if it has not been seen before.
+		'''
+
+		index = self._writerIndex.get(txnID)
+		if index is None :
+			index = len(self._writers)
+			self._writers.append(txnID)
+			self._writerIndex[txnID] = index
+		return index
+
+	def writerOf(self, index) :
+
+		'''
+		args :
+		- index 					-			The index of a committing transaction.
+
+		This function is called inside Variable.readVersion and Site.snapshotAt to turn an interned committing transaction
+		 back into its ID.
+		'''
+
+		return self._writers[index]
+
 class Variable(object) :
 
 	'''
 	Class that will serve as a variable (x1, x2, ..., x20).
 	It will be used to manage the actions of a read, a write, a recovery and a
 	 commit to a variable on a client site at the lowest level of abstraction.
+	A site may hold a very long history of committed versions, so each version is kept as one entry in each of
+	 three typed arrays (time of commit, committing transaction and value) rather than as Python objects of its own.
 	'''
 
-	def __init__(self, varID, value) :
+	__slots__ = ('ID', 'commitTimes', 'commitWriters', 'commitValues', 'writers', 'uncommitted', 'isActive')
+
+	def __init__(self, varID, value, writers = None) :
 
 		'''
 		args :
 		- varID 					-			The unique ID to be associated with each transaction.
 		- value 					-			The value to be written at first to a variable. For a variable with ID 'x{i}', the value is 10*i. 
+		- writers 					-			The WriterTable of the site holding the variable. A table of its own, if None.
 
 		Constructor to initialize all data members of Variable class.
 
 		Data members :
 		
 		- ID 						- 			The unique ID associated with each of the 20 variables. For example, the ID for x11 is 'x11'.
-		- committedValues 			- 			List of tuples representing committed values to the variable, along with the time of commit and the committing transaction. 
-		- lastUncommitted 			-			Tuple representing the last write made to the variable. It stores the value written and the ID of the transaction writing to it. 
+		- commitTimes 				-			Array of the times of commit of the committed values of the variable, in increasing order.
+		- commitWriters 			-			Array of the committing transactions of the committed values, as indices into writers.
+		- commitValues 				-			Array of the committed values of the variable.
+		- writers 					-			The WriterTable of the IDs of the committing transactions.
+		- uncommitted 				-			Dictionary of the writes made to the variable and not yet committed, where the keys are the IDs
+												 of the transactions writing to it and the values are the values they last wrote. Under locking,
+												 it holds the write of the transaction owning the write-lock at most; under optimistic
+												 concurrency control, several transactions may have written to the variable at once.
 		- isActive 					-			Status of the variable. True, by default. Set to False, immediately after a failed site recovers.
 
 		'''
 		
 		self.ID = varID
-		self.committedValues = [(0, ('default', value))]
-		self.lastUncommitted = (None, None)
+		self.commitTimes = array('l', [0])
+		self.commitWriters = array('l', [0])
+		self.commitValues = array('l', [value])
+		self.writers = writers if writers is not None else WriterTable()
+		self.uncommitted = {}
 		self.isActive = True
 
 	def readCommitted(self, transaction = None) :
@@ -46,17 +118,28 @@ class Variable(object) :
 		It is also called inside Site.dump where we just simply retrieve the last committed value of a variable.
 		'''
 
-		# For read-only transactions
-		if transaction and not transaction['isRW'] :
-			for time, value in self.committedValues :
-				if time <= transaction['timeStamp'] :
-					last = value
-				else :
-					break
-			return last
+		return self.readVersion(transaction)[1]
+
+	def readVersion(self, transaction = None) :
+
+		'''
+		args :
+		- transaction 			-		An instance of the Transaction class representing the transaction trying to read.
+
+		This function is called inside Variable.readCommitted and inside Site.read for read-only transactions (and read-write
+		 transactions under snapshot isolation, which read the same way). It returns
+		 the committed version visible to this transaction as the pair (time of commit, (committing transaction, value)),
+		 so that the TM can tell which version a snapshot read has seen.
+		'''
+
+		# For read-only transactions and transactions under snapshot isolation
+		if transaction and (not transaction['isRW'] or transaction.get('isSnapshot')) :
+			i = bisect_right(self.commitTimes, transaction['timeStamp']) - 1
 		# 
 		else :
-			return self.committedValues[-1][1]
+			i = len(self.commitTimes) - 1
+
+		return (self.commitTimes[i], (self.writers.writerOf(self.commitWriters[i]), self.commitValues[i]))
 
 	def readUncommitted(self, transaction) :
 
@@ -71,9 +154,9 @@ class Variable(object) :
 		 began if this transaction was not the one that had last made an uncommitted write.
 		'''
 
-		if self.lastUncommitted[0] == transaction['ID'] :
-			return self.lastUncommitted[1]
-		return self.readCommmitted(transaction)
+		if transaction['ID'] in self.uncommitted :
+			return self.uncommitted[transaction['ID']]
+		return self.readCommitted(transaction)
 
 	def write(self, transaction, value) :
 
@@ -85,10 +168,25 @@ class Variable(object) :
 		This function is called inside Site.write when the transaction that wishes to write to a variable 
 		 manages to acquire a write-lock on that variable. However, since this write is yet to be committed
 		 (which would only occur if the transaction would naturally terminate), we store this value as the
-		 most recent ready-to-be-committed value, i.e. Variable.lastUncommitted.
+		 most recent ready-to-be-committed value of this transaction, in Variable.uncommitted.
+		'''
+
+		self.uncommitted[transaction['ID']] = value
+
+	def discard(self, transaction = None) :
+
+		'''
+		args :
+		- transaction 			- 		An instance of the Transaction class representing the transaction being aborted.
+
+		This function is called inside Site.abort, to drop the uncommitted write of a transaction being aborted, and
+		 inside Site.fail, to drop the uncommitted writes of all transactions (when 'transaction' is None).
 		'''
 
-		self.lastUncommitted = (transaction['ID'], value)
+		if transaction is None :
+			self.uncommitted.clear()
+		else :
+			self.uncommitted.pop(transaction['ID'], None)
 
 	def recover(self) :
 
@@ -122,25 +220,258 @@ class Variable(object) :
 		index = int(self.ID[1:])
 		return (index % 2) == 0
 
-	def commit(self, timeStamp) :
+	def commit(self, timeStamp, transaction) :
 
 		'''
 		args :
 		- timeStamp 		- 			The exact time instance of commit.
+		- transaction 		- 			An instance of the Transaction class representing the committing transaction.
 
 		This function is called inside Site.commit, which in turn is called when a transaction ends (not aborts).
 		 We first mark the end of the life of the variable by making it inactive and then add the most recent 
-		 ready-to-be-committed value (Variable.lastUncommitted) to the list of committed values for this
-		 variable. 
+		 ready-to-be-committed value of this transaction (in Variable.uncommitted) to the committed values for
+		 this variable. 
+		'''
+
+		if not self.isActive :
+			self.isActive = True
+
+		txnID = transaction['ID']
+		value = self.uncommitted.pop(txnID)
+		self.commitTimes.append(timeStamp)
+		self.commitWriters.append(self.writers.intern(txnID))
+		self.commitValues.append(value)
+
+	def install(self, timeStamp, txnID, value) :
+
+		'''
+		args :
+		- timeStamp 		- 			The time instance at which the version was committed at the primary site.
+		- txnID 			- 			The ID of the transaction that committed it.
+		- value 			- 			The committed value.
+
+		This function is called inside Site.applyReplicated, on a replica of this variable under primary-copy replication.
+		 The version committed at the primary site is added to the committed values for this variable, unless it is the
+		 last one already (if it is sent again), and the variable can be read again if its site had recovered.
 		'''
 
 		if not self.isActive :
 			self.isActive = True
 
-		self.committedValues.append([timeStamp, self.lastUncommitted])
+		if self.commitTimes[-1] == timeStamp and self.writers.writerOf(self.commitWriters[-1]) == txnID :
+			return
+
+		self.commitTimes.append(timeStamp)
+		self.commitWriters.append(self.writers.intern(txnID))
+		self.commitValues.append(value)
+
+	def versionCount(self) :
+
+		'''
+		This function returns the number of committed versions held for this variable.
+		'''
+
+		return len(self.commitTimes)
 
 	# def loadCommitted(self, values) :
 	# 	'''
 	# 	load the commited value
 	# 	'''
-	# 	self.committedValues = values
\ No newline at end of file
+	# 	self.committedValues = values
+
+class VariableTable(dict) :
+
+	'''
+	Class that will serve as the dictionary of the Variable objects of a client site, where the keys are their IDs.
+	The initial values of the variables are kept in partitions, each a pair of arrays of the indices of the variables
+	 (i for xi, in increasing order) and of their values, and the Variable object of a variable is only created the
+	 first time it is looked up. A site holding millions of variables (see BulkLoader.py) thus only holds Variable
+	 objects for those that have been accessed, and the partitions of the even-indexed variables, which every site
+	 holds, can be shared by all the sites forked from one process.
+	Going through all the variables (iteritems, itervalues) yields the Variable objects created so far and, for the
+	 others, Variable objects holding their initial values that are not kept.
+	'''
+
+	def __init__(self, partitions) :
+
+		'''
+		args :
+		- partitions 				-			List of (indices, values) pairs of arrays holding the initial values of the variables.
+
+		Constructor to initialize all data members of VariableTable class.
+
+		Data members :
+
+		- partitions 				-			List of (indices, values) pairs of arrays holding the initial values of the variables.
+		- writers 					-			The WriterTable shared by the variables of the site.
+		- recovering 				-			True, once the site has recovered from a failure : the replicated variables that have
+												 no Variable object yet are then created as recovering (see Variable.recover).
+		'''
+
+		dict.__init__(self)
+		self.partitions = partitions
+		self.writers = WriterTable()
+		self.recovering = False
+
+	def _initialValue(self, varID) :
+
+		'''
+		args :
+		- varID 					-			The ID of a variable.
+
+		This function returns the initial value of this variable, or None if this site does not hold it.
+		'''
+
+		try :
+			index = int(varID[1:])
+		except (TypeError, ValueError) :
+			return None
+
+		for indices, values in self.partitions :
+			i = bisect_left(indices, index)
+			if i < len(indices) and indices[i] == index :
+				return values[i]
+		return None
+
+	def _create(self, varID, value) :
+
+		'''
+		args :
+		- varID 					-			The ID of a variable.
+		- value 					-			The initial value of this variable.
+
+		This function is called inside VariableTable.__missing__ and VariableTable.iteritems. It returns a new Variable
+		 object holding the initial value, recovering if the site has recovered and the variable is replicated.
+		'''
+
+		var = Variable(varID, value, self.writers)
+		if self.recovering and var.isReplicated() :
+			var.recover()
+		return var
+
+	def __missing__(self, varID) :
+
+		'''
+		args :
+		- varID 					-			The ID of a variable that has no Variable object yet.
+
+		This function is called by dict when a variable is looked up for the first time. It creates the Variable object of
+		 this variable, keeps it and returns it. A KeyError is raised if this site does not hold the variable.
+		'''
+
+		value = self._initialValue(varID)
+		if value is None :
+			raise KeyError(varID)
+		var = self[varID] = self._create(varID, value)
+		return var
+
+	def __contains__(self, varID) :
+
+		'''
+		args :
+		- varID 					-			The ID of a variable.
+
+		This function returns True if this site holds the variable, whether or not it has a Variable object yet.
+		'''
+
+		return dict.__contains__(self, varID) or self._initialValue(varID) is not None
+
+	def __len__(self) :
+
+		'''
+		This function returns the number of variables this site holds, whether or not they have a Variable object yet.
+		'''
+
+		return sum(len(indices) for indices, values in self.partitions)
+
+	def get(self, varID, default = None) :
+
+		'''
+		args :
+		- varID 					-			The ID of a variable.
+		- default 					-			The value to return if this site does not hold the variable.
+
+		This function returns the Variable object of this variable, creating it if need be, or 'default'.
+		'''
+
+		return self[varID] if varID in self else default
+
+	def iterkeys(self) :
+
+		'''
+		This function yields the IDs of all the variables this site holds, in increasing order of index within each
+		 partition, without creating their Variable objects.
+		'''
+
+		for indices, values in self.partitions :
+			for index in indices :
+				yield 'x%d' % index
+
+	__iter__ = iterkeys
+
+	def keys(self) :
+
+		'''
+		This function returns the list of the IDs of all the variables this site holds (see VariableTable.iterkeys).
+		'''
+
+		return list(self.iterkeys())
+
+	def iteritems(self) :
+
+		'''
+		This function yields the (ID, Variable object) pairs of all the variables this site holds. The variables that
+		 have no Variable object yet are given one holding their initial value, which is not kept.
+		'''
+
+		for indices, values in self.partitions :
+			for index, value in izip(indices, values) :
+				varID = 'x%d' % index
+				var = dict.get(self, varID)
+				yield varID, var if var is not None else self._create(varID, value)
+
+	def itervalues(self) :
+
+		'''
+		This function yields the Variable objects of all the variables this site holds (see VariableTable.iteritems).
+		'''
+
+		for varID, var in self.iteritems() :
+			yield var
+
+	def items(self) :
+
+		'''
+		This function returns the list of the (ID, Variable object) pairs yielded by VariableTable.iteritems.
+		'''
+
+		return list(self.iteritems())
+
+	def values(self) :
+
+		'''
+		This function returns the list of the Variable objects yielded by VariableTable.itervalues.
+		'''
+
+		return list(self.itervalues())
+
+	def materialized(self) :
+
+		'''
+		This function is called inside Site.fail. It returns the Variable objects created so far, the only ones that may
+		 hold uncommitted writes.
+		'''
+
+		return dict.values(self)
+
+	def recover(self) :
+
+		'''
+		This function is called inside Site.recover under available copies. Every replicated variable is to be recovered
+		 (see Variable.recover) : those that have a Variable object now, and the others when it is created.
+		'''
+
+		self.recovering = True
+		for var in dict.itervalues(self) :
+			if var.isReplicated() :
+				var.recover()
@@ -0,0 +1,142 @@
+# Authors :
+# Sudharshann D (sd3770)
+
+try :
+	import numpy
+except ImportError :
+	numpy = None
+
+class VersionStore(object) :
+
+	'''
+	Class that will serve as a columnar store of all committed versions of all variables on a client site.
+	Every version is one row across four NumPy arrays (variable index, time of commit, committing transaction and value),
+	 so that the state of every variable as of some time can be found with a single vectorized binary search, rather than
+	 one lookup per variable. NumPy is an optional dependency : use VersionStore.isAvailable before creating one.
+	'''
+
+	# Rows are ordered by the key (variable index * _STRIDE + time of commit), which requires times below _STRIDE
+	_STRIDE = 1 << 32
+
+	def __init__(self, capacity = 1024) :
+
+		'''
+		args :
+		- capacity 				-		The number of rows to allocate at first. The arrays double in size whenever they are full.
+
+		Constructor to initialize all data members of VersionStore class.
+
+		Data members :
+
+		- _vars 				-		Array of the indices of the variables of the rows (i for xi).
+		- _times 				-		Array of the times of commit of the rows.
+		- _writers 				-		Array of the committing transactions of the rows, as indices into the WriterTable of the site.
+		- _values 				-		Array of the committed values of the rows.
+		- _size 				-		The number of rows in use.
+		- _keys 				-		Sorted array of the keys of the first _sortedSize rows.
+		- _order 				-		Array of the row numbers in the order of _keys.
+		- _sortedSize 			-		The number of rows covered by _keys and _order. Rows appended since then are merged in
+										 on the next snapshot.
+		'''
+
+		if numpy is None :
+			raise ImportError('VersionStore requires numpy')
+
+		self._vars = numpy.empty(capacity, dtype = numpy.int64)
+		self._times = numpy.empty(capacity, dtype = numpy.int64)
+		self._writers = numpy.empty(capacity, dtype = numpy.int64)
+		self._values = numpy.empty(capacity, dtype = numpy.int64)
+		self._size = 0
+		self._keys = numpy.empty(0, dtype = numpy.int64)
+		self._order = numpy.empty(0, dtype = numpy.int64)
+		self._sortedSize = 0
+
+	@staticmethod
+	def isAvailable() :
+
+		'''
+		This function is called by the constructor of the Site class. It returns True if NumPy could be imported.
+		'''
+
+		return numpy is not None
+
+	def append(self, varIndex, timeStamp, writer, value) :
+
+		'''
+		args :
+		- varIndex 				-		The index of the variable being committed (i for xi).
+		- timeStamp 			-		The time instance of the commit.
+		- writer 				-		The committing transaction, as an index into the WriterTable of the site.
+		- value 				-		The committed value.
+
+		This function is called inside Site._initVariables for the initial value of every variable, and inside Site.commit
+		 for every value committed afterwards.
+		'''
+
+		if self._size == len(self._vars) :
+			self._grow()
+
+		i = self._size
+		self._vars[i] = varIndex
+		self._times[i] = timeStamp
+		self._writers[i] = writer
+		self._values[i] = value
+		self._size += 1
+
+	def snapshotAt(self, timeStamp, varIndices) :
+
+		'''
+		args :
+		- timeStamp 			-		The time instance as of which the variables are to be read.
+		- varIndices 			-		Sequence of the indices of the variables to be read.
+
+		This function is called inside Site.snapshotAt. For every variable, it finds the most recent version committed at
+		 or before 'timeStamp' with one call to numpy.searchsorted over all the variables at once. It returns four arrays,
+		 in the order of 'varIndices' : whether a version was found, and the time of commit, the committing transaction
+		 and the value of that version.
+		'''
+
+		self._sort()
+
+		varIndices = numpy.asarray(varIndices, dtype = numpy.int64)
+		rows = numpy.searchsorted(self._keys, varIndices * self._STRIDE + timeStamp, side = 'right') - 1
+		found = rows >= 0
+		rows = self._order[numpy.maximum(rows, 0)]
+		found &= self._vars[rows] == varIndices
+
+		return found, self._times[rows], self._writers[rows], self._values[rows]
+
+	def _sort(self) :
+
+		'''
+		This function is called inside VersionStore.snapshotAt. It merges the rows appended since the last snapshot into
+		 the sorted keys. Both runs are already sorted once the new rows are, so a stable sort of their concatenation only
+		 has to merge them.
+		'''
+
+		if self._sortedSize == self._size :
+			return
+
+		newRows = numpy.arange(self._sortedSize, self._size, dtype = numpy.int64)
+		newKeys = self._vars[newRows] * self._STRIDE + self._times[newRows]
+		newOrder = numpy.argsort(newKeys, kind = 'mergesort')
+
+		keys = numpy.concatenate((self._keys, newKeys[newOrder]))
+		order = numpy.concatenate((self._order, newRows[newOrder]))
+		merged = numpy.argsort(keys, kind = 'mergesort')
+
+		self._keys = keys[merged]
+		self._order = order[merged]
+		self._sortedSize = self._size
+
+	def _grow(self) :
+
+		'''
+		This function is called inside VersionStore.append when the arrays are full. It doubles their size.
+		'''
+
+		capacity = max(1, 2 * len(self._vars))
+		for name in ('_vars', '_times', '_writers', '_values') :
+			column = numpy.empty(capacity, dtype = numpy.int64)
+			column[:self._size] = getattr(self, name)[:self._size]
+			setattr(self, name, column)
@@ -0,0 +1,137 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+import heapq
+import itertools
+from collections import OrderedDict
+
+class Waitlist(object) :
+
+	'''
+	Class that will serve as the waitlist of the TM : the requests that could not run because of a lock conflict or
+	 because no site holding their variable was up. Requests are kept in a heap ordered by a priority given when they are
+	 added (lower first), ties being broken by the order in which they were added, so that the waitlist is retried in
+	 order of priority without scanning or sorting it. Removed requests are only marked as such, and dropped from the
+	 heap when they reach its top.
+	'''
+
+	def __init__(self) :
+
+		'''
+		Constructor to initialize all data members of Waitlist class.
+
+		Data members :
+
+		- _heap 					-		Heap of [priority, sequence number, request] entries; the request of a removed
+											 entry is set to None.
+		- _entries 					-		Dictionary mapping every request in the waitlist to its entry in the heap.
+		- _byVariable 				-		Dictionary mapping every variable to the requests waiting on it, in the order
+											 they were added.
+		- _sequence 				-		Counter giving the sequence numbers of the entries.
+		- _passes 					-		The number of retry passes in progress (they may nest, see Waitlist.retry).
+		- _retried 					-		The entries taken off the heap by the passes in progress, to be pushed back
+											 once the outermost pass is over.
+		'''
+
+		self._heap = []
+		self._entries = {}
+		self._byVariable = {}
+		self._sequence = itertools.count()
+		self._passes = 0
+		self._retried = []
+
+	def __len__(self) :
+
+		'''
+		This function returns the number of requests in the waitlist, leaving out those that have been removed.
+		'''
+
+		return len(self._entries)
+
+	def __contains__(self, request) :
+
+		'''
+		args :
+		- request 					-		A request, as a tuple (operation, txnID, var[, value]).
+
+		This function returns True if this request is in the waitlist and has not been removed.
+		'''
+
+		return request in self._entries
+
+	def add(self, request, priority = ()) :
+
+		'''
+		args :
+		- request 					-		A waitlisted request, as a tuple (operation, txnID, var[, value]).
+		- priority 					-		A tuple, lower ones being retried first.
+
+		This function is called inside TransactionManager._addWaitlist.
+		'''
+
+		entry = [priority, next(self._sequence), request]
+		self._entries[request] = entry
+		self._byVariable.setdefault(request[2], OrderedDict())[request] = None
+		heapq.heappush(self._heap, entry)
+
+	def remove(self, request) :
+
+		'''
+		args :
+		- request 					-		A request in the waitlist.
+
+		This function is called inside TransactionManager._retryWaitingTransactions once a request has run, or its
+		 transaction has terminated.
+		'''
+
+		entry = self._entries.pop(request)
+		entry[-1] = None
+
+		waiting = self._byVariable[request[2]]
+		del waiting[request]
+		if not waiting :
+			del self._byVariable[request[2]]
+
+	def waitingOn(self, var) :
+
+		'''
+		args :
+		- var 						-		The ID of a variable.
+
+		This function returns the requests waiting on a variable, in the order they were added.
+		'''
+
+		return list(self._byVariable.get(var, ()))
+
+	def variables(self) :
+
+		'''
+		This function returns the set of the variables that requests are waiting on.
+		'''
+
+		return set(self._byVariable)
+
+	def retry(self) :
+
+		'''
+		This function is called inside TransactionManager._retryWaitingTransactions. It yields the requests in the
+		 waitlist in order of priority, each one once. Requests added while the pass is in progress are yielded too,
+		 when their turn comes. A pass may start while another is in progress, when retrying a request terminates a
+		 transaction : it only yields the requests that the outer pass has not reached yet.
+		'''
+
+		self._passes += 1
+		try :
+			while self._heap :
+				entry = heapq.heappop(self._heap)
+				if entry[-1] is None :
+					continue
+				self._retried.append(entry)
+				yield entry[-1]
+		finally :
+			self._passes -= 1
+			if not self._passes :
+				for entry in self._retried :
+					if entry[-1] is not None :
+						heapq.heappush(self._heap, entry)
+				self._retried = []
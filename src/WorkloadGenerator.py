@@ -0,0 +1,116 @@
+# Authors :
+# Sanjan Prakash Kumar (spk363)
+
+import sys
+import random
+import argparse
+
+class WorkloadGenerator(object) :
+
+	'''
+	Class that will generate input files for the simulator, in the same grammar as the files under data/.
+	A fixed number of transactions is kept running at once. At every step, one of the running transactions is
+	 picked at random and either issues its next read or write, or ends once it has issued all of them. The
+	 contention between transactions is controlled by how many variables are 'hot' and by how often an
+	 operation picks a hot variable.
+	'''
+
+	def __init__(self, transactions = 100, concurrency = 5, operations = 4, readRatio = 0.5, readOnlyRatio = 0.0, hotVariables = 4, hotProbability = 0.5, numVariables = 20, seed = 0) :
+
+		'''
+		args :
+		- transactions 				-		The total number of transactions to generate.
+		- concurrency 				-		The number of transactions running at once.
+		- operations 				-		The number of reads and writes issued by each transaction.
+		- readRatio 				-		The probability that an operation of a read-write transaction is a read.
+		- readOnlyRatio 			-		The probability that a transaction is read-only.
+		- hotVariables 				-		The number of hot variables.
+		- hotProbability 			-		The probability that an operation accesses one of the hot variables.
+		- numVariables 				-		The number of variables (x1, x2, ...) to pick from.
+		- seed 						-		Seed of the random number generator, so that a workload can be generated again.
+
+		Constructor to initialize all data members of WorkloadGenerator class.
+		'''
+
+		self.transactions = transactions
+		self.concurrency = concurrency
+		self.operations = operations
+		self.readRatio = readRatio
+		self.readOnlyRatio = readOnlyRatio
+		self.hotProbability = hotProbability
+		self.random = random.Random(seed)
+
+		variables = ['x%d' % i for i in range(1, numVariables + 1)]
+		self.random.shuffle(variables)
+		self.hot = variables[:hotVariables]
+		self.cold = variables[hotVariables:] or self.hot
+
+	def generate(self) :
+
+		'''
+		This function returns the lines of a whole workload, in order.
+		'''
+
+		lines = []
+		running = {}
+		readOnly = set()
+		started = 0
+
+		while started < self.transactions or running :
+			while len(running) < self.concurrency and started < self.transactions :
+				started += 1
+				txnID = 'T%d' % started
+				running[txnID] = self.operations
+				if self.random.random() < self.readOnlyRatio :
+					readOnly.add(txnID)
+					lines.append('beginRO(%s)' % txnID)
+				else :
+					lines.append('begin(%s)' % txnID)
+
+			txnID = self.random.choice(sorted(running.keys()))
+
+			if running[txnID] == 0 :
+				del running[txnID]
+				lines.append('end(%s)' % txnID)
+				continue
+
+			running[txnID] -= 1
+			if self.random.random() < self.hotProbability :
+				var = self.random.choice(self.hot)
+			else :
+				var = self.random.choice(self.cold)
+
+			if txnID in readOnly or self.random.random() < self.readRatio :
+				lines.append('R(%s,%s)' % (txnID, var))
+			else :
+				lines.append('W(%s,%s,%d)' % (txnID, var, self.random.randint(0, 999)))
+
+		return lines
+
+	def write(self, fileName) :
+
+		'''
+		args :
+		- fileName 					-		The name of the input file to be written.
+
+		This function writes a whole workload to an input file.
+		'''
+
+		with open(fileName, 'w') as f :
+			f.write('\n'.join(self.generate()) + '\n')
+
+
+if __name__ == '__main__' :
+	parser = argparse.ArgumentParser(description = 'Generate an input file for the simulator.')
+	parser.add_argument('--transactions', type = int, default = 100)
+	parser.add_argument('--concurrency', type = int, default = 5)
+	parser.add_argument('--operations', type = int, default = 4)
+	parser.add_argument('--read-ratio', type = float, default = 0.5)
+	parser.add_argument('--read-only-ratio', type = float, default = 0.0)
+	parser.add_argument('--hot-variables', type = int, default = 4)
+	parser.add_argument('--hot-probability', type = float, default = 0.5)
+	parser.add_argument('--seed', type = int, default = 0)
+	args = parser.parse_args()
+
+	generator = WorkloadGenerator(args.transactions, args.concurrency, args.operations, args.read_ratio, args.read_only_ratio, args.hot_variables, args.hot_probability, seed = args.seed)
+	sys.stdout.write('\n'.join(generator.generate()) + '\n')